@@ -0,0 +1,244 @@
+# geoprumo/backend/app/core/admission.py
+
+import asyncio
+import contextvars
+import functools
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+from fastapi import HTTPException
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.utils import available_cpus
+from app.core.responses import dumps
+from app.core.profiling import profiled_call
+from app.core.metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTIONS, ADMISSION_WAIT
+
+class AdmissionRejected(HTTPException):
+    """Requisição recusada por sobrecarga (429), com o tempo sugerido para tentar de novo."""
+    def __init__(self, pool: str, reason: str, retry_after_s: float):
+        self.pool = pool
+        self.reason = reason
+        retry_after = max(1, math.ceil(retry_after_s))
+        super().__init__(
+            status_code=429,
+            detail=f"Servidor ocupado ({pool}): tente novamente em {retry_after} s.",
+            headers={"Retry-After": str(retry_after)}
+        )
+
+class WorkPool:
+    """
+    Controle de admissão de um tipo de trabalho (solver, leitura de arquivos, rede).
+    No máximo `max_concurrency` tarefas rodam ao mesmo tempo e até `max_queue` esperam;
+    além disso a requisição é recusada na hora. Com o tempo médio de serviço observado,
+    também recusa de imediato quem não seria atendido dentro do prazo (`queue_timeout_s`),
+    em vez de deixá-lo esperar para falhar depois.
+    Pools de CPU têm o próprio executor, separado do threadpool do FastAPI, para que
+    solves longos não travem os endpoints leves.
+    """
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, queue_timeout_s: float, threaded: bool):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout_s = queue_timeout_s
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix=f"geoprumo-{name}") if threaded else None
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._in_flight = 0
+        self._avg_service_s = 0.0
+        self._rejections: Dict[str, int] = {}
+
+    def _estimated_wait_s(self) -> float:
+        """Espera estimada de quem entrar agora na fila (0 se houver vaga livre)."""
+        if self._in_flight < self.max_concurrency:
+            return 0.0
+        rounds = math.ceil((self._waiting + 1) / self.max_concurrency)
+        return rounds * self._avg_service_s
+
+    def _reject(self, reason: str, retry_after_s: float) -> AdmissionRejected:
+        with self._lock:
+            self._rejections[reason] = self._rejections.get(reason, 0) + 1
+        ADMISSION_REJECTIONS.labels(self.name, reason).inc()
+        return AdmissionRejected(self.name, reason, retry_after_s)
+
+    def admit_batch(self, jobs: int, service_s: float, deadline_s: float) -> None:
+        """
+        Recusa (429) de uma vez um lote de `jobs` tarefas que, somadas ao que já está no pool,
+        não terminariam dentro de `deadline_s` (cada uma levando ao menos `service_s`).
+        As tarefas admitidas entram depois com slot(admitted=True), sem o limite de fila.
+        """
+        with self._lock:
+            service = max(self._avg_service_s, service_s)
+            backlog = self._in_flight + self._waiting
+            estimated = math.ceil((backlog + jobs) / self.max_concurrency) * service
+            retry_after = math.ceil(backlog / self.max_concurrency) * service
+        if estimated > deadline_s:
+            raise self._reject("deadline", retry_after or service)
+
+    @asynccontextmanager
+    async def slot(self, deadline_s: Optional[float] = None, admitted: bool = False) -> AsyncIterator[None]:
+        """
+        Reserva uma vaga no pool (esperando na fila, se permitido) durante o bloco.
+        Com `admitted`, a tarefa já passou pelo admit_batch: entra na fila sem as recusas
+        imediatas e espera no máximo `deadline_s`.
+        """
+        deadline_s = self.queue_timeout_s if deadline_s is None else deadline_s
+        with self._lock:
+            estimated = self._estimated_wait_s()
+            if admitted:
+                reason = None
+                self._waiting += 1
+            elif self._in_flight >= self.max_concurrency and self._waiting >= self.max_queue:
+                reason = "queue_full"
+            elif estimated > deadline_s:
+                reason = "deadline"
+            else:
+                reason = None
+                self._waiting += 1
+        if reason:
+            raise self._reject(reason, estimated or self._avg_service_s or deadline_s)
+
+        ADMISSION_QUEUE_DEPTH.labels(self.name).inc()
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=deadline_s)
+        except asyncio.TimeoutError:
+            raise self._reject("timeout", self._estimated_wait_s() or deadline_s)
+        finally:
+            with self._lock:
+                self._waiting -= 1
+            ADMISSION_QUEUE_DEPTH.labels(self.name).dec()
+
+        ADMISSION_WAIT.labels(self.name).observe(time.monotonic() - start)
+        with self._lock:
+            self._in_flight += 1
+        ADMISSION_IN_FLIGHT.labels(self.name).inc()
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self._in_flight -= 1
+                # Média móvel exponencial do tempo de serviço (estimativa de espera da fila)
+                self._avg_service_s = elapsed if self._avg_service_s == 0 else 0.8 * self._avg_service_s + 0.2 * elapsed
+            ADMISSION_IN_FLIGHT.labels(self.name).dec()
+            self._semaphore.release()
+
+    async def run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Executa `func` no executor do pool após ser admitida (preserva as ContextVars, ex.: timings)
+        e inclui a thread no profiler da requisição, quando ela estiver sendo perfilada.
+        """
+        async with self.slot():
+            loop = asyncio.get_running_loop()
+            context = contextvars.copy_context()
+            call = functools.partial(context.run, profiled_call, func, *args, **kwargs)
+            return await loop.run_in_executor(self._executor, call)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "name": self.name,
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "queued": self._waiting,
+                "avg_service_s": round(self._avg_service_s, 4),
+                "rejections": dict(self._rejections),
+            }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+_CPUS = available_cpus()
+
+# Pools compartilhados por toda a aplicação
+solver_pool = WorkPool("solver", settings.SOLVER_CONCURRENCY or _CPUS, settings.SOLVER_QUEUE_SIZE or 2 * _CPUS,
+                       settings.SOLVER_QUEUE_TIMEOUT_S, threaded=True)
+parse_pool = WorkPool("parse", settings.PARSE_CONCURRENCY or _CPUS, settings.PARSE_QUEUE_SIZE or 4 * _CPUS,
+                      settings.PARSE_QUEUE_TIMEOUT_S, threaded=True)
+io_pool = WorkPool("io", settings.IO_CONCURRENCY, settings.IO_QUEUE_SIZE, settings.IO_QUEUE_TIMEOUT_S, threaded=False)
+pools = {pool.name: pool for pool in (solver_pool, parse_pool, io_pool)}
+
+def check_point_budget(count: int) -> None:
+    """Recusa (413) requisições com mais pontos que MAX_POINTS_PER_REQUEST."""
+    if count > settings.MAX_POINTS_PER_REQUEST:
+        ADMISSION_REJECTIONS.labels("budget", "points").inc()
+        raise HTTPException(
+            status_code=413,
+            detail=f"A requisição tem {count} pontos; o limite é {settings.MAX_POINTS_PER_REQUEST}."
+        )
+
+def check_byte_budget(count: int, limit: int) -> None:
+    """Recusa (413) entradas para análise (arquivos e textos) maiores que `limit` bytes."""
+    if count > limit:
+        ADMISSION_REJECTIONS.labels("budget", "bytes").inc()
+        raise HTTPException(
+            status_code=413,
+            detail=f"Os arquivos e textos somam {count} bytes; o limite é {limit}."
+        )
+
+class BodySizeLimitMiddleware:
+    """
+    Recusa (413) corpos maiores que MAX_REQUEST_BYTES antes de qualquer processamento:
+    pelo Content-Length, quando informado, ou contando os bytes recebidos.
+    """
+    def __init__(self, app: ASGIApp, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    def _detail(self) -> str:
+        return f"Requisição maior que o limite de {self.max_bytes} bytes."
+
+    async def _reject(self, send: Send) -> None:
+        body = dumps({"detail": self._detail()})
+        await send({"type": "http.response.start", "status": 413,
+                    "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]})
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self.max_bytes <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope["headers"]:
+            if name == b"content-length" and value.isdigit() and int(value) > self.max_bytes:
+                ADMISSION_REJECTIONS.labels("budget", "bytes").inc()
+                await self._reject(send)
+                return
+
+        received = 0
+        too_large = False
+        response_started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received, too_large
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Sem Content-Length (envio em partes): interrompe a leitura do corpo
+                    too_large = True
+                    ADMISSION_REJECTIONS.labels("budget", "bytes").inc()
+                    raise HTTPException(status_code=413, detail=self._detail())
+            return message
+
+        async def tracking_send(message: Message) -> None:
+            nonlocal response_started
+            response_started = response_started or message["type"] == "http.response.start"
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except HTTPException:
+            if not too_large or response_started:
+                raise
+            await self._reject(send)
@@ -0,0 +1,47 @@
+# geoprumo/backend/app/core/clients.py
+
+import threading
+from typing import Optional, TYPE_CHECKING
+
+from app.core.config import settings
+from app.core.http_client import HttpClient, http_client
+
+if TYPE_CHECKING:
+    from app.services.ai_services import AIServices
+
+class SharedClients:
+    """
+    Guarda os clientes de serviços externos que devem existir uma única vez por
+    processo e ser reutilizados entre as requisições.
+    Por padrão os clientes são criados sob demanda, na primeira vez em que a
+    funcionalidade é usada, para que bibliotecas pesadas não atrasem a subida do servidor.
+    """
+    def __init__(self, http: HttpClient):
+        self._lock = threading.Lock()
+        self._ai_services: Optional["AIServices"] = None
+        self.http = http
+
+    def ai_services(self) -> "AIServices":
+        """Retorna o cliente do Gemini, criando-o na primeira chamada."""
+        if self._ai_services is None:
+            with self._lock:
+                if self._ai_services is None:
+                    # Importação tardia: google.generativeai só é carregado quando a IA é usada.
+                    from app.services.ai_services import AIServices
+                    self._ai_services = AIServices()
+        return self._ai_services
+
+    async def startup(self) -> None:
+        """Chamado no início do ciclo de vida da aplicação (lifespan do FastAPI)."""
+        await self.http.start()
+        if settings.EAGER_CLIENTS and settings.GEMINI_API_KEY:
+            self.ai_services()
+
+    async def shutdown(self) -> None:
+        """Chamado no encerramento da aplicação; fecha conexões e descarta os clientes."""
+        await self.http.aclose()
+        with self._lock:
+            self._ai_services = None
+
+# Instância única compartilhada por toda a aplicação
+shared_clients = SharedClients(http_client)
@@ -20,8 +20,96 @@ class Settings(BaseSettings):
     # Configurações da API do OpenRouteService
     ORS_BASE_URL: str = "https://api.openrouteservice.org"
 
+    # Resiliência da otimização online (disjuntor, prazo e fallback offline)
+    ORS_BREAKER_FAILURE_THRESHOLD: int = 5   # falhas seguidas que abrem o circuito
+    ORS_BREAKER_RECOVERY_S: float = 30.0     # tempo com o circuito aberto antes de testar de novo
+    ORS_SLOW_CALL_S: float = 10.0            # chamadas canceladas após esse tempo contam como falha (lentas concluídas só são contadas)
+    ORS_OPTIMIZE_DEADLINE_S: float = 20.0    # prazo da otimização online antes do fallback
+    OFFLINE_FALLBACK_TIME_LIMIT_S: int = 2   # limite do OR-Tools quando usado como fallback
+    ORS_DIRECTIONS_HEDGE_DELAY_S: float = 3.0  # espera antes de duplicar a chamada de directions (0 = desliga)
+    ORS_DIRECTIONS_MAX_ATTEMPTS: int = 2
+
+    # Tempo máximo (segundos) da busca do OR-Tools na otimização offline
+    OFFLINE_TIME_LIMIT_S: int = 5
+    # Rotas até este tamanho usam matriz de distâncias pré-calculada (N² inteiros em memória)
+    DISTANCE_MATRIX_MAX_POINTS: int = 2000
+
+    # Otimização em lote (/process/bulk)
+    BULK_MAX_ROUTES: int = 100   # rotas aceitas por requisição
+    BULK_MAX_WORKERS: int = 0    # processos do pool (0 = número de núcleos disponíveis)
+    BULK_QUEUE_TIMEOUT_S: float = 120.0  # prazo para as rotas offline do lote passarem pela fila do solver
+
+    # Controle de admissão (0 = número de núcleos; filas cheias ou prazo estourado respondem 429)
+    SOLVER_CONCURRENCY: int = 0        # otimizações OR-Tools simultâneas
+    SOLVER_QUEUE_SIZE: int = 0         # otimizações esperando vaga (0 = 2x núcleos)
+    SOLVER_QUEUE_TIMEOUT_S: float = 10.0
+    PARSE_CONCURRENCY: int = 0         # leituras/limpezas de arquivos e exportações simultâneas
+    PARSE_QUEUE_SIZE: int = 0          # (0 = 4x núcleos)
+    PARSE_QUEUE_TIMEOUT_S: float = 5.0
+    IO_CONCURRENCY: int = 64           # chamadas externas simultâneas (ORS, links)
+    IO_QUEUE_SIZE: int = 256
+    IO_QUEUE_TIMEOUT_S: float = 5.0
+    # Limites por requisição, verificados antes de qualquer processamento (413)
+    MAX_REQUEST_BYTES: int = 50 * 1024 * 1024
+    MAX_POINTS_PER_REQUEST: int = 50_000
+    BULK_MAX_INPUT_BYTES: int = 20 * 1024 * 1024  # arquivos (Base64) e textos somados de todas as rotas do /bulk
+
+    # Camada HTTP compartilhada (chamadas externas)
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY_S: float = 30.0
+    HTTP_PER_HOST_CONCURRENCY: int = 20   # requisições simultâneas por host de destino
+    HTTP_CONNECT_TIMEOUT_S: float = 5.0
+    HTTP_TIMEOUT_S: float = 30.0
+
+    # Compressão das respostas (negociada pelo Accept-Encoding; brotli se brotli-asgi estiver instalado)
+    COMPRESSION_MINIMUM_SIZE: int = 1000   # bytes; respostas menores vão sem compressão (0 = desliga)
+    GZIP_COMPRESSION_LEVEL: int = 6
+    BROTLI_QUALITY: int = 4
+
+    # Leitura de planilhas Excel
+    EXCEL_MAX_ROWS: int = 200_000   # linhas lidas por arquivo (as demais são ignoradas)
+
+    # Planilhas em UTM sem coluna de zona/hemisfério (0 = sem zona padrão: linhas sem zona são descartadas)
+    UTM_DEFAULT_ZONE: int = 0
+    UTM_DEFAULT_HEMISPHERE: str = "S"
+
+    # Cache dos mapas do Google My Maps (KML e pontos já analisados)
+    MYMAPS_CACHE_TTL_S: float = 300.0     # dentro do TTL não há acesso à rede; depois, revalida (ETag/Last-Modified)
+    MYMAPS_CACHE_MAX_ENTRIES: int = 256
+
+    # Sessões de rota no servidor (edições incrementais sem reenviar a rota inteira)
+    ROUTE_SESSION_TTL_S: float = 3600.0          # sessões sem alterações por mais tempo que isso expiram
+    ROUTE_SESSION_MAX_SESSIONS: int = 500        # sessões mantidas em memória (as mais antigas saem primeiro)
+    ROUTE_SESSION_SQLITE_PATH: str = ""          # arquivo SQLite para persistir as sessões (vazio = só memória)
+    ROUTE_SESSION_SNAPSHOT_EVERY: int = 50       # versões entre fotos completas no SQLite (entre elas, só o log de operações)
+    ROUTE_SESSION_MATRIX_MAX_POINTS: int = 2000  # acima disso as distâncias são calculadas sob demanda
+    ROUTE_SESSION_MATRIX_MAX_BYTES: int = 512 * 1024 * 1024  # soma das matrizes em memória (as das sessões menos usadas são liberadas)
+    ROUTE_SESSION_REOPT_WINDOW: int = 25         # posições vizinhas revisadas pelo 2-opt após cada alteração
+
+    # Agrupamento dos pontos no mapa (/sessions/{id}/clusters)
+    CLUSTER_RADIUS_PX: int = 60   # lado da célula de agrupamento, em pixels de tela
+    CLUSTER_MAX_ZOOM: int = 16    # acima deste zoom os pontos são enviados sem agrupamento
+
+    # Perfil por requisição (desligado por padrão): cabeçalho X-GeoPrumo-Profile com o token de admin ou sorteio
+    PROFILING_ADMIN_TOKEN: str = ""          # vazio = perfil por cabeçalho desligado
+    PROFILING_SAMPLE_RATE: float = 0.0       # fração das requisições perfiladas por sorteio (ex.: 0.001)
+    PROFILING_PATHS: str = "/api/v1/process,/api/v1/export,/api/v1/sessions"  # prefixos, separados por vírgula
+    PROFILING_DIR: str = "profiles"          # <request_id>-<sufixo>.folded, .json e, com tracemalloc, .alloc.txt/.tracemalloc
+    PROFILING_INTERVAL_MS: float = 10.0      # intervalo de amostragem das pilhas
+    PROFILING_TRACEMALLOC: bool = False      # foto das alocações; tracemalloc vale para o processo todo e deixa mais lentas as requisições simultâneas
+    PROFILING_TRACEMALLOC_FRAMES: int = 1    # quadros guardados por alocação (mais quadros = mais custo)
+    PROFILING_TOP_ALLOCATIONS: int = 50      # linhas no resumo .alloc.txt
+
     # Configurações da API do Google Gemini
     GEMINI_MODEL_NAME: str = "gemini-1.5-flash-latest"
+    # Endpoint alternativo (ex.: stub local de testes de carga). Vazio = API oficial do Google.
+    GEMINI_API_ENDPOINT: str = ""
+
+    # Ciclo de vida dos clientes compartilhados.
+    # False: clientes criados na primeira utilização (inicialização mais rápida).
+    # True: clientes criados já na subida do servidor (primeira requisição mais rápida).
+    EAGER_CLIENTS: bool = False
 
     class Config:
         # Aponta para o arquivo .env que criamos na raiz do backend
@@ -0,0 +1,71 @@
+# geoprumo/backend/app/core/http_client.py
+
+import asyncio
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.core.config import settings
+
+try:
+    import h2  # noqa: F401 - só verifica se o suporte a HTTP/2 está instalado
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+class HttpClient:
+    """
+    Camada HTTP assíncrona compartilhada por todas as chamadas externas
+    (OpenRouteService, Google My Maps, links).
+    Mantém conexões keep-alive reaproveitadas por host, usa HTTP/2 quando disponível
+    e limita quantas requisições simultâneas vão para cada host.
+    """
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    async def start(self) -> None:
+        """Cria o pool de conexões (chamado no lifespan da aplicação)."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                limits=httpx.Limits(
+                    max_connections=settings.HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_S
+                ),
+                timeout=httpx.Timeout(settings.HTTP_TIMEOUT_S, connect=settings.HTTP_CONNECT_TIMEOUT_S)
+            )
+
+    async def aclose(self) -> None:
+        """Fecha as conexões abertas (chamado no encerramento da aplicação)."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._host_semaphores.clear()
+
+    def _semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._host_semaphores[host] = asyncio.Semaphore(settings.HTTP_PER_HOST_CONCURRENCY)
+        return semaphore
+
+    async def request(self, method: str, url: str, timeout: Optional[float] = None, **kwargs: Any) -> httpx.Response:
+        """Faz uma requisição respeitando o limite de concorrência do host de destino."""
+        if self._client is None:
+            await self.start() # uso fora do servidor (scripts, benchmarks)
+        if timeout is not None:
+            kwargs["timeout"] = httpx.Timeout(timeout, connect=min(timeout, settings.HTTP_CONNECT_TIMEOUT_S))
+        async with self._semaphore(url):
+            return await self._client.request(method, url, **kwargs)
+
+    async def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+# Instância única compartilhada por toda a aplicação
+http_client = HttpClient()
@@ -0,0 +1,108 @@
+# geoprumo/backend/app/core/metrics.py
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# --- Métricas Prometheus (expostas em /metrics) ---
+
+STAGE_DURATION = Histogram(
+    "geoprumo_stage_duration_seconds", "Duração de cada etapa do processamento.", ["stage"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+UPSTREAM_DURATION = Histogram(
+    "geoprumo_upstream_request_duration_seconds", "Latência das chamadas a serviços externos.", ["service", "endpoint"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+)
+UPSTREAM_ERRORS = Counter(
+    "geoprumo_upstream_errors_total", "Chamadas a serviços externos que falharam.", ["service", "endpoint"]
+)
+SOLVER_OBJECTIVE = Histogram(
+    "geoprumo_solver_objective_meters", "Custo (distância em metros) da rota encontrada pelo otimizador.", ["mode"],
+    buckets=(1e3, 5e3, 1e4, 5e4, 1e5, 5e5, 1e6, 5e6, 1e7)
+)
+POINT_COUNT = Histogram(
+    "geoprumo_points", "Quantidade de pontos em cada etapa do processamento.", ["stage"],
+    buckets=(1, 10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000)
+)
+CIRCUIT_STATE = Gauge(
+    "geoprumo_circuit_breaker_state", "Estado do disjuntor: 0 = fechado, 1 = meio-aberto, 2 = aberto.", ["name"]
+)
+OPTIMIZATION_FALLBACKS = Counter(
+    "geoprumo_optimization_fallbacks_total", "Otimizações online que caíram para o solver offline.", ["reason"]
+)
+BULK_ROUTES = Counter(
+    "geoprumo_bulk_routes_total", "Rotas processadas pelo otimizador em lote, por resultado.", ["status"]
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "geoprumo_admission_queue_depth", "Tarefas esperando vaga em cada pool de admissão.", ["pool"]
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    "geoprumo_admission_in_flight", "Tarefas em execução em cada pool de admissão.", ["pool"]
+)
+ADMISSION_WAIT = Histogram(
+    "geoprumo_admission_wait_seconds", "Tempo de espera na fila de admissão.", ["pool"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+ADMISSION_REJECTIONS = Counter(
+    "geoprumo_admission_rejections_total", "Requisições recusadas por sobrecarga (429) ou por exceder limites (413).", ["pool", "reason"]
+)
+PROFILED_REQUESTS = Counter(
+    "geoprumo_profiled_requests_total", "Requisições perfiladas, por gatilho (admin ou sample).", ["trigger"]
+)
+LINK_CACHE_REQUESTS = Counter(
+    "geoprumo_link_cache_requests_total", "Consultas ao cache de links (hit, revalidated, miss, stale).", ["result"]
+)
+
+# Tempos (ms) da requisição atual, preenchidos apenas quando alguém os está coletando
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+
+@contextmanager
+def collect_timings() -> Iterator[Dict[str, float]]:
+    """Coleta, em um dicionário {etapa: ms}, os tempos das etapas executadas dentro do bloco."""
+    timings: Dict[str, float] = {}
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    """Mede uma etapa: alimenta o histograma e, se houver coleta ativa, o bloco de timings."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_DURATION.labels(stage).observe(elapsed)
+        timings = _request_timings.get()
+        if timings is not None:
+            # Etapas repetidas (ex.: vários arquivos) são somadas
+            timings[stage] = timings.get(stage, 0.0) + elapsed * 1000
+
+@contextmanager
+def upstream_call(service: str, endpoint: str) -> Iterator[None]:
+    """Mede uma chamada a um serviço externo e conta as falhas (exceções)."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        UPSTREAM_ERRORS.labels(service, endpoint).inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        UPSTREAM_DURATION.labels(service, endpoint).observe(elapsed)
+        timings = _request_timings.get()
+        if timings is not None:
+            key = f"upstream_{service}_{endpoint}"
+            timings[key] = timings.get(key, 0.0) + elapsed * 1000
+
+def observe_points(stage: str, count: int) -> None:
+    POINT_COUNT.labels(stage).observe(count)
+
+def observe_solver_objective(mode: str, meters: float) -> None:
+    SOLVER_OBJECTIVE.labels(mode).observe(meters)
@@ -0,0 +1,247 @@
+# geoprumo/backend/app/core/profiling.py
+
+import functools
+import hmac
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional, Set
+
+from fastapi.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.metrics import PROFILED_REQUESTS
+
+# Profiler da requisição em andamento (propagado às threads dos pools de admissão)
+_active_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("active_profile", default=None)
+
+# tracemalloc é global ao processo: fica ligado enquanto houver alguma requisição perfilada
+# e só é desligado aqui se foi ligado por este módulo
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+_tracemalloc_owned = False
+
+REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+MAX_STACK_DEPTH = 128
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def _start_tracemalloc() -> None:
+    global _tracemalloc_users, _tracemalloc_owned
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(settings.PROFILING_TRACEMALLOC_FRAMES)
+            _tracemalloc_owned = True
+        _tracemalloc_users += 1
+
+def _stop_tracemalloc() -> None:
+    global _tracemalloc_users, _tracemalloc_owned
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0 and _tracemalloc_owned:
+            tracemalloc.stop()
+            _tracemalloc_owned = False
+
+class RequestProfile:
+    """
+    Profiler por amostragem de uma requisição.
+    Uma thread auxiliar lê as pilhas (sys._current_frames) a cada PROFILING_INTERVAL_MS
+    apenas das threads registradas: a do event loop e as threads de trabalho enquanto
+    executam algo desta requisição (pools de admissão, run_in_thread e endpoints @profiled).
+    O custo fica na thread auxiliar e é proporcional ao intervalo, não ao código medido.
+    A thread do event loop é compartilhada: requisições simultâneas podem aparecer nas
+    amostras dela, mas não nas das threads de trabalho.
+    """
+    def __init__(self, request_id: str, trigger: str):
+        self.request_id = request_id
+        # Nome dos arquivos: o id pode vir do cliente, então recebe um sufixo gerado pelo
+        # servidor para que um id repetido nunca sobrescreva o perfil de outra requisição
+        self.file_id = f"{request_id}-{uuid.uuid4().hex[:12]}"
+        self.trigger = trigger
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.sampler_time_s = 0.0
+        self._threads: Set[int] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._snapshot_start = None
+        self.allocations = None
+
+    def register_thread(self, thread_id: int) -> None:
+        with self._lock:
+            self._threads.add(thread_id)
+
+    def unregister_thread(self, thread_id: int) -> None:
+        with self._lock:
+            self._threads.discard(thread_id)
+
+    def start(self) -> None:
+        self.register_thread(threading.get_ident())
+        if settings.PROFILING_TRACEMALLOC:
+            _start_tracemalloc()
+            self._snapshot_start = tracemalloc.take_snapshot()
+        self._sampler = threading.Thread(target=self._sample_loop, name=f"geoprumo-profiler-{self.request_id}", daemon=True)
+        self._sampler.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        if self._snapshot_start is not None:
+            self.allocations = tracemalloc.take_snapshot()
+            _stop_tracemalloc()
+
+    def _sample_loop(self) -> None:
+        interval = settings.PROFILING_INTERVAL_MS / 1000
+        while not self._stop.wait(interval):
+            started = time.perf_counter()
+            with self._lock:
+                threads = tuple(self._threads)
+            frames = sys._current_frames()
+            for thread_id in threads:
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                if stack:
+                    # Formato "folded" (raiz;...;folha), lido pelo flamegraph.pl e pelo speedscope
+                    self.stacks[";".join(reversed(stack))] += 1
+            del frames
+            self.samples += 1
+            self.sampler_time_s += time.perf_counter() - started
+
+    def finish(self, directory: str, metadata: Dict[str, Any]) -> None:
+        """Encerra a amostragem e grava os arquivos (executado fora do event loop)."""
+        self.stop()
+        self.save(directory, metadata)
+
+    def save(self, directory: str, metadata: Dict[str, Any]) -> None:
+        """Grava <file_id>.folded, .alloc.txt/.tracemalloc (se ativo) e .json em `directory`."""
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, self.file_id)
+        with open(f"{base}.folded", "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        if self.allocations is not None:
+            self.allocations.dump(f"{base}.tracemalloc")
+            top = self.allocations.compare_to(self._snapshot_start, "lineno")[:settings.PROFILING_TOP_ALLOCATIONS]
+            with open(f"{base}.alloc.txt", "w", encoding="utf-8") as f:
+                f.write("\n".join(str(stat) for stat in top) + "\n")
+
+        metadata = {
+            **metadata, "request_id": self.request_id, "file_id": self.file_id, "trigger": self.trigger, "samples": self.samples,
+            "interval_ms": settings.PROFILING_INTERVAL_MS, "sampler_time_s": round(self.sampler_time_s, 4),
+            "tracemalloc": self.allocations is not None,
+        }
+        with open(f"{base}.json", "w", encoding="utf-8") as f:
+            json.dump(metadata, f, ensure_ascii=False, indent=2)
+
+def profiled_call(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Executa `func` na thread atual incluindo-a no profiler da requisição, se houver um ativo."""
+    profile = _active_profile.get()
+    if profile is None:
+        return func(*args, **kwargs)
+    thread_id = threading.get_ident()
+    profile.register_thread(thread_id)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        profile.unregister_thread(thread_id)
+
+async def run_in_thread(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """run_in_threadpool que inclui a thread no profiler da requisição, se houver um ativo."""
+    return await run_in_threadpool(profiled_call, func, *args, **kwargs)
+
+def profiled(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Decorador de endpoints síncronos: o FastAPI os executa no threadpool, fora dos pools
+    de admissão; assim a thread também entra nas amostras da requisição perfilada.
+    """
+    @functools.wraps(endpoint)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        return profiled_call(endpoint, *args, **kwargs)
+    return wrapper
+
+class ProfilingMiddleware:
+    """
+    Perfila requisições sob demanda: com o cabeçalho X-GeoPrumo-Profile igual a
+    PROFILING_ADMIN_TOKEN ou por sorteio (PROFILING_SAMPLE_RATE), apenas nos caminhos
+    de PROFILING_PATHS. O id do perfil (X-Request-ID enviado pelo cliente ou um novo)
+    volta no cabeçalho X-Request-ID e fica no .json; os arquivos gravados em PROFILING_DIR
+    se chamam <id>-<sufixo aleatório>, e o nome sai no cabeçalho X-GeoPrumo-Profile-File.
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.paths = tuple(p.strip() for p in settings.PROFILING_PATHS.split(",") if p.strip())
+        self.token = settings.PROFILING_ADMIN_TOKEN.encode("utf-8")
+
+    def _trigger(self, scope: Scope) -> Optional[str]:
+        if not scope["path"].startswith(self.paths):
+            return None
+        if self.token:
+            for name, value in scope["headers"]:
+                if name == b"x-geoprumo-profile" and hmac.compare_digest(value, self.token):
+                    return "admin"
+        if settings.PROFILING_SAMPLE_RATE > 0 and random.random() < settings.PROFILING_SAMPLE_RATE:
+            return "sample"
+        return None
+
+    @staticmethod
+    def _request_id(scope: Scope) -> str:
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")
+                if REQUEST_ID_PATTERN.match(request_id):
+                    return request_id
+        return uuid.uuid4().hex
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        trigger = self._trigger(scope) if scope["type"] == "http" else None
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        request_id = self._request_id(scope)
+        status_code = None
+
+        async def send_with_id(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-request-id", request_id.encode("latin-1")),
+                    (b"x-geoprumo-profile-file", profile.file_id.encode("latin-1")),
+                ]
+            await send(message)
+
+        PROFILED_REQUESTS.labels(trigger).inc()
+        profile = RequestProfile(request_id, trigger)
+        token = _active_profile.set(profile)
+        profile.start()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            duration_s = time.perf_counter() - started
+            _active_profile.reset(token)
+            profile.unregister_thread(threading.get_ident())
+            metadata = {"method": scope["method"], "path": scope["path"], "status": status_code, "duration_s": round(duration_s, 4)}
+            try:
+                # Encerramento e gravação fora do event loop; a resposta já foi enviada
+                await run_in_threadpool(profile.finish, settings.PROFILING_DIR, metadata)
+            except OSError as e:
+                print(f"Não foi possível gravar o perfil {request_id}: {e}")
@@ -0,0 +1,169 @@
+# geoprumo/backend/app/core/resilience.py
+
+import asyncio
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.core.metrics import CIRCUIT_STATE
+
+# Mensagem do cancelamento das tentativas que perderam um hedge (o serviço respondeu na outra)
+HEDGE_LOST = "hedge_lost"
+
+class CircuitOpenError(ConnectionError):
+    """Levantado quando o circuito está aberto e a chamada nem chega a ser feita."""
+
+class CircuitBreaker:
+    """
+    Disjuntor (circuit breaker) para chamadas a serviços externos.
+    Só contam como falha os erros que `is_failure` reconhece como indisponibilidade do
+    serviço (por padrão, qualquer exceção) e as chamadas canceladas por prazo depois de
+    `slow_call_s` (as que perderam um hedge não contam); erros próprios da requisição apenas propagam. Chamadas lentas que terminam são contadas,
+    mas não abrem o circuito. Após `failure_threshold` falhas seguidas o circuito abre e recusa
+    chamadas por `recovery_timeout_s`. Depois disso, uma única chamada de teste (meio-aberto)
+    decide se o circuito fecha novamente ou volta a abrir.
+    """
+    CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+    _STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, name: str, failure_threshold: int, recovery_timeout_s: float, slow_call_s: float,
+                 is_failure: Optional[Callable[[Exception], bool]] = None):
+        self.name = name
+        self.is_failure = is_failure or (lambda error: True)
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout_s = recovery_timeout_s
+        self.slow_call_s = slow_call_s
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_in_flight = False
+        self._last_error: Optional[str] = None
+        self._counts = {"success": 0, "failure": 0, "slow": 0, "rejected": 0}
+        breakers[name] = self
+        CIRCUIT_STATE.labels(name).set(0)
+
+    def _set_state(self, state: str) -> None:
+        self._state = state
+        CIRCUIT_STATE.labels(self.name).set(self._STATE_VALUES[state])
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout_s:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow_request(self) -> bool:
+        """Indica se uma chamada pode ser feita agora (e reserva a chamada de teste no meio-aberto)."""
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout_s:
+                self._set_state(self.HALF_OPEN)
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self._counts["rejected"] += 1
+            return False
+
+    def record_success(self, duration_s: float) -> None:
+        """O serviço respondeu: fecha o circuito (chamadas lentas só entram na contagem)."""
+        with self._lock:
+            if duration_s > self.slow_call_s:
+                self._counts["slow"] += 1
+            self._counts["success"] += 1
+            self._consecutive_failures = 0
+            self._probe_in_flight = False
+            self._set_state(self.CLOSED)
+
+    def release_probe(self) -> None:
+        """Libera a chamada de teste sem registrar resultado (ex.: chamada cancelada)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self, error: str) -> None:
+        with self._lock:
+            self._counts["failure"] += 1
+            self._consecutive_failures += 1
+            self._last_error = error
+            self._probe_in_flight = False
+            if self._state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._set_state(self.OPEN)
+
+    async def call(self, func: Callable[..., Awaitable[Any]], *args: Any, **kwargs: Any) -> Any:
+        """Executa a corrotina `func` protegida pelo disjuntor."""
+        if not self.allow_request():
+            raise CircuitOpenError(f"Circuito '{self.name}' aberto: serviço indisponível no momento.")
+        start = time.monotonic()
+        try:
+            result = await func(*args, **kwargs)
+        except asyncio.CancelledError as e:
+            # Cancelada por prazo: só conta como falha se já estava lenta.
+            # Perder um hedge é neutro: a outra tentativa já teve resposta do serviço.
+            elapsed = time.monotonic() - start
+            if elapsed > self.slow_call_s and HEDGE_LOST not in e.args:
+                self.record_failure(f"cancelada após {elapsed:.1f} s")
+            else:
+                self.release_probe()
+            raise
+        except Exception as e:
+            if self.is_failure(e):
+                self.record_failure(str(e))
+            else:
+                # Erro da própria requisição (ex.: 4xx): o serviço está no ar
+                self.record_success(time.monotonic() - start)
+            raise
+        self.record_success(time.monotonic() - start)
+        return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Estado atual do disjuntor, para observabilidade."""
+        state = self.state
+        with self._lock:
+            return {
+                "name": self.name,
+                "state": state,
+                "consecutive_failures": self._consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "seconds_since_open": time.monotonic() - self._opened_at if self._opened_at else None,
+                "last_error": self._last_error,
+                "counts": dict(self._counts),
+            }
+
+# Registro de todos os disjuntores criados na aplicação
+breakers: Dict[str, CircuitBreaker] = {}
+
+async def hedged_call(func: Callable[[], Awaitable[Any]], hedge_delay_s: float, max_attempts: int = 2) -> Any:
+    """
+    Executa a corrotina criada por `func` e, se não houver resposta em `hedge_delay_s`
+    (ou se a tentativa falhar), dispara outra tentativa em paralelo, até `max_attempts`.
+    Retorna o primeiro resultado bem-sucedido e cancela as tentativas restantes (com a
+    mensagem HEDGE_LOST, que o CircuitBreaker não conta como falha); se todas falharem,
+    relança o último erro.
+    """
+    if hedge_delay_s <= 0 or max_attempts <= 1:
+        return await func()
+
+    pending = {asyncio.ensure_future(func())}
+    attempts, last_error = 1, None
+    won = False
+    try:
+        while pending:
+            timeout = hedge_delay_s if attempts < max_attempts else None
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    won = True
+                    return task.result()
+                last_error = task.exception()
+            # Nenhum resultado bem-sucedido ainda: dispara mais uma tentativa, se permitido
+            if attempts < max_attempts:
+                pending.add(asyncio.ensure_future(func()))
+                attempts += 1
+        raise last_error
+    finally:
+        for task in pending:
+            # Sem vencedora (ex.: a chamada toda foi cancelada por prazo), o cancelamento é comum
+            task.cancel(msg=HEDGE_LOST if won else None)
@@ -0,0 +1,70 @@
+# geoprumo/backend/app/core/responses.py
+
+import json
+from typing import Any, Iterable
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import settings
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    from brotli_asgi import BrotliMiddleware
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+def dumps(content: Any) -> bytes:
+    """Serializa para JSON compacto em UTF-8; usa orjson quando instalado (também aceita tipos NumPy)."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    """
+    Resposta JSON serializada pelo orjson.
+    Retornar esta resposta de um endpoint faz o FastAPI pular a validação pelo
+    `response_model`: use apenas com dados montados pelo próprio servidor
+    (ex.: PointStore.to_records()), nunca com dados vindos do cliente sem validação.
+    """
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+class CompressionMiddleware:
+    """
+    Comprime as respostas conforme o Accept-Encoding do cliente: brotli quando
+    o brotli-asgi está instalado (com gzip como alternativa), senão gzip.
+    Respostas em streaming listadas em `skip_paths` passam sem compressão, para
+    que cada linha chegue ao cliente assim que é gerada.
+    """
+    def __init__(self, app: ASGIApp, skip_paths: Iterable[str] = ()):
+        self.app = app
+        self.skip_paths = frozenset(skip_paths)
+        if BROTLI_AVAILABLE:
+            self.compressed = BrotliMiddleware(
+                app, quality=settings.BROTLI_QUALITY, minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+                gzip_fallback=True
+            )
+        else:
+            self.compressed = GZipMiddleware(
+                app, minimum_size=settings.COMPRESSION_MINIMUM_SIZE, compresslevel=settings.GZIP_COMPRESSION_LEVEL
+            )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+        await self.compressed(scope, receive, send)
+
+def install_compression(app: FastAPI, skip_paths: Iterable[str] = ()) -> None:
+    """Registra a compressão de respostas na aplicação (também usado pelos benchmarks)."""
+    if settings.COMPRESSION_MINIMUM_SIZE > 0:
+        app.add_middleware(CompressionMiddleware, skip_paths=skip_paths)
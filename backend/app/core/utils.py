@@ -1,6 +1,37 @@
 # geoprumo/backend/app/core/utils.py
 
+from __future__ import annotations
+
+import importlib
 import math
+import os
+import threading
+from typing import Any
+
+class LazyModule:
+    """
+    Acesso tardio a um módulo pesado (pandas, numpy): a importação acontece no primeiro
+    atributo lido (ex.: `pd.DataFrame`), e não na subida do servidor. Depois disso cada
+    atributo fica guardado na instância e o acesso custa o mesmo que no módulo real.
+    As anotações de tipo com esses módulos ficam como texto (from __future__ import annotations).
+    """
+    def __init__(self, name: str):
+        self._name = name
+        self._lock = threading.Lock()
+
+    def __getattr__(self, attribute: str) -> Any:
+        if attribute.startswith("__"):
+            raise AttributeError(attribute)
+        with self._lock:
+            value = getattr(importlib.import_module(self._name), attribute)
+            setattr(self, attribute, value)
+        return value
+
+    def __repr__(self) -> str:
+        return f"<módulo tardio {self._name!r}>"
+
+# Importação tardia: numpy só é carregado no primeiro uso
+np = LazyModule("numpy")
 
 def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> int:
     """
@@ -36,4 +67,28 @@ def decimal_to_dms(deg: float, is_lat: bool) -> str:
         direction = 'E' if deg >= 0 else 'W'
         
     # CORREÇÃO: A f-string foi reescrita para ter a sintaxe correta.
-    return f"{abs(d)}°{m}'{s:.2f}\" {direction}"
\ No newline at end of file
+    return f"{abs(d)}°{m}'{s:.2f}\" {direction}"
+
+def haversine_many(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """
+    Versão vetorizada (NumPy, com broadcasting) de haversine_distance.
+    Retorna as distâncias em metros, truncadas para inteiros como na versão escalar.
+    """
+    R = 6371000  # Raio da Terra em metros
+    lat1_rad, lon1_rad = np.radians(lat1), np.radians(lon1)
+    lat2_rad, lon2_rad = np.radians(lat2), np.radians(lon2)
+
+    a = np.sin((lat2_rad - lat1_rad) / 2)**2 + np.cos(lat1_rad) * np.cos(lat2_rad) * np.sin((lon2_rad - lon1_rad) / 2)**2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    return (R * c).astype(np.int32)
+
+def haversine_matrix(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """Matriz de distâncias (metros, int32) entre todos os pares de pontos."""
+    return haversine_many(lat[:, None], lon[:, None], lat[None, :], lon[None, :])
+
+def available_cpus() -> int:
+    """Núcleos que o processo pode usar (respeita afinidade de CPU, ex.: limites de contêiner via cpuset)."""
+    try:
+        return len(os.sched_getaffinity(0)) or 1
+    except AttributeError: # sched_getaffinity não existe no Windows nem no macOS
+        return os.cpu_count() or 1
@@ -6,7 +6,11 @@ from typing import List
 
 # --- Importações ---
 from app.models.schemas import Point # Reutilizamos o schema de Ponto
+from app.models.point_store import PointStore
 from app.services.exporter import Exporter
+from app.core.metrics import stage_timer
+from app.core.admission import check_point_budget, parse_pool
+from app.core.profiling import profiled
 
 # --- Configuração ---
 router = APIRouter(
@@ -14,36 +18,45 @@ router = APIRouter(
     tags=["Exportação de Rotas"]
 )
 exporter = Exporter()
+EXPORT_FORMATS = ("csv", "kml", "gpx", "geojson", "mymaps")
 
 @router.post("/{file_format}")
-def export_route(file_format: str, points: List[Point] = Body(...)):
+async def export_route(file_format: str, points: List[Point] = Body(...)):
     """
     Endpoint genérico para exportar uma rota para diferentes formatos.
     Recebe a lista de pontos e o formato desejado (csv, kml, gpx, geojson, mymaps).
+    A geração do arquivo roda no pool de leitura (controle de admissão).
     """
     if not points:
         raise HTTPException(status_code=400, detail="A lista de pontos não pode estar vazia.")
 
-    points_dict = [p.dict() for p in points]
+    if file_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=404, detail=f"Formato de arquivo '{file_format}' não suportado.")
+    check_point_budget(len(points))
+
+    with stage_timer(f"export_{file_format}"):
+        return await parse_pool.run(_export, file_format, PointStore.from_points(points))
 
+def _export(file_format: str, points_store: PointStore) -> Response:
+    """Gera o arquivo no formato pedido (já validado em EXPORT_FORMATS)."""
     if file_format == "csv":
-        content = exporter.to_csv(points_dict)
+        content = exporter.to_csv(points_store)
         return Response(content=content, media_type="text/csv", headers={'Content-Disposition': 'attachment; filename=rota_otimizada.csv'})
     
     elif file_format == "kml":
-        content = exporter.to_kml(points_dict)
+        content = exporter.to_kml(points_store)
         return Response(content=content, media_type="application/vnd.google-earth.kml+xml", headers={'Content-Disposition': 'attachment; filename=rota_otimizada.kml'})
 
     elif file_format == "gpx":
-        content = exporter.to_gpx(points_dict)
+        content = exporter.to_gpx(points_store)
         return Response(content=content, media_type="application/gpx+xml", headers={'Content-Disposition': 'attachment; filename=rota_otimizada.gpx'})
 
     elif file_format == "geojson":
-        content = exporter.to_geojson(points_dict)
+        content = exporter.to_geojson(points_store)
         return Response(content=content, media_type="application/geo+json", headers={'Content-Disposition': 'attachment; filename=rota_otimizada.geojson'})
 
     elif file_format == "mymaps":
-        content = exporter.to_mymaps_csv(points_dict)
+        content = exporter.to_mymaps_csv(points_store)
         return Response(content=content, media_type="text/csv", headers={'Content-Disposition': 'attachment; filename=rota_para_mymaps.csv'})
 
     else:
@@ -51,6 +64,7 @@ def export_route(file_format: str, points: List[Point] = Body(...)):
 
 
 @router.post("/google-maps-links", response_model=List[str])
+@profiled
 def get_google_maps_links(points: List[Point] = Body(...)):
     """
     Gera e retorna uma lista de URLs do Google Maps para a rota otimizada.
@@ -59,8 +73,7 @@ def get_google_maps_links(points: List[Point] = Body(...)):
         raise HTTPException(status_code=400, detail="A lista de pontos não pode estar vazia.")
 
     try:
-        points_dict = [p.dict() for p in points]
-        urls = exporter.generate_google_maps_links(points_dict)
+        urls = exporter.generate_google_maps_links(PointStore.from_points(points))
         return urls
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao gerar links do Google Maps: {e}")
\ No newline at end of file
@@ -14,7 +14,7 @@ geocode_service = GeocodeService()
 parser = DataParser()
 
 @router.get("/search")
-def search_address(q: str = Query(..., min_length=3)):
+async def search_address(q: str = Query(..., min_length=3)):
     """
     Recebe um texto (q), tenta extrair coordenadas diretas.
     Se não conseguir, usa a geocodificação para encontrar o endereço.
@@ -24,7 +24,7 @@ def search_address(q: str = Query(..., min_length=3)):
         return { "name": q, "latitude": coords[0], "longitude": coords[1] }
     
     try:
-        result = geocode_service.geocode_address(q)
+        result = await geocode_service.geocode_address(q)
         if result:
             lat, lon, name = result
             return { "name": name, "latitude": lat, "longitude": lon }
@@ -35,12 +35,12 @@ def search_address(q: str = Query(..., min_length=3)):
 
 # NOVO ENDPOINT DE AUTOCOMPLETE
 @router.get("/autocomplete", response_model=List[str])
-def autocomplete_address_search(q: str = Query(..., min_length=3)):
+async def autocomplete_address_search(q: str = Query(..., min_length=3)):
     """
     Fornece sugestões de endereço em tempo real com base na entrada do usuário.
     """
     try:
-        suggestions = geocode_service.autocomplete_address(q)
+        suggestions = await geocode_service.autocomplete_address(q)
         return suggestions
     except Exception as e:
         # Retorna uma lista vazia em caso de erro no servidor
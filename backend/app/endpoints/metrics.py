@@ -0,0 +1,26 @@
+# geoprumo/backend/app/endpoints/metrics.py
+
+from fastapi import APIRouter
+from fastapi.responses import Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from app.core.resilience import breakers
+from app.core.admission import pools
+
+# --- Configuração ---
+router = APIRouter(tags=["Observabilidade"])
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    """Exibe as métricas da aplicação no formato de texto do Prometheus."""
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+@router.get("/health/upstreams")
+def upstreams_health():
+    """Estado dos disjuntores que protegem as chamadas a serviços externos."""
+    return {name: breaker.snapshot() for name, breaker in breakers.items()}
+
+@router.get("/health/admission")
+def admission_health():
+    """Ocupação, fila e recusas de cada pool de admissão (solver, leitura, rede)."""
+    return {name: pool.snapshot() for name, pool in pools.items()}
@@ -1,16 +1,28 @@
 # geoprumo/backend/app/endpoints/process.py
 
 from fastapi import APIRouter, HTTPException, Body
-import pandas as pd
+from fastapi.responses import StreamingResponse
+import asyncio
 import base64
 import re
-from typing import List
+from typing import Any, AsyncIterator, Dict, List, Optional
 
 # --- Importações ---
-from app.models.schemas import ProcessRequest, ProcessResponse, Point, SummaryOutput, EnrichRequest
+from app.models.schemas import ProcessRequest, ProcessResponse, Point, EnrichRequest, BulkProcessRequest, BulkRouteSet
+from app.models.point_store import PointStore
 from app.services.data_parser import DataParser
 from app.services.optimizer import RouteOptimizer
-from app.services.ai_services import AIServices
+from app.services.bulk_optimizer import SharedDistanceMatrix, SharedMatrixRef, bulk_optimizer
+from app.core.clients import shared_clients
+from app.core.config import settings
+from app.core.utils import LazyModule
+from app.core.admission import check_byte_budget, check_point_budget, io_pool, parse_pool
+from app.core.profiling import profiled, run_in_thread
+from app.core.responses import FastJSONResponse, dumps
+from app.core.metrics import collect_timings, stage_timer, observe_points, BULK_ROUTES
+
+# Importação tardia: pandas só é carregado na primeira requisição que o usa
+pd = LazyModule("pandas")
 
 # --- Configuração ---
 router = APIRouter(
@@ -21,92 +33,258 @@ parser = DataParser()
 optimizer = RouteOptimizer()
 
 @router.post("/optimize", response_model=ProcessResponse)
-def optimize(request: ProcessRequest = Body(...)):
+async def optimize(request: ProcessRequest = Body(...)):
     """
     Endpoint para análise, limpeza e otimização de rota.
     Consolida os pontos existentes com os novos dados de forma robusta.
+    As chamadas externas são assíncronas; as etapas de CPU rodam no threadpool.
     """
-    try:
-        all_dfs = []
-
-        if request.existing_points:
-            existing_points_data = [p.dict() for p in request.existing_points]
-            df_existing = pd.DataFrame(existing_points_data)
-            df_existing.rename(columns={'name': 'Nome', 'latitude': 'Latitude', 'longitude': 'Longitude', 'observations': 'Observations'}, inplace=True)
-            all_dfs.append(df_existing)
+    with collect_timings() as timings:
+        try:
+            with stage_timer("total"):
+                payload = await _optimize(request)
+            if request.options.include_timings:
+                payload["timings"] = timings
+            # Dados montados pelo servidor: vão direto para o orjson, sem revalidar pelo ProcessResponse
+            return FastJSONResponse(content=payload)
+        except HTTPException:
+            raise
+        except (ConnectionError, ValueError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Um erro inesperado ocorreu no servidor: {e}")
 
-        # Processar Arquivos
-        for file_input in request.files:
+def _parse_files(request: ProcessRequest) -> List["pd.DataFrame"]:
+    """Decodifica e analisa os arquivos enviados (CPU, executado no pool de leitura)."""
+    all_dfs = []
+    for file_input in request.files:
+        with stage_timer("decode"):
             content_bytes = base64.b64decode(file_input.content)
-            df = pd.DataFrame()
-            if file_input.filename.lower().endswith(('.csv', '.xlsx')): df = parser._parse_csv_or_excel(content_bytes, is_excel=file_input.filename.lower().endswith('.xlsx'))
-            elif file_input.filename.lower().endswith('.kml'): df = parser._parse_kml(content_bytes)
-            elif file_input.filename.lower().endswith('.gpx'): df = parser._parse_gpx(content_bytes)
-            if not df.empty: all_dfs.append(df)
-        
-        # Processar Links
-        for link in request.links:
-            df = pd.DataFrame()
-            if re.search(r"mid=([a-zA-Z0-9_-]+)", link):
-                df = parser.parse_mymaps_link(link)
-            else: # Se não for My Maps, trata como um link de ponto único
-                coords = parser.extract_coords_from_text(link)
-                if coords:
-                    df = pd.DataFrame([{"Nome": link, "Latitude": coords[0], "Longitude": coords[1]}])
-            if not df.empty: all_dfs.append(df)
-
-        # Processar Textos
-        for text_input in request.texts:
+        df = pd.DataFrame()
+        filename = file_input.filename.lower()
+        if filename.endswith('.csv'):
+            with stage_timer("parse_csv"): df = parser._parse_csv_or_excel(content_bytes, is_excel=False)
+        elif filename.endswith('.xlsx'):
+            with stage_timer("parse_excel"): df = parser._parse_csv_or_excel(content_bytes, is_excel=True)
+        elif filename.endswith('.kml'):
+            with stage_timer("parse_kml"): df = parser._parse_kml(content_bytes)
+        elif filename.endswith('.gpx'):
+            with stage_timer("parse_gpx"): df = parser._parse_gpx(content_bytes)
+        if not df.empty: all_dfs.append(df)
+    return all_dfs
+
+async def _parse_link(link: str) -> "pd.DataFrame":
+    """Analisa um link: links do My Maps são buscados na rede (com cache), os demais viram um ponto único."""
+    if re.search(r"mid=([a-zA-Z0-9_-]+)", link):
+        async with io_pool.slot():
+            return await parser.parse_mymaps_link(link)
+    coords = parser.extract_coords_from_text(link)
+    if coords:
+        return pd.DataFrame([{"Nome": link, "Latitude": coords[0], "Longitude": coords[1]}])
+    return pd.DataFrame()
+
+async def _parse_links(links: List[str]) -> List["pd.DataFrame"]:
+    """Busca todos os links da requisição ao mesmo tempo, preservando a ordem original."""
+    with stage_timer("links"):
+        dfs = await asyncio.gather(*(_parse_link(link) for link in links))
+    return [df for df in dfs if not df.empty]
+
+def _parse_texts(texts: List[str]) -> List["pd.DataFrame"]:
+    """Analisa os textos colados pelo usuário (CPU, executado no pool de leitura)."""
+    all_dfs = []
+    with stage_timer("parse_text"):
+        for text_input in texts:
             if text_input.strip():
                 df = parser._parse_csv_or_excel(text_input.encode('utf-8'), is_excel=False)
                 if not df.empty: all_dfs.append(df)
-        
-        if not all_dfs: raise HTTPException(status_code=400, detail="Nenhum dado válido encontrado para processar.")
+    return all_dfs
+
+def _consolidate(request: ProcessRequest, all_dfs: List["pd.DataFrame"]) -> PointStore:
+    """Padroniza, limpa e junta os novos dados aos pontos existentes (CPU, executado no pool de leitura)."""
+    # Pontos já processados vão direto para o PointStore, sem passar por DataFrame.
+    # Os novos dados recebem original_index a partir do fim da lista existente.
+    index_offset = len(request.existing_points or [])
 
+    clean_df = pd.DataFrame()
+    if all_dfs:
         raw_df = pd.concat(all_dfs, ignore_index=True)
         if 'original_index' in raw_df.columns: raw_df = raw_df.drop(columns=['original_index'])
-        raw_df.reset_index(inplace=True); raw_df.rename(columns={'index': 'original_index'}, inplace=True)
-
-        standardized_df = parser._auto_detect_and_standardize_columns(raw_df)
-        clean_df = parser.clean_and_validate_data(standardized_df)
-
-        if clean_df.empty: raise HTTPException(status_code=400, detail="Nenhum ponto com coordenadas válidas foi encontrado.")
-
-        optimization_result = optimizer.optimize_route(clean_df, mode=request.options.optimization_mode)
-        optimized_df = optimization_result["data"].copy()
-        
-        column_mapping = {'Nome': 'name', 'Latitude': 'latitude', 'Longitude': 'longitude', 'observations': 'observations', 'original_index': 'original_index'}
-        optimized_df.rename(columns={k: v for k,v in column_mapping.items() if k in optimized_df.columns}, inplace=True)
-        
-        if 'name' not in optimized_df.columns: optimized_df['name'] = [f"Ponto {i+1}" for i in range(len(optimized_df))]
-        optimized_df['order'] = range(1, len(optimized_df) + 1)
-        
-        records = optimized_df.to_dict(orient='records')
-        route_points = [Point(**{k: v for k, v in p.items() if pd.notna(v)}) for p in records]
-        
-        summary = None
-        if "distance" in optimization_result and "duration" in optimization_result:
-            summary = SummaryOutput(distance_km=optimization_result["distance"], duration_min=optimization_result["duration"])
+        raw_df['original_index'] = range(index_offset, index_offset + len(raw_df))
+        observe_points("input", index_offset + len(raw_df))
 
-        return ProcessResponse(
-            status="success", message="Rota atualizada e reotimizada com sucesso!",
-            optimized_route=route_points, summary=summary, map_geojson=optimization_result.get("geojson")
-        )
+        with stage_timer("standardize"):
+            standardized_df = parser._auto_detect_and_standardize_columns(raw_df)
+        with stage_timer("clean"):
+            clean_df = parser.clean_and_validate_data(standardized_df)
 
-    except (ConnectionError, ValueError) as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    with stage_timer("build_store"):
+        points = parser.build_point_store(request.existing_points, clean_df)
+    observe_points("clean", len(points))
+    return points
+
+async def load_points(request: ProcessRequest, admitted: bool = False) -> PointStore:
+    """
+    Analisa arquivos, links e textos da requisição e junta tudo aos pontos existentes.
+    Compartilhado pelo /optimize, pela criação de sessões de rota e pelo /bulk.
+    Com `admitted`, quem chama já ocupa uma vaga do pool de leitura (ex.: o lote inteiro
+    do /bulk) e as etapas de CPU rodam direto no threadpool.
+    """
+    # Limite de pontos conferido antes de qualquer leitura (o de bytes fica no BodySizeLimitMiddleware)
+    check_point_budget(len(request.existing_points or []))
+    run = run_in_thread if admitted else parse_pool.run
+
+    # A ordem (arquivos, links, textos) define o original_index dos novos pontos
+    all_dfs = await run(_parse_files, request) if request.files else []
+    all_dfs += await _parse_links(request.links)
+    if request.texts:
+        all_dfs += await run(_parse_texts, request.texts)
+
+    if not all_dfs and not request.existing_points: raise HTTPException(status_code=400, detail="Nenhum dado válido encontrado para processar.")
+    check_point_budget(len(request.existing_points or []) + sum(len(df) for df in all_dfs))
+
+    # Só pontos já processados: nada a ler, a montagem do PointStore não ocupa o pool de leitura
+    points = await (run if all_dfs else run_in_thread)(_consolidate, request, all_dfs)
+    if len(points) == 0: raise HTTPException(status_code=400, detail="Nenhum ponto com coordenadas válidas foi encontrado.")
+    return points
+
+async def _optimize(request: ProcessRequest) -> Dict[str, Any]:
+    """Pipeline do /optimize, com cada etapa medida por stage_timer; retorna o corpo do ProcessResponse."""
+    points = await load_points(request)
+
+    with stage_timer("optimize"):
+        optimization_result = await optimizer.optimize_route(points, mode=request.options.optimization_mode)
+
+    summary = None
+    if "distance" in optimization_result and "duration" in optimization_result:
+        summary = {"distance_km": optimization_result["distance"], "duration_min": optimization_result["duration"]}
+
+    # Os pontos saem do PointStore já no formato do schema Point, sem criar um objeto Pydantic por ponto
+    with stage_timer("response"):
+        route_points = await run_in_thread(optimization_result["data"].to_records)
+    observe_points("route", len(route_points))
+
+    degraded = optimization_result.get("degraded", False)
+    message = "Rota atualizada e reotimizada com sucesso!"
+    if degraded:
+        message = "Serviço de rotas online indisponível: rota otimizada no modo offline."
+
+    return {
+        "status": "success", "message": message, "optimized_route": route_points, "summary": summary,
+        "map_geojson": optimization_result.get("geojson"), "degraded": degraded, "timings": None
+    }
+
+@router.post("/bulk")
+async def optimize_bulk(request: BulkProcessRequest = Body(...)):
+    """
+    Otimiza várias rotas independentes em uma única requisição.
+    Os arquivos das rotas são lidos antes do streaming, ocupando uma única vaga do pool
+    de leitura. As rotas offline são resolvidas em paralelo em um pool de processos, dentro
+    das vagas do solver; o lote é recusado (429) se não couber no prazo. A resposta é
+    NDJSON: uma linha por rota, enviada assim que ela termina (não na ordem do pedido).
+    Uma rota com erro gera uma linha com status "error" sem interromper as demais.
+    """
+    if not request.routes:
+        raise HTTPException(status_code=400, detail="Nenhuma rota enviada.")
+    if len(request.routes) > settings.BULK_MAX_ROUTES:
+        raise HTTPException(status_code=400, detail=f"O lote aceita no máximo {settings.BULK_MAX_ROUTES} rotas.")
+    # Os limites de pontos e de bytes valem para o lote inteiro, não só para cada rota
+    check_point_budget(sum(len(route.existing_points or []) for route in request.routes))
+    check_byte_budget(sum(_input_bytes(route) for route in request.routes), settings.BULK_MAX_INPUT_BYTES)
+    # O lote ocupa uma única vaga do pool de leitura (429 antes de começar o streaming);
+    # as rotas são lidas em sequência dentro dela e a leitura para assim que o total de
+    # pontos passa do limite (413)
+    loaded = []
+    total_points = 0
+    async with parse_pool.slot():
+        for route in request.routes:
+            points = await _load_route(route)
+            if not isinstance(points, Exception):
+                total_points += len(points)
+                check_point_budget(total_points)
+            loaded.append(points)
+    # As rotas offline ocupam vagas do solver: o lote todo é admitido (ou recusado com 429) aqui
+    bulk_optimizer.admit(sum(
+        1 for route, points in zip(request.routes, loaded)
+        if not isinstance(points, Exception) and bulk_optimizer.uses_pool(points, route.options.optimization_mode)
+    ))
+    return StreamingResponse(_bulk_results(request.routes, loaded), media_type="application/x-ndjson")
+
+def _input_bytes(route: BulkRouteSet) -> int:
+    """Tamanho dos arquivos (ainda em Base64) e dos textos de uma rota do lote."""
+    return sum(len(f.content) for f in route.files or []) + sum(len(text) for text in route.texts or [])
+
+async def _load_route(route: BulkRouteSet) -> Any:
+    """Lê os pontos de uma rota do lote; o erro é devolvido para virar a linha da rota."""
+    try:
+        return await load_points(route, admitted=True)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Um erro inesperado ocorreu no servidor: {e}")
+        return e
+
+def _bulk_error(i: int, route: BulkRouteSet, error: Exception) -> Dict[str, Any]:
+    detail = error.detail if isinstance(error, HTTPException) else str(error)
+    if not isinstance(error, (HTTPException, ConnectionError, ValueError)):
+        detail = f"Um erro inesperado ocorreu no servidor: {error}"
+    BULK_ROUTES.labels("error").inc()
+    return {"index": i, "name": route.name, "status": "error", "detail": detail}
+
+async def _bulk_route(i: int, route: BulkRouteSet, points: PointStore, shared: Optional[SharedMatrixRef]) -> Dict[str, Any]:
+    """Otimiza uma rota do lote e monta a linha de resposta (ou a linha de erro)."""
+    try:
+        result = await bulk_optimizer.optimize(points, route.options.optimization_mode, shared)
+        summary = None
+        if "distance" in result and "duration" in result:
+            summary = {"distance_km": result["distance"], "duration_min": result["duration"]}
+        records = await run_in_thread(result["data"].to_records)
+        BULK_ROUTES.labels("success").inc()
+        return {
+            "index": i, "name": route.name, "status": "success", "degraded": result.get("degraded", False),
+            "optimized_route": records, "summary": summary, "map_geojson": result.get("geojson")
+        }
+    except Exception as e:
+        return _bulk_error(i, route, e)
+
+async def _bulk_results(routes: List[BulkRouteSet], loaded: List[Any]) -> AsyncIterator[bytes]:
+    """Gera as linhas NDJSON do /bulk à medida que cada rota termina."""
+    parsed = []
+    for i, (route, points) in enumerate(zip(routes, loaded)):
+        if isinstance(points, Exception):
+            yield dumps(_bulk_error(i, route, points)) + b"\n"
+        else:
+            parsed.append((i, route, points))
+
+    # Rotas offline com muitos pontos em comum compartilham uma única matriz de distâncias
+    offline = [(i, points) for i, route, points in parsed if bulk_optimizer.uses_pool(points, route.options.optimization_mode)]
+    shared_matrix = None
+    if offline:
+        with stage_timer("bulk_shared_matrix"):
+            shared_matrix = await run_in_thread(SharedDistanceMatrix.build, [points for _, points in offline])
+    shared_refs = {i: shared_matrix.ref(k) for k, (i, _) in enumerate(offline)} if shared_matrix else {}
+
+    tasks = [asyncio.ensure_future(_bulk_route(i, route, points, shared_refs.get(i))) for i, route, points in parsed]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            line = await next_done
+            yield dumps(line) + b"\n"
+    finally:
+        # Cliente desconectado ou lote concluído: cancela o que restou e libera a memória compartilhada
+        for task in tasks:
+            task.cancel()
+        if shared_matrix is not None:
+            await asyncio.gather(*tasks, return_exceptions=True)
+            shared_matrix.release()
 
 @router.post("/enrich-with-ai", response_model=List[Point])
+@profiled
 def enrich_with_ai(request: EnrichRequest = Body(...)):
     try:
-        ai_services = AIServices()
+        ai_services = shared_clients.ai_services()
         points_data = [p.dict() for p in request.points]
         df = pd.DataFrame(points_data)
         df.rename(columns={'name': 'Nome', 'latitude': 'Latitude', 'longitude': 'Longitude'}, inplace=True)
-        enriched_df = ai_services.enrich_data(df)
-        final_df = ai_services.standardize_names(enriched_df)
+        with stage_timer("ai_enrich"):
+            enriched_df = ai_services.enrich_data(df)
+        with stage_timer("ai_standardize_names"):
+            final_df = ai_services.standardize_names(enriched_df)
         final_df.rename(columns={'Nome': 'name', 'address': 'address', 'category': 'category'}, inplace=True)
         return [Point(**p) for p in final_df.to_dict(orient='records')]
     except ValueError as e:
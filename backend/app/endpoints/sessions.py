@@ -0,0 +1,115 @@
+# geoprumo/backend/app/endpoints/sessions.py
+
+from fastapi import APIRouter, HTTPException, Body
+
+# --- Importações ---
+from app.models.schemas import ProcessRequest, SessionResponse, SessionOperationsRequest, SessionDiffResponse
+from app.services.optimizer import RouteOptimizer
+from app.services.route_sessions import RouteSession, route_sessions
+from app.services.clustering import cluster_index_for, parse_bbox
+from app.endpoints.process import load_points
+from app.core.metrics import stage_timer, observe_points
+from app.core.responses import FastJSONResponse
+from app.core.admission import check_point_budget
+from app.core.profiling import profiled, run_in_thread
+
+# --- Configuração ---
+router = APIRouter(
+    prefix="/api/v1/sessions",
+    tags=["Sessões de Rota"]
+)
+optimizer = RouteOptimizer()
+
+def _session_response(session: RouteSession, message: str = None, degraded: bool = False) -> FastJSONResponse:
+    # Dados montados pelo servidor: serializados direto, sem revalidar pelo SessionResponse
+    return FastJSONResponse(content={
+        "session_id": session.session_id, "version": session.version, "message": message, "degraded": degraded,
+        "optimized_route": session.route_records(), "summary": session.summary()
+    })
+
+def _get_session(session_id: str) -> RouteSession:
+    session = route_sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Sessão de rota não encontrada ou expirada.")
+    return session
+
+@router.post("", response_model=SessionResponse)
+async def create_session(request: ProcessRequest = Body(...)):
+    """
+    Processa e otimiza a rota como o /process/optimize e guarda o resultado no servidor.
+    As edições seguintes são enviadas como operações pequenas em /sessions/{id}/operations.
+    """
+    try:
+        points = await load_points(request)
+        with stage_timer("optimize"):
+            result = await optimizer.optimize_route(points, mode=request.options.optimization_mode)
+        with stage_timer("session_create"):
+            session = await run_in_thread(route_sessions.create, result["data"], request.options.optimization_mode)
+        observe_points("route", len(session.points))
+        degraded = result.get("degraded", False)
+        message = "Sessão de rota criada com sucesso!"
+        if degraded:
+            message = "Serviço de rotas online indisponível: rota otimizada no modo offline."
+        return await run_in_thread(_session_response, session, message, degraded)
+    except HTTPException:
+        raise
+    except (ConnectionError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Um erro inesperado ocorreu no servidor: {e}")
+
+@router.get("/{session_id}", response_model=SessionResponse)
+@profiled
+def get_session(session_id: str):
+    """Retorna a rota completa da sessão (ex.: ao recarregar a página)."""
+    session = _get_session(session_id)
+    with session.lock:
+        return _session_response(session)
+
+@router.post("/{session_id}/operations", response_model=SessionDiffResponse)
+@profiled
+def apply_operations(session_id: str, request: SessionOperationsRequest = Body(...)):
+    """
+    Aplica operações incrementais (add, remove, move, toggle, update) à rota da sessão.
+    Só os trechos alterados são reotimizados (distâncias em linha reta) e a resposta
+    traz apenas o que mudou.
+    """
+    session = _get_session(session_id)
+    with session.lock:
+        check_point_budget(len(session.points) + sum(1 for operation in request.operations if operation.op == "add"))
+        if request.base_version is not None and request.base_version != session.version:
+            raise HTTPException(
+                status_code=409,
+                detail=f"A sessão está na versão {session.version}; recarregue a rota antes de enviar novas alterações."
+            )
+        try:
+            with stage_timer("session_operations"):
+                diff = session.apply(request.operations)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        route_sessions.save(session, request.operations)
+        return FastJSONResponse(content=diff)
+
+@router.get("/{session_id}/clusters")
+@profiled
+def get_clusters(session_id: str, bbox: str, zoom: int):
+    """
+    Pontos da sessão agrupados para o mapa: apenas a área visível (bbox = 'oeste,sul,leste,norte')
+    no zoom atual, como GeoJSON. Agrupamentos têm `cluster: true` e `point_count`.
+    O índice é montado uma vez por versão da sessão e reaproveitado entre as consultas.
+    """
+    try:
+        area = parse_bbox(bbox)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    session = _get_session(session_id)
+    with session.lock:
+        with stage_timer("clusters"):
+            collection = cluster_index_for(session).query(area, zoom)
+    return FastJSONResponse(content=collection)
+
+@router.delete("/{session_id}")
+def delete_session(session_id: str):
+    if not route_sessions.delete(session_id):
+        raise HTTPException(status_code=404, detail="Sessão de rota não encontrada ou expirada.")
+    return {"status": "success", "message": "Sessão de rota removida."}
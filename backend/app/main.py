@@ -1,14 +1,33 @@
 # geoprumo/backend/app/main.py
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
-from app.endpoints import process, export, geocode
+from app.core.clients import shared_clients
+from app.core.config import settings
+from app.core.admission import BodySizeLimitMiddleware, pools
+from app.core.profiling import ProfilingMiddleware
+from app.core.responses import FastJSONResponse, install_compression
+from app.services.bulk_optimizer import bulk_optimizer
+from app.endpoints import process, export, geocode, metrics, sessions
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Cria os clientes compartilhados na subida e os libera no encerramento."""
+    await shared_clients.startup()
+    yield
+    await shared_clients.shutdown()
+    bulk_optimizer.shutdown()
+    for pool in pools.values():
+        pool.shutdown()
 
 app = FastAPI(
     title="GeoPrumo API",
     description="Backend para o otimizador de rotas GeoPrumo.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 # Lista de endereços (origens) que têm permissão para se comunicar com o backend
@@ -18,18 +37,30 @@ origins = [
     # Adicione aqui outros endereços se necessário (ex: o futuro endereço de produção na Render)
 ]
 
+# Corpos acima de MAX_REQUEST_BYTES são recusados (413) antes de chegar aos endpoints.
+# Registrado antes do CORS para ficar dentro dele: o 413 sai com os cabeçalhos CORS
+app.add_middleware(BodySizeLimitMiddleware, max_bytes=settings.MAX_REQUEST_BYTES)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
-    allow_methods=["GET", "POST", "OPTIONS"],
+    allow_methods=["GET", "POST", "DELETE", "OPTIONS"],
     allow_headers=["*"],
 )
 
+# Perfil sob demanda (token de admin ou amostragem); sem gatilho a requisição passa direto
+app.add_middleware(ProfilingMiddleware)
+
+# Compressão gzip/brotli; o /bulk fica de fora para manter o streaming linha a linha
+install_compression(app, skip_paths=["/api/v1/process/bulk"])
+
 # --- Endpoints (Rotas) ---
 app.include_router(process.router)
 app.include_router(export.router)
 app.include_router(geocode.router)
+app.include_router(sessions.router)
+app.include_router(metrics.router)
 
 @app.get("/", tags=["Root"])
 def read_root():
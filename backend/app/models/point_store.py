@@ -0,0 +1,233 @@
+# geoprumo/backend/app/models/point_store.py
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Sequence, Any
+
+from app.core.utils import LazyModule
+from app.models.schemas import Point
+
+# Importação tardia: numpy e pandas só são carregados no primeiro uso
+np = LazyModule("numpy")
+pd = LazyModule("pandas")
+
+# Colunas de texto guardadas de forma internada (cada valor distinto uma única vez)
+STRING_COLUMNS = ("name", "address", "category", "observations")
+
+# Nomes das colunas no DataFrame padronizado pelo DataParser -> nomes no PointStore
+DATAFRAME_COLUMNS = {'Nome': 'name', 'address': 'address', 'category': 'category', 'observations': 'observations'}
+
+class StringColumn:
+    """
+    Coluna de texto internada: guarda um vetor de códigos (int32) apontando
+    para uma lista de valores distintos. O código -1 representa valor ausente.
+    """
+    __slots__ = ("codes", "values")
+
+    def __init__(self, codes: np.ndarray, values: List[str]):
+        self.codes = codes
+        self.values = values
+
+    @classmethod
+    def from_values(cls, items: Sequence[Any]) -> "StringColumn":
+        """Cria a coluna a partir de uma sequência de valores (None/NaN viram ausentes)."""
+        raw = pd.Series(items, dtype=object)
+        present = raw.notna()
+        raw[present] = raw[present].astype(str)
+        codes, uniques = pd.factorize(raw, use_na_sentinel=True)
+        return cls(codes.astype(np.int32), list(uniques))
+
+    @classmethod
+    def missing(cls, length: int) -> "StringColumn":
+        return cls(np.full(length, -1, dtype=np.int32), [])
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def take(self, indices: np.ndarray) -> "StringColumn":
+        # A lista de valores é compartilhada; só os códigos são copiados.
+        return StringColumn(self.codes[indices], self.values)
+
+    def replace(self, i: int, value: Optional[str]) -> "StringColumn":
+        """Retorna uma cópia da coluna com o valor da posição `i` trocado."""
+        codes, values = self.codes.copy(), self.values
+        if value is None:
+            codes[i] = -1
+        elif value in values:
+            codes[i] = values.index(value)
+        else:
+            # A lista de valores pode ser compartilhada com outras colunas (take): copia antes de crescer
+            values = values + [value]
+            codes[i] = len(values) - 1
+        return StringColumn(codes, values)
+
+    def get(self, i: int) -> Optional[str]:
+        code = self.codes[i]
+        return self.values[code] if code >= 0 else None
+
+    def to_list(self) -> List[Optional[str]]:
+        values = self.values
+        return [values[c] if c >= 0 else None for c in self.codes.tolist()]
+
+    @staticmethod
+    def concat(columns: Sequence["StringColumn"]) -> "StringColumn":
+        """Concatena colunas, unificando as listas de valores distintos."""
+        lookup: Dict[str, int] = {}
+        values: List[str] = []
+        parts = []
+        for col in columns:
+            remap = np.empty(len(col.values) + 1, dtype=np.int32)
+            remap[-1] = -1 # posição -1 mantém o código de ausente
+            for i, value in enumerate(col.values):
+                code = lookup.get(value)
+                if code is None:
+                    code = lookup[value] = len(values)
+                    values.append(value)
+                remap[i] = code
+            parts.append(remap[col.codes])
+        codes = np.concatenate(parts) if parts else np.empty(0, dtype=np.int32)
+        return StringColumn(codes, values)
+
+
+class PointStore:
+    """
+    Armazenamento colunar e compacto dos pontos de uma rota, compartilhado pelo
+    DataParser, RouteOptimizer e Exporter.
+    Coordenadas, índices e flags ficam em vetores NumPy; textos ficam internados.
+    A conversão para o schema Pydantic (Point) acontece uma única vez, na resposta.
+    """
+    __slots__ = ("latitude", "longitude", "order", "original_index", "active", "strings")
+
+    def __init__(self, latitude: np.ndarray, longitude: np.ndarray, order: np.ndarray,
+                 original_index: np.ndarray, active: np.ndarray, strings: Dict[str, StringColumn]):
+        self.latitude = latitude
+        self.longitude = longitude
+        self.order = order
+        self.original_index = original_index
+        self.active = active
+        self.strings = strings
+
+    def __len__(self) -> int:
+        return len(self.latitude)
+
+    # --- Construção ---
+
+    @classmethod
+    def empty(cls) -> "PointStore":
+        return cls(np.empty(0), np.empty(0), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64),
+                   np.empty(0, dtype=bool), {})
+
+    @classmethod
+    def from_points(cls, points: Sequence[Point], keep_original_index: bool = False) -> "PointStore":
+        """
+        Cria o armazenamento a partir dos schemas Pydantic recebidos na requisição.
+        Por padrão o original_index é renumerado pela posição; com `keep_original_index`
+        os índices recebidos são mantidos (ex.: sessões de rota restauradas).
+        """
+        n = len(points)
+        latitude = np.fromiter((p.latitude for p in points), dtype=np.float64, count=n)
+        longitude = np.fromiter((p.longitude for p in points), dtype=np.float64, count=n)
+        order = np.fromiter((p.order for p in points), dtype=np.int64, count=n)
+        active = np.fromiter((p.active is not False for p in points), dtype=bool, count=n)
+        strings = {col: StringColumn.from_values([getattr(p, col) for p in points]) for col in STRING_COLUMNS}
+        if keep_original_index:
+            original_index = np.fromiter((int(p.original_index) for p in points), dtype=np.int64, count=n)
+        else:
+            original_index = np.arange(n, dtype=np.int64)
+        return cls(latitude, longitude, order, original_index, active, strings)
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> "PointStore":
+        """
+        Cria o armazenamento a partir de um DataFrame já limpo pelo DataParser
+        (colunas 'Latitude', 'Longitude' e, opcionalmente, 'Nome', 'observations', 'original_index').
+        """
+        n = len(df)
+        latitude = df['Latitude'].to_numpy(dtype=np.float64)
+        longitude = df['Longitude'].to_numpy(dtype=np.float64)
+        if 'original_index' in df.columns:
+            original_index = pd.to_numeric(df['original_index'], errors='coerce').fillna(-1).to_numpy(dtype=np.int64)
+        else:
+            original_index = np.arange(n, dtype=np.int64)
+        if 'active' in df.columns:
+            active = (df['active'] != False).to_numpy(dtype=bool)
+        else:
+            active = np.ones(n, dtype=bool)
+        strings = {
+            store_col: StringColumn.from_values(df[df_col].to_numpy(dtype=object))
+            for df_col, store_col in DATAFRAME_COLUMNS.items() if df_col in df.columns
+        }
+        return cls(latitude, longitude, np.arange(1, n + 1, dtype=np.int64), original_index, active, strings)
+
+    @staticmethod
+    def concat(stores: Sequence["PointStore"]) -> "PointStore":
+        """Concatena vários armazenamentos, preservando a ordem."""
+        stores = [s for s in stores if len(s)]
+        if not stores:
+            return PointStore.empty()
+        if len(stores) == 1:
+            return stores[0]
+        names = [col for col in STRING_COLUMNS if any(col in s.strings for s in stores)]
+        strings = {
+            col: StringColumn.concat([s.strings.get(col) or StringColumn.missing(len(s)) for s in stores])
+            for col in names
+        }
+        return PointStore(
+            np.concatenate([s.latitude for s in stores]),
+            np.concatenate([s.longitude for s in stores]),
+            np.concatenate([s.order for s in stores]),
+            np.concatenate([s.original_index for s in stores]),
+            np.concatenate([s.active for s in stores]),
+            strings
+        )
+
+    # --- Seleção ---
+
+    def take(self, indices) -> "PointStore":
+        """Retorna um novo armazenamento com as linhas nas posições indicadas (na ordem dada)."""
+        idx = np.asarray(indices)
+        return PointStore(
+            self.latitude[idx], self.longitude[idx], self.order[idx], self.original_index[idx],
+            self.active[idx], {col: s.take(idx) for col, s in self.strings.items()}
+        )
+
+    def valid_coordinates_mask(self) -> np.ndarray:
+        """Máscara dos pontos com coordenadas geograficamente válidas."""
+        lat, lon = self.latitude, self.longitude
+        return np.isfinite(lat) & np.isfinite(lon) & (np.abs(lat) <= 90) & (np.abs(lon) <= 180)
+
+    def lonlat_list(self) -> List[List[float]]:
+        """Coordenadas no formato [[lon, lat], ...] usado pelo OpenRouteService e GeoJSON."""
+        return np.column_stack((self.longitude, self.latitude)).tolist()
+
+    def column(self, name: str) -> List[Optional[str]]:
+        """Valores de uma coluna de texto como lista (None quando ausente)."""
+        col = self.strings.get(name)
+        return col.to_list() if col is not None else [None] * len(self)
+
+    # --- Saída ---
+
+    def to_records(self, orders: Optional[Sequence[int]] = None) -> List[Dict[str, Any]]:
+        """
+        Converte para uma lista de dicionários no formato do schema Point (com todos os
+        campos, como o Pydantic serializaria), numerando a ordem pela posição na rota.
+        Com `orders`, os pontos são parte de uma rota maior: cada um recebe a ordem dada,
+        também usada nos nomes gerados ("Ponto N") quando não há coluna de nome.
+        """
+        n = len(self)
+        orders = list(range(1, n + 1)) if orders is None else list(orders)
+        if "name" in self.strings:
+            names = ["Ponto" if name is None else name for name in self.strings["name"].to_list()]
+        else:
+            names = [f"Ponto {order}" for order in orders]
+        addresses, categories, observations = (self.column(col) for col in ("address", "category", "observations"))
+        return [
+            {"order": orders[i], "name": names[i], "latitude": lat, "longitude": lon, "address": addresses[i],
+             "category": categories[i], "original_index": idx, "observations": observations[i], "active": active}
+            for i, (lat, lon, idx, active) in enumerate(zip(self.latitude.tolist(), self.longitude.tolist(),
+                                                            self.original_index.tolist(), self.active.tolist()))
+        ]
+
+    def to_points(self) -> List[Point]:
+        """Converte para schemas Pydantic; usado apenas na fronteira da resposta."""
+        return [Point(**record) for record in self.to_records()]
@@ -9,6 +9,7 @@ class FileInput(BaseModel):
 
 class OptimizationOptions(BaseModel):
     optimization_mode: str = Field(default="online", description="Modo de otimização: 'online' ou 'offline'.")
+    include_timings: bool = Field(default=False, description="Se verdadeiro, a resposta inclui o tempo (ms) de cada etapa.")
 
 class Point(BaseModel):
     order: int
@@ -28,6 +29,12 @@ class ProcessRequest(BaseModel):
     existing_points: Optional[List[Point]] = Field(default=[], description="Lista de pontos já processados da rota atual.")
     options: OptimizationOptions = Field(default_factory=OptimizationOptions, description="Opções para a otimização.")
 
+class BulkRouteSet(ProcessRequest):
+    name: str = Field(..., description="Nome da rota (ex.: equipe ou veículo), repetido em cada resultado.")
+
+class BulkProcessRequest(BaseModel):
+    routes: List[BulkRouteSet] = Field(..., description="Rotas independentes a otimizar em paralelo.")
+
 class EnrichRequest(BaseModel):
     points: List[Point]
 
@@ -40,4 +47,48 @@ class ProcessResponse(BaseModel):
     message: str
     optimized_route: Optional[List[Point]] = None
     summary: Optional[SummaryOutput] = None
-    map_geojson: Optional[Dict[str, Any]] = None
\ No newline at end of file
+    map_geojson: Optional[Dict[str, Any]] = None
+    degraded: bool = Field(default=False, description="Verdadeiro quando a rota online foi substituída pela otimização offline.")
+    timings: Optional[Dict[str, float]] = Field(default=None, description="Tempo (ms) de cada etapa, quando solicitado.")
+
+# --- Sessões de rota ---
+
+class SessionOperation(BaseModel):
+    op: str = Field(..., description="Operação: 'add', 'remove', 'move', 'toggle' ou 'update'.")
+    original_index: Optional[int] = Field(default=None, description="Ponto alvo (obrigatório em todas as operações, exceto 'add').")
+    name: Optional[str] = None
+    latitude: Optional[float] = Field(default=None, description="Nova latitude ('add' e 'move').")
+    longitude: Optional[float] = Field(default=None, description="Nova longitude ('add' e 'move').")
+    address: Optional[str] = None
+    category: Optional[str] = None
+    observations: Optional[str] = None
+    active: Optional[bool] = Field(default=None, description="Novo estado do ponto ('toggle'; opcional em 'add').")
+
+class SessionOperationsRequest(BaseModel):
+    operations: List[SessionOperation]
+    base_version: Optional[int] = Field(default=None, description="Versão da sessão conhecida pelo cliente; se diferente da atual, a requisição é recusada (409).")
+
+class SessionSummary(BaseModel):
+    distance_km: float = Field(..., description="Distância em linha reta (haversine) do percurso atual.")
+    active_points: int
+    total_points: int
+
+class SessionChanges(BaseModel):
+    added: List[Point] = []
+    updated: List[Point] = []
+    removed: List[int] = Field(default=[], description="original_index dos pontos removidos.")
+
+class SessionResponse(BaseModel):
+    session_id: str
+    version: int
+    message: Optional[str] = None
+    degraded: bool = False
+    optimized_route: List[Point]
+    summary: SessionSummary
+
+class SessionDiffResponse(BaseModel):
+    session_id: str
+    version: int
+    changes: SessionChanges
+    order: Optional[List[int]] = Field(default=None, description="Nova ordem do percurso (original_index), presente apenas quando mudou.")
+    summary: SessionSummary
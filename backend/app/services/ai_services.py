@@ -1,13 +1,18 @@
 # geoprumo/backend/app/services/ai_services.py (versão corrigida)
 
-import pandas as pd
-import google.generativeai as genai
+from __future__ import annotations
+
 import json
 import time
 from typing import Dict, Any, List
 
 # --- Importações de módulos do nosso projeto ---
 from app.core.config import settings
+from app.core.utils import LazyModule
+from app.core.metrics import upstream_call
+
+# Importação tardia: pandas só é carregado no primeiro uso
+pd = LazyModule("pandas")
 
 # --- Constantes ---
 BATCH_SIZE = 20 # Processa 20 pontos por vez para otimizar chamadas de API
@@ -19,8 +24,15 @@ class AIServices:
     def __init__(self):
         if not settings.GEMINI_API_KEY:
             raise ValueError("A chave da API do Gemini (GEMINI_API_KEY) não está configurada.")
-        
-        genai.configure(api_key=settings.GEMINI_API_KEY)
+
+        # Importação tardia: o SDK do Gemini é pesado e só é necessário quando a IA é usada.
+        import google.generativeai as genai
+        if settings.GEMINI_API_ENDPOINT:
+            # Endpoint alternativo só é acessível pela API REST
+            genai.configure(api_key=settings.GEMINI_API_KEY, transport="rest",
+                            client_options={"api_endpoint": settings.GEMINI_API_ENDPOINT})
+        else:
+            genai.configure(api_key=settings.GEMINI_API_KEY)
         self.model = genai.GenerativeModel(settings.GEMINI_MODEL_NAME)
 
     def _call_gemini_api_with_retries(self, prompt: str, retries: int = 3, delay: int = 5) -> str:
@@ -29,7 +41,8 @@ class AIServices:
         """
         for attempt in range(retries):
             try:
-                response = self.model.generate_content(prompt)
+                with upstream_call("gemini", "generate_content"):
+                    response = self.model.generate_content(prompt)
                 
                 json_text = response.text.strip()
                 if json_text.startswith("```json"):
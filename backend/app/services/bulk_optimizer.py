@@ -0,0 +1,150 @@
+# geoprumo/backend/app/services/bulk_optimizer.py
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+from app.core.admission import solver_pool
+from app.core.utils import LazyModule, available_cpus, haversine_matrix
+from app.models.point_store import PointStore
+from app.services.optimizer import RouteOptimizer
+
+# Importação tardia: numpy só é carregado no primeiro uso
+np = LazyModule("numpy")
+
+# Referência à matriz compartilhada: (nome do bloco de memória, lado da matriz, posições da rota na matriz)
+SharedMatrixRef = Tuple[str, int, "np.ndarray"]
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    try:
+        # Python 3.13+: o processo filho não registra o bloco, quem o libera é o processo principal
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+def solve_route_job(latitude: np.ndarray, longitude: np.ndarray, time_limit_s: Optional[int],
+                    shared: Optional[SharedMatrixRef] = None) -> Optional[List[int]]:
+    """
+    Executado nos processos do pool: resolve uma rota e retorna a ordem de visita.
+    Com `shared`, as distâncias vêm da matriz única do lote em memória compartilhada.
+    """
+    distance_matrix = None
+    if shared is not None:
+        name, size, positions = shared
+        block = _attach(name)
+        try:
+            union = np.ndarray((size, size), dtype=np.int32, buffer=block.buf)
+            distance_matrix = union[np.ix_(positions, positions)] # cópia: a submatriz da rota
+            del union
+        finally:
+            block.close()
+    return RouteOptimizer().solve_tour(latitude, longitude, 0, len(latitude) - 1, time_limit_s, distance_matrix,
+                                       native_matrix=True)
+
+class SharedDistanceMatrix:
+    """
+    Matriz de distâncias única para todos os pontos distintos das rotas offline de um lote,
+    calculada uma vez e publicada em memória compartilhada para os processos do pool.
+    Só compensa quando as rotas têm muitos pontos em comum (ex.: mesma base de clientes).
+    """
+    def __init__(self, unique: np.ndarray, positions: List[np.ndarray]):
+        self.size = len(unique)
+        self.positions = positions
+        matrix = haversine_matrix(unique[:, 0], unique[:, 1])
+        self._block = shared_memory.SharedMemory(create=True, size=max(matrix.nbytes, 1))
+        np.ndarray(matrix.shape, dtype=np.int32, buffer=self._block.buf)[:] = matrix
+
+    @classmethod
+    def build(cls, stores: Sequence[PointStore]) -> Optional["SharedDistanceMatrix"]:
+        """
+        Cria a matriz única se ela couber no limite e for menor que as matrizes
+        separadas somadas; caso contrário retorna None e cada rota calcula a sua.
+        """
+        if len(stores) < 2:
+            return None
+        coords = np.column_stack((
+            np.concatenate([s.latitude for s in stores]), np.concatenate([s.longitude for s in stores])
+        ))
+        unique, inverse = np.unique(coords, axis=0, return_inverse=True)
+        distinct = len(unique)
+        if distinct > settings.DISTANCE_MATRIX_MAX_POINTS or distinct ** 2 >= sum(len(s) ** 2 for s in stores):
+            return None
+        inverse = inverse.reshape(-1)
+        bounds = np.cumsum([0] + [len(s) for s in stores])
+        return cls(unique, [inverse[bounds[i]:bounds[i + 1]] for i in range(len(stores))])
+
+    def ref(self, i: int) -> SharedMatrixRef:
+        return (self._block.name, self.size, self.positions[i])
+
+    def release(self) -> None:
+        self._block.close()
+        self._block.unlink()
+
+class BulkOptimizer:
+    """
+    Otimiza muitas rotas independentes em paralelo.
+    As rotas offline vão para um pool de processos (uma rota por processo); cada uma ocupa
+    uma vaga do solver_pool enquanto roda, então solves do lote e das demais requisições
+    nunca passam juntos de SOLVER_CONCURRENCY. As rotas online ficam no processo principal,
+    pois só esperam pela rede. O pool é criado na primeira utilização e encerrado no
+    lifespan da aplicação.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.optimizer = RouteOptimizer()
+
+    def pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(max_workers=settings.BULK_MAX_WORKERS or available_cpus())
+        return self._pool
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    @staticmethod
+    def uses_pool(points: PointStore, mode: str) -> bool:
+        """Se a rota é resolvida no pool de processos (e ocupa uma vaga do solver)."""
+        return mode == 'offline' and len(points) > 2
+
+    @staticmethod
+    def admit(jobs: int) -> None:
+        """Recusa (429) o lote se as rotas offline não passarem pelo solver dentro de BULK_QUEUE_TIMEOUT_S."""
+        if jobs:
+            solver_pool.admit_batch(jobs, settings.OFFLINE_TIME_LIMIT_S, settings.BULK_QUEUE_TIMEOUT_S)
+
+    async def optimize(self, points: PointStore, mode: str, shared: Optional[SharedMatrixRef] = None) -> Dict[str, Any]:
+        """
+        Otimiza uma rota do lote; mesmo formato de retorno do RouteOptimizer.optimize_route.
+        As rotas offline precisam ter sido admitidas antes pelo admit().
+        """
+        if not self.uses_pool(points, mode):
+            return await self.optimizer.optimize_route(points, mode=mode)
+
+        loop = asyncio.get_running_loop()
+        try:
+            async with solver_pool.slot(settings.BULK_QUEUE_TIMEOUT_S, admitted=True):
+                route_indices = await loop.run_in_executor(
+                    self.pool(), solve_route_job, points.latitude, points.longitude, settings.OFFLINE_TIME_LIMIT_S, shared
+                )
+        except BrokenProcessPool:
+            # Um processo morreu (ex.: falta de memória): o próximo lote recria o pool
+            self.shutdown()
+            raise
+        if route_indices is None:
+            return {"data": points}
+        return {"data": points.take(route_indices)}
+
+# Instância única compartilhada por toda a aplicação
+bulk_optimizer = BulkOptimizer()
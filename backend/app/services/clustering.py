@@ -0,0 +1,158 @@
+# geoprumo/backend/app/services/clustering.py
+
+from __future__ import annotations
+
+import math
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.utils import LazyModule
+from app.models.point_store import PointStore
+from app.services.route_sessions import RouteSession
+
+# Importação tardia: numpy só é carregado no primeiro uso
+np = LazyModule("numpy")
+
+# Limite de latitude da projeção Web Mercator (a mesma dos mapas do frontend)
+MAX_MERCATOR_LAT = 85.05112878
+
+def _mercator(latitude: np.ndarray, longitude: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Projeta para Web Mercator normalizado: x e y em [0, 1), com y crescendo para o sul."""
+    lat = np.radians(np.clip(latitude, -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT))
+    x = (longitude + 180.0) / 360.0
+    y = 0.5 - np.log(np.tan(np.pi / 4 + lat / 2)) / (2 * np.pi)
+    return np.clip(x, 0, 1 - 1e-12), np.clip(y, 0, 1 - 1e-12)
+
+class _ZoomLevel:
+    """Células ocupadas de um nível de zoom, ordenadas por (coluna, linha)."""
+    __slots__ = ("cx", "cy", "counts", "latitude", "longitude", "first")
+
+    def __init__(self, cx, cy, counts, latitude, longitude, first):
+        self.cx, self.cy, self.counts = cx, cy, counts
+        self.latitude, self.longitude, self.first = latitude, longitude, first
+
+class ClusterIndex:
+    """
+    Índice de agrupamento em grade hierárquica sobre a projeção Web Mercator.
+    Em cada zoom o mundo é dividido em células de cerca de CLUSTER_RADIUS_PX pixels (arredondado
+    para que o número de células por eixo seja potência de dois); como cada
+    célula de um zoom contém exatamente quatro do zoom seguinte, os agrupamentos são
+    consistentes ao aproximar. Os níveis são montados sob demanda (uma ordenação por nível)
+    e as consultas por área visível são buscas binárias sobre as células ordenadas.
+    """
+    def __init__(self, points: PointStore, order: np.ndarray, version: int):
+        self.version = version
+        self.points = points
+        self.order = order
+        self.x, self.y = _mercator(points.latitude, points.longitude)
+        self._levels: Dict[int, _ZoomLevel] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def cells_per_axis(zoom: int) -> int:
+        """Potência de dois mais próxima de (256 / CLUSTER_RADIUS_PX) células por tile, para as grades se aninharem."""
+        return 2 ** max(0, zoom + round(math.log2(256 / settings.CLUSTER_RADIUS_PX)))
+
+    def _level(self, zoom: int) -> _ZoomLevel:
+        level = self._levels.get(zoom)
+        if level is None:
+            with self._lock:
+                level = self._levels.get(zoom)
+                if level is None:
+                    level = self._levels[zoom] = self._build_level(zoom)
+        return level
+
+    def _build_level(self, zoom: int) -> _ZoomLevel:
+        n_cells = self.cells_per_axis(zoom)
+        cx = (self.x * n_cells).astype(np.int64)
+        cy = (self.y * n_cells).astype(np.int64)
+        cell = cx * n_cells + cy
+        sort = np.argsort(cell, kind="stable")
+        cells, starts, counts = np.unique(cell[sort], return_index=True, return_counts=True)
+        # Centroide de cada célula: soma por grupo das coordenadas ordenadas
+        latitude = np.add.reduceat(self.points.latitude[sort], starts) / counts
+        longitude = np.add.reduceat(self.points.longitude[sort], starts) / counts
+        return _ZoomLevel(cells // n_cells, cells % n_cells, counts, latitude, longitude, sort[starts])
+
+    def query(self, bbox: Tuple[float, float, float, float], zoom: int) -> Dict[str, Any]:
+        """Agrupamentos e pontos isolados dentro de bbox (oeste, sul, leste, norte) no zoom pedido."""
+        zoom = max(0, zoom)
+        west, south, east, north = bbox
+        if west > east:
+            # A área visível cruza o antimeridiano: duas consultas
+            features = self.query((west, south, 180.0, north), zoom)["features"]
+            features += self.query((-180.0, south, east, north), zoom)["features"]
+            return {"type": "FeatureCollection", "features": features}
+
+        (x0, x1), (y1, y0) = _mercator(np.array([south, north]), np.array([west, east]))
+        if zoom > settings.CLUSTER_MAX_ZOOM:
+            inside = np.flatnonzero((self.x >= x0) & (self.x <= x1) & (self.y >= y0) & (self.y <= y1))
+            return {"type": "FeatureCollection", "features": self._point_features(inside)}
+
+        level = self._level(zoom)
+        n_cells = self.cells_per_axis(zoom)
+        lo = np.searchsorted(level.cx, int(x0 * n_cells), side="left")
+        hi = np.searchsorted(level.cx, int(x1 * n_cells), side="right")
+        cy = level.cy[lo:hi]
+        selected = lo + np.flatnonzero((cy >= int(y0 * n_cells)) & (cy <= int(y1 * n_cells)))
+
+        counts = level.counts[selected]
+        single = counts == 1
+        features = self._point_features(level.first[selected[single]])
+        grouped = selected[~single]
+        for i, count, lat, lon in zip(grouped.tolist(), level.counts[grouped].tolist(),
+                                      level.latitude[grouped].tolist(), level.longitude[grouped].tolist()):
+            features.append({
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [lon, lat]},
+                "properties": {
+                    "cluster": True, "cluster_id": f"{zoom}/{int(level.cx[i])}/{int(level.cy[i])}",
+                    "point_count": count, "expansion_zoom": min(zoom + 1, settings.CLUSTER_MAX_ZOOM + 1)
+                }
+            })
+        return {"type": "FeatureCollection", "features": features}
+
+    def _point_features(self, positions: np.ndarray) -> List[Dict[str, Any]]:
+        if len(positions) == 0:
+            return []
+        points = self.points
+        names = points.strings["name"].take(positions).to_list() if "name" in points.strings else [None] * len(positions)
+        return [
+            {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [lon, lat]},
+                "properties": {"cluster": False, "original_index": idx, "order": order, "name": name, "active": active}
+            }
+            for lon, lat, idx, order, name, active in zip(
+                points.longitude[positions].tolist(), points.latitude[positions].tolist(),
+                points.original_index[positions].tolist(), self.order[positions].tolist(), names,
+                points.active[positions].tolist()
+            )
+        ]
+
+def parse_bbox(bbox: str) -> Tuple[float, float, float, float]:
+    """Lê 'oeste,sul,leste,norte' (graus), o formato usado pelos mapas do frontend."""
+    try:
+        west, south, east, north = (float(v) for v in bbox.split(","))
+    except ValueError:
+        raise ValueError("bbox deve ter o formato 'oeste,sul,leste,norte'.")
+    if not all(map(math.isfinite, (west, south, east, north))) or south > north:
+        raise ValueError("bbox inválido: verifique a ordem 'oeste,sul,leste,norte'.")
+    return max(west, -180.0), max(south, -90.0), min(east, 180.0), min(north, 90.0)
+
+def build_cluster_index(points: PointStore, display_positions: List[int], version: int) -> ClusterIndex:
+    """Cria o índice de uma rota; `display_positions` define o `order` de cada ponto (1, 2, ...)."""
+    order = np.empty(len(points), dtype=np.int64)
+    order[np.asarray(display_positions, dtype=np.int64)] = np.arange(1, len(points) + 1)
+    return ClusterIndex(points, order, version)
+
+def cluster_index_for(session: RouteSession) -> ClusterIndex:
+    """
+    Índice da sessão de rota, criado uma vez por versão: as consultas seguintes
+    (movimentos do mapa) reaproveitam os níveis já montados.
+    """
+    index: Optional[ClusterIndex] = session.clusters
+    if index is None or index.version != session.version:
+        index = session.clusters = build_cluster_index(session.points, session.route_indices(), session.version)
+    return index
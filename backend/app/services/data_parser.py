@@ -1,15 +1,71 @@
 # geoprumo/backend/app/services/data_parser.py
 
-import pandas as pd
+from __future__ import annotations
+
 import os
 import re
-import requests
+import httpx
+import importlib.util
 import io
-import gpxpy
-from lxml import etree
-from typing import Dict, Any, Optional, Tuple, List, Union
+from itertools import chain, islice
+from typing import Dict, Any, Iterator, Optional, Tuple, List, Union, Sequence
+
+from app.core.utils import LazyModule, haversine_distance
+from app.core.http_client import http_client
+from app.core.config import settings
+from app.core.metrics import upstream_call, LINK_CACHE_REQUESTS
+from app.core.profiling import run_in_thread
+from app.models.schemas import Point
+from app.models.point_store import PointStore
+from app.services.link_cache import LinkCache, CachedDocument
+
+# Importação tardia: pandas e numpy só são carregados no primeiro uso
+pd = LazyModule("pandas")
+np = LazyModule("numpy")
+
+# Cache dos KML do My Maps, compartilhado por todas as requisições (chave: mid do mapa)
+mymaps_cache = LinkCache(ttl_s=settings.MYMAPS_CACHE_TTL_S, max_entries=settings.MYMAPS_CACHE_MAX_ENTRIES)
+
+# Sinônimos aceitos para cada coluna padronizada (cabeçalhos comparados em minúsculas)
+COLUMN_KEYWORDS = {
+    'Latitude': ['latitude', 'lat', 'lat.', 'latitude (wgs84)'],
+    'Longitude': ['longitude', 'lon', 'lng', 'long.', 'longitude (wgs84)'],
+    'Nome': ['nome', 'name', 'título', 'ref', 'referencia', 'referência', 'ponto', 'local', 'faixa', 'ponto de bloqueio', 'ponto_de_bloqueio'],
+    'Link': ['link', 'url', 'gmaps', 'maps'],
+    'Observations': ['obs', 'observacoes', 'observações', 'desc', 'descricao', 'descrição'],
+    # Cabeçalhos das planilhas exportadas pelo próprio GeoPrumo (Endereço, Categoria)
+    'address': ['address', 'endereço', 'endereco'],
+    'category': ['category', 'categoria'],
+    # Planilhas de topografia em UTM
+    'Easting': ['easting', 'utm e', 'utm_e', 'utm este', 'coordenada e', 'coord e', 'este', 'leste', 'e (m)'],
+    'Northing': ['northing', 'utm n', 'utm_n', 'utm norte', 'coordenada n', 'coord n', 'norte', 'n (m)'],
+    'UTM_Zone': ['zona', 'zona utm', 'utm zone', 'zone', 'fuso', 'fuso utm'],
+    'Hemisphere': ['hemisferio', 'hemisfério', 'hemisphere']
+}
+
+# Todos os cabeçalhos reconhecidos (projeção de colunas na leitura de planilhas Excel)
+KNOWN_HEADERS = {kw for kws in COLUMN_KEYWORDS.values() for kw in kws}
+# Pares de colunas que tornam uma aba do Excel uma aba de pontos
+COORDINATE_COLUMNS = (('Latitude', 'Longitude'), ('Easting', 'Northing'), ('Link',))
+# Linhas de dados analisadas para reconhecer colunas de coordenadas sem cabeçalho conhecido
+EXCEL_SAMPLE_ROWS = 20
 
-from app.core.utils import haversine_distance
+# calamine (Rust) é bem mais rápido que o openpyxl; usado quando instalado
+CALAMINE_AVAILABLE = importlib.util.find_spec("python_calamine") is not None
+
+# Coordenadas em graus, minutos e segundos (ex.: 19°55'0.1"S, S 43 56 00, -19 55.5), também aceita graus decimais.
+# Hemisférios em português e inglês: N, S, L/E (leste) e O/W (oeste).
+DMS_PATTERN = (
+    r"^(?P<h1>[NSLEOW])?\s*(?P<deg>[-+]?\d+(?:[.,]\d+)?)\s*(?:°|º|d|graus)?\s*"
+    r"(?:(?P<min>\d+(?:[.,]\d+)?)\s*(?:'|′|’|min)?\s*)?"
+    r"(?:(?P<sec>\d+(?:[.,]\d+)?)\s*(?:\"|″|''|”)?\s*)?"
+    r"(?P<h2>[NSLEOW])?$"
+)
+NEGATIVE_HEMISPHERES = ['S', 'O', 'W']
+
+# Faixa válida das coordenadas UTM (metros)
+UTM_EASTING_RANGE = (100_000, 1_000_000)
+UTM_NORTHING_RANGE = (0, 10_000_000)
 
 class DataParser:
     """
@@ -19,6 +75,7 @@ class DataParser:
 
     def _parse_gpx(self, file_content: bytes) -> pd.DataFrame:
         """Analisa o conteúdo de um arquivo GPX para extrair os waypoints."""
+        import gpxpy # Importação tardia: só carregado quando um GPX é enviado
         points = []
         try:
             gpx = gpxpy.parse(file_content.decode('utf-8'))
@@ -35,6 +92,7 @@ class DataParser:
 
     def _parse_kml(self, file_content: bytes) -> pd.DataFrame:
         """Extrai pontos de uma estrutura KML."""
+        from lxml import etree # Importação tardia: só carregado quando um KML é processado
         points = []
         try:
             parser = etree.XMLParser(recover=True)
@@ -60,7 +118,7 @@ class DataParser:
         """Lê o conteúdo de um arquivo CSV ou XLSX."""
         try:
             if is_excel:
-                return pd.read_excel(io.BytesIO(file_content))
+                return self._parse_excel(file_content)
             else:
                 try:
                     text_content = file_content.decode('utf-8')
@@ -71,6 +129,111 @@ class DataParser:
             print(f"ERRO ao ler planilha: {e}")
             return pd.DataFrame()
 
+    def _parse_excel(self, file_content: bytes) -> pd.DataFrame:
+        """
+        Lê todas as abas de um XLSX que tenham colunas de coordenadas, uma de cada vez
+        (a leitura já ocupa uma vaga do pool de leitura; abas em paralelo furariam o limite).
+        Usa calamine quando disponível (senão openpyxl em modo somente leitura, em streaming),
+        lê no máximo EXCEL_MAX_ROWS linhas e guarda só as colunas reconhecidas.
+        Sem nenhuma aba reconhecida, lê a primeira aba inteira, como antes.
+        """
+        sheet_names = self._excel_sheet_names(file_content)
+        if not sheet_names:
+            return pd.DataFrame()
+
+        frames = [self._read_excel_sheet(file_content, name, project=True) for name in sheet_names]
+        frames = [df for df in frames if df is not None and not df.empty]
+        if not frames:
+            fallback = self._read_excel_sheet(file_content, sheet_names[0], project=False)
+            return fallback if fallback is not None else pd.DataFrame()
+        return pd.concat(frames, ignore_index=True).head(settings.EXCEL_MAX_ROWS)
+
+    def _excel_sheet_names(self, file_content: bytes) -> List[str]:
+        if CALAMINE_AVAILABLE:
+            from python_calamine import CalamineWorkbook
+            return list(CalamineWorkbook.from_filelike(io.BytesIO(file_content)).sheet_names)
+        from openpyxl import load_workbook # Importação tardia: só carregado quando um XLSX é enviado
+        workbook = load_workbook(io.BytesIO(file_content), read_only=True, data_only=True)
+        try:
+            return list(workbook.sheetnames)
+        finally:
+            workbook.close()
+
+    def _excel_rows(self, file_content: bytes, sheet_name: str) -> Iterator[Sequence[Any]]:
+        """Linhas (valores) de uma aba, uma a uma; o arquivo é fechado quando o iterador é fechado."""
+        if CALAMINE_AVAILABLE:
+            from python_calamine import CalamineWorkbook
+            yield from CalamineWorkbook.from_filelike(io.BytesIO(file_content)).get_sheet_by_name(sheet_name).iter_rows()
+            return
+        from openpyxl import load_workbook
+        workbook = load_workbook(io.BytesIO(file_content), read_only=True, data_only=True)
+        try:
+            yield from workbook[sheet_name].iter_rows(values_only=True)
+        finally:
+            workbook.close()
+
+    def _read_excel_sheet(self, file_content: bytes, sheet_name: str, project: bool) -> Optional[pd.DataFrame]:
+        """
+        Lê uma aba. Com `project`, retorna None se a aba não tiver colunas de coordenadas
+        e mantém só as colunas reconhecidas, já padronizadas (cada aba pode usar cabeçalhos diferentes).
+        Só as primeiras linhas (cabeçalho e amostra) são guardadas inteiras; as demais são
+        projetadas nas colunas escolhidas à medida que são lidas.
+        """
+        rows = self._excel_rows(file_content, sheet_name)
+        try:
+            # Cabeçalho: a primeira linha com nomes de coluna conhecidos (pula títulos acima da tabela);
+            # sem nenhuma, a primeira linha com algum texto
+            head = list(islice(rows, EXCEL_SAMPLE_ROWS))
+            text_rows = [i for i, row in enumerate(head) if any(isinstance(v, str) and v.strip() for v in row)]
+            if not text_rows:
+                return None
+            header_pos = next((i for i in text_rows if any(isinstance(v, str) and v.strip().lower() in KNOWN_HEADERS for v in head[i])),
+                              text_rows[0])
+            header = [str(v).strip() if v not in (None, "") else f"Coluna {i + 1}" for i, v in enumerate(head[header_pos])]
+            sample = head[header_pos + 1:]
+            sample += islice(rows, EXCEL_SAMPLE_ROWS - len(sample))
+            sample = sample[:settings.EXCEL_MAX_ROWS]
+
+            columns = list(range(len(header)))
+            if project:
+                columns = [i for i, name in enumerate(header) if name.lower() in KNOWN_HEADERS]
+                standard = set(self._auto_detect_and_standardize_columns(pd.DataFrame(columns=[header[i] for i in columns])).columns)
+                coordinate_like = any(all(col in standard for col in group) for group in COORDINATE_COLUMNS)
+                # Colunas sem cabeçalho conhecido com textos de coordenadas (ex.: "-19.91, -43.93" ou links)
+                for i in range(len(header)):
+                    if i in columns:
+                        continue
+                    values = [row[i] for row in sample if i < len(row) and isinstance(row[i], str) and row[i].strip()]
+                    if values and sum(self.extract_coords_from_text(v) is not None for v in values) / len(values) > 0.5:
+                        columns.append(i)
+                        coordinate_like = True
+                if not coordinate_like:
+                    return None
+            columns.sort()
+
+            # Projeção durante a leitura: cada linha contribui só com as colunas escolhidas
+            values_by_column: List[List[Any]] = [[] for _ in columns]
+            for row in chain(sample, islice(rows, settings.EXCEL_MAX_ROWS - len(sample))):
+                width = len(row)
+                for values, i in zip(values_by_column, columns):
+                    value = row[i] if i < width else None
+                    values.append(value if value != "" else None)
+        finally:
+            rows.close()
+
+        names: Dict[str, int] = {}
+        frame = {}
+        for i, values in zip(columns, values_by_column):
+            name = header[i]
+            if name in names: # cabeçalhos repetidos
+                names[name] += 1
+                name = f"{name}.{names[name]}"
+            else:
+                names[name] = 0
+            frame[name] = values
+        df = pd.DataFrame(frame).dropna(how='all')
+        return self._auto_detect_and_standardize_columns(df) if project else df
+
     def _validate_coordinates(self, latitude: Any, longitude: Any) -> bool:
         """Verifica se um par de coordenadas é geograficamente válido."""
         try:
@@ -83,18 +246,9 @@ class DataParser:
         df_copy = df.copy()
         rename_map = {}
         
-        # CORREÇÃO: Lista de sinônimos muito mais completa
-        keywords = {
-            'Latitude': ['latitude', 'lat', 'lat.', 'latitude (wgs84)'],
-            'Longitude': ['longitude', 'lon', 'lng', 'long.', 'longitude (wgs84)'],
-            'Nome': ['nome', 'name', 'título', 'ref', 'referencia', 'referência', 'ponto', 'local', 'faixa', 'ponto de bloqueio', 'ponto_de_bloqueio'],
-            'Link': ['link', 'url', 'gmaps', 'maps'],
-            'Observations': ['obs', 'observacoes', 'observações', 'desc', 'descricao', 'descrição']
-        }
-        
         df_cols_lower = {str(c).lower().strip(): c for c in df_copy.columns}
 
-        for standard_name, kws in keywords.items():
+        for standard_name, kws in COLUMN_KEYWORDS.items():
             if standard_name not in df_copy.columns:
                 for kw in kws:
                     if kw in df_cols_lower:
@@ -111,6 +265,13 @@ class DataParser:
 
     def clean_and_validate_data(self, df: pd.DataFrame) -> pd.DataFrame:
         """Orquestra a limpeza e validação de um DataFrame."""
+        # Coordenadas UTM são convertidas de uma vez, coluna inteira, agrupadas por zona
+        has_utm = 'Easting' in df.columns and 'Northing' in df.columns
+        if has_utm:
+            utm_lat, utm_lon = self._utm_to_latlon(df)
+            if 'Latitude' not in df.columns or 'Longitude' not in df.columns:
+                df['Latitude'], df['Longitude'] = utm_lat, utm_lon
+
         if 'Latitude' not in df.columns or 'Longitude' not in df.columns:
             for col in df.columns:
                 if df[col].dtype == 'object':
@@ -125,42 +286,186 @@ class DataParser:
 
         df_clean = df.copy()
 
-        def clean_coord_string(coord):
-            if isinstance(coord, str):
-                return re.sub(r"[°'\"NnSsOoWwEe\s]", "", coord).replace(',', '.')
-            return coord
-
         for col in ['Latitude', 'Longitude']:
-            df_clean[col] = df_clean[col].apply(clean_coord_string)
-            df_clean[col] = pd.to_numeric(df_clean[col], errors='coerce')
+            df_clean[col] = self._to_decimal_degrees(df_clean[col])
+
+        if has_utm:
+            # Planilhas mistas: linhas sem latitude/longitude usam a conversão do UTM
+            df_clean['Latitude'] = df_clean['Latitude'].fillna(pd.Series(utm_lat, index=df_clean.index))
+            df_clean['Longitude'] = df_clean['Longitude'].fillna(pd.Series(utm_lon, index=df_clean.index))
 
         df_clean.dropna(subset=['Latitude', 'Longitude'], inplace=True)
 
-        valid_coords = df_clean.apply(
-            lambda row: self._validate_coordinates(row['Latitude'], row['Longitude']),
-            axis=1
-        )
+        valid_coords = df_clean['Latitude'].between(-90, 90) & df_clean['Longitude'].between(-180, 180)
         return df_clean[valid_coords].reset_index(drop=True)
 
-    def _fetch_link_content(self, url: str, allow_redirects: bool = True) -> Optional[bytes]:
-        """Baixa o conteúdo de uma URL."""
+    def _to_decimal_degrees(self, values: pd.Series) -> pd.Series:
+        """
+        Converte uma coluna de coordenadas para graus decimais, em operações vetorizadas.
+        Números passam direto; textos em graus/minutos/segundos (DMS) ou com hemisfério são
+        interpretados pela expressão DMS_PATTERN; o restante é limpo como antes.
+        """
+        numeric = pd.to_numeric(values, errors='coerce')
+        pending = numeric.isna() & values.notna()
+        if not pending.any():
+            return numeric
+
+        text = values[pending].astype(str).str.strip()
+        parts = text.str.extract(DMS_PATTERN, flags=re.IGNORECASE)
+        degrees = pd.to_numeric(parts['deg'].str.replace(',', '.', regex=False), errors='coerce')
+        minutes = pd.to_numeric(parts['min'].str.replace(',', '.', regex=False), errors='coerce').fillna(0)
+        seconds = pd.to_numeric(parts['sec'].str.replace(',', '.', regex=False), errors='coerce').fillna(0)
+        hemisphere = parts['h2'].fillna(parts['h1']).str.upper()
+
+        value = degrees.abs() + minutes / 60 + seconds / 3600
+        negative = parts['deg'].str.startswith('-', na=False) | hemisphere.isin(NEGATIVE_HEMISPHERES)
+        value = value.where(~negative, -value).where((minutes < 60) & (seconds < 60))
+        numeric[pending] = value
+
+        # Formatos não reconhecidos: remove símbolos e letras de hemisfério (comportamento anterior)
+        leftover = numeric.isna() & values.notna()
+        if leftover.any():
+            cleaned = values[leftover].astype(str).str.replace(r"[°'\"NnSsOoWwEe\s]", "", regex=True).str.replace(',', '.', regex=False)
+            numeric[leftover] = pd.to_numeric(cleaned, errors='coerce')
+        return numeric
+
+    def _to_meters(self, values: pd.Series) -> np.ndarray:
+        """
+        Converte uma coluna de coordenadas UTM para float, aceitando '712.345,67', '712345,67',
+        '7.812.345' e '712345 m'. Sem vírgula, pontos separando grupos de exatamente três
+        dígitos são separadores de milhar (metros inteiros no formato brasileiro).
+        """
+        if pd.api.types.is_numeric_dtype(values):
+            return values.to_numpy(dtype=np.float64)
+        text = values.astype(str).str.replace(r"[^\d,.\-]", "", regex=True)
+        has_comma = text.str.contains(',', regex=False)
+        thousands = (has_comma & text.str.contains('.', regex=False)) | (~has_comma & text.str.fullmatch(r"-?\d{1,3}(?:\.\d{3})+"))
+        text = text.where(~thousands, text.str.replace('.', '', regex=False)).str.replace(',', '.', regex=False)
+        return pd.to_numeric(text, errors='coerce').to_numpy(dtype=np.float64)
+
+    def _utm_zones(self, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Zona UTM e hemisfério de cada linha. Aceita '23', '23K', '23 S' e uma coluna de hemisfério;
+        sem essas informações usa UTM_DEFAULT_ZONE e UTM_DEFAULT_HEMISPHERE.
+        Uma letra 'N' ou 'S' junto da zona indica o hemisfério (convenção dos levantamentos no Brasil);
+        as demais letras são bandas de latitude (de 'N' em diante, hemisfério norte).
+        """
+        n = len(df)
+        zone = np.full(n, settings.UTM_DEFAULT_ZONE, dtype=np.float64)
+        northern = np.full(n, settings.UTM_DEFAULT_HEMISPHERE.strip().upper().startswith('N'))
+
+        if 'UTM_Zone' in df.columns:
+            parts = df['UTM_Zone'].astype(str).str.strip().str.upper().str.extract(r"^(\d{1,2})(?:\.0)?\s*([A-Z])?")
+            number = pd.to_numeric(parts[0], errors='coerce').to_numpy(dtype=np.float64)
+            zone = np.where(np.isnan(number), zone, number)
+            letter = parts[1].fillna('').to_numpy(dtype=object)
+            is_band = (letter != '') & (letter != 'N') & (letter != 'S')
+            northern = np.where(letter == 'N', True, np.where(letter == 'S', False, np.where(is_band, letter >= 'N', northern)))
+
+        if 'Hemisphere' in df.columns:
+            initial = df['Hemisphere'].astype(str).str.strip().str.upper().str[:1].to_numpy(dtype=object)
+            northern = np.where(initial == 'N', True, np.where(initial == 'S', False, northern))
+        return zone, northern.astype(bool)
+
+    def _utm_to_latlon(self, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Converte as colunas Easting/Northing para latitude/longitude (NaN quando inválidas).
+        A conversão é feita por vetores inteiros, uma chamada por combinação de zona e hemisfério.
+        """
+        import utm # Importação tardia: só carregado quando há planilhas em UTM
+
+        easting, northing = self._to_meters(df['Easting']), self._to_meters(df['Northing'])
+        zone, northern = self._utm_zones(df)
+        latitude = np.full(len(df), np.nan)
+        longitude = np.full(len(df), np.nan)
+
+        valid = (
+            (easting >= UTM_EASTING_RANGE[0]) & (easting < UTM_EASTING_RANGE[1]) &
+            (northing >= UTM_NORTHING_RANGE[0]) & (northing <= UTM_NORTHING_RANGE[1]) &
+            (zone >= 1) & (zone <= 60)
+        )
+        rows = np.flatnonzero(valid)
+        if len(rows) == 0:
+            return latitude, longitude
+
+        groups = pd.DataFrame({'zone': zone[rows].astype(int), 'northern': northern[rows]}).groupby(['zone', 'northern']).indices
+        for (zone_number, is_northern), positions in groups.items():
+            idx = rows[positions]
+            latitude[idx], longitude[idx] = utm.to_latlon(
+                easting[idx], northing[idx], int(zone_number), northern=bool(is_northern), strict=False
+            )
+        return latitude, longitude
+
+    def build_point_store(self, existing_points: Sequence[Point], clean_df: pd.DataFrame) -> PointStore:
+        """
+        Consolida os pontos já processados da rota e os novos pontos limpos em um
+        único PointStore. Os pontos existentes não passam por DataFrame: apenas
+        suas coordenadas são revalidadas.
+        """
+        stores = []
+        if existing_points:
+            existing = PointStore.from_points(existing_points)
+            stores.append(existing.take(np.flatnonzero(existing.valid_coordinates_mask())))
+        if not clean_df.empty:
+            stores.append(PointStore.from_dataframe(clean_df))
+        return PointStore.concat(stores)
+
+    async def _fetch_link(self, url: str, allow_redirects: bool = True, headers: Optional[Dict[str, str]] = None) -> Optional[httpx.Response]:
+        """Faz o GET de uma URL; retorna None em caso de falha (respostas 304 são válidas)."""
         try:
-            response = requests.get(url, headers={'User-Agent': 'Mozilla/5.0'}, timeout=15, allow_redirects=allow_redirects)
-            response.raise_for_status()
-            return response.content
-        except requests.RequestException as e:
+            with upstream_call("links", "fetch"):
+                response = await http_client.get(url, headers={'User-Agent': 'Mozilla/5.0', **(headers or {})},
+                                                 timeout=15, follow_redirects=allow_redirects)
+                # raise_for_status trata 304 como erro: a revalidação condicional é verificada antes
+                if response.status_code == 304:
+                    return response
+                response.raise_for_status()
+            return response
+        except httpx.HTTPError as e:
             print(f"Falha ao buscar URL {url}: {e}")
             return None
 
-    def parse_mymaps_link(self, url: str) -> pd.DataFrame:
+    async def parse_mymaps_link(self, url: str) -> pd.DataFrame:
         """Baixa e processa pontos de um link do Google My Maps."""
         mid_match = re.search(r"mid=([a-zA-Z0-9_-]+)", url)
         if not mid_match: return pd.DataFrame()
         
         mid = mid_match.group(1)
         kml_export_url = f"https://www.google.com/maps/d/kml?mid={mid}&forcekml=1"
-        kml_content = self._fetch_link_content(kml_export_url)
-        return self._parse_kml(kml_content) if kml_content else pd.DataFrame()
+
+        return await self._fetch_mymaps(mid, kml_export_url)
+
+    async def _fetch_mymaps(self, mid: str, kml_export_url: str) -> pd.DataFrame:
+        """Busca o KML do mapa pelo cache (TTL e revalidação condicional) e retorna os pontos."""
+        # Links iguais na mesma requisição (ou em requisições simultâneas) aguardam uma única busca
+        async with mymaps_cache.lock(mid):
+            cached = mymaps_cache.get(mid)
+            if cached is not None and mymaps_cache.is_fresh(cached):
+                LINK_CACHE_REQUESTS.labels("hit").inc()
+                return cached.parsed.copy()
+
+            response = await self._fetch_link(kml_export_url, headers=cached.conditional_headers() if cached else None)
+            if response is None:
+                if cached is not None:
+                    # Google indisponível: usa a última versão conhecida do mapa
+                    LINK_CACHE_REQUESTS.labels("stale").inc()
+                    return cached.parsed.copy()
+                return pd.DataFrame()
+
+            if response.status_code == 304 and cached is not None:
+                LINK_CACHE_REQUESTS.labels("revalidated").inc()
+                mymaps_cache.touch(cached)
+                return cached.parsed.copy()
+
+            LINK_CACHE_REQUESTS.labels("miss").inc()
+            if not response.content:
+                return pd.DataFrame()
+            # A análise do KML é CPU: roda em uma thread para não bloquear o event loop
+            parsed = await run_in_thread(self._parse_kml, response.content)
+            mymaps_cache.store(mid, CachedDocument(
+                response.headers.get('ETag'), response.headers.get('Last-Modified'), parsed
+            ))
+            return parsed.copy()
 
     def extract_coords_from_text(self, text: str) -> Optional[Tuple[float, float]]:
         """Extrai um par de latitude e longitude de uma string."""
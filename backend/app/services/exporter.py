@@ -1,132 +1,126 @@
 # geoprumo/backend/app/services/exporter.py
 
-import pandas as pd
-import json
-from lxml import etree
-import gpxpy
-from gpxpy.gpx import GPX, GPXWaypoint, GPXRoute, GPXRoutePoint
+from __future__ import annotations
+
 from typing import Dict, List, Any
 
 # Importa a função corrigida
-from app.core.utils import decimal_to_dms
+from app.core.utils import LazyModule, decimal_to_dms
+from app.core.responses import dumps
+from app.models.point_store import PointStore
+
+# Importação tardia: pandas só é carregado no primeiro uso
+pd = LazyModule("pandas")
 
 class Exporter:
     """
-    Classe responsável por converter um DataFrame de rota
+    Classe responsável por converter uma rota (PointStore)
     para diversos formatos de arquivo (CSV, KML, GPX, etc.).
     """
-    def _prepare_dataframe(self, points: List[Dict[str, Any]]) -> pd.DataFrame:
-        """Converte la lista de pontos em um DataFrame padronizado."""
-        df = pd.DataFrame(points)
-        cols = ['order', 'name', 'latitude', 'longitude', 'address', 'category', 'observations']
-        df = df[[col for col in cols if col in df.columns]]
-        df.rename(columns={
-            'order': 'Ordem', 'name': 'Nome', 'latitude': 'Latitude', 
-            'longitude': 'Longitude', 'address': 'Endereço', 'category': 'Categoria',
-            'observations': 'Observações'
-        }, inplace=True)
-        return df
-
-    def to_csv(self, points: List[Dict[str, Any]]) -> str:
+    def _prepare_dataframe(self, points: PointStore) -> pd.DataFrame:
+        """Monta o DataFrame padronizado de exportação diretamente das colunas do PointStore."""
+        return pd.DataFrame({
+            'Ordem': points.order, 'Nome': points.column('name'), 'Latitude': points.latitude,
+            'Longitude': points.longitude, 'Endereço': points.column('address'),
+            'Categoria': points.column('category'), 'Observações': points.column('observations')
+        })
+
+    def to_csv(self, points: PointStore) -> str:
         """Converte a rota para uma string no formato CSV."""
         df = self._prepare_dataframe(points)
         return df.to_csv(index=False, encoding='utf-8-sig')
 
-    def to_geojson(self, points: List[Dict[str, Any]]) -> str:
-        """Converte os pontos e a rota para uma string no formato GeoJSON."""
-        df = self._prepare_dataframe(points)
-        features = []
-        for _, row in df.iterrows():
-            features.append({
+    def to_geojson(self, points: PointStore) -> bytes:
+        """Converte os pontos e a rota para GeoJSON (JSON compacto em UTF-8)."""
+        line_coordinates = points.lonlat_list()
+        features = [
+            {
                 "type": "Feature",
-                "geometry": {"type": "Point", "coordinates": [row['Longitude'], row['Latitude']]},
-                "properties": { "name": row.get('Nome'), "order": row['Ordem'] }
-            })
-        
-        line_coordinates = df[['Longitude', 'Latitude']].values.tolist()
+                "geometry": {"type": "Point", "coordinates": coords},
+                "properties": { "name": name, "order": order }
+            }
+            for coords, name, order in zip(line_coordinates, points.column('name'), points.order.tolist())
+        ]
         features.append({
             "type": "Feature",
             "geometry": {"type": "LineString", "coordinates": line_coordinates},
             "properties": {"name": "Rota Otimizada"}
         })
         geojson_output = {"type": "FeatureCollection", "features": features}
-        return json.dumps(geojson_output, indent=2)
+        return dumps(geojson_output)
 
-    def to_kml(self, points: List[Dict[str, Any]]) -> bytes:
+    def to_kml(self, points: PointStore) -> bytes:
         """Converte a rota para um arquivo KML em formato de bytes."""
-        df = self._prepare_dataframe(points)
+        from lxml import etree # Importação tardia: só carregado na exportação KML
         kml_root = etree.Element("kml", nsmap={None: "http://www.opengis.net/kml/2.2"})
         document = etree.SubElement(kml_root, "Document")
         etree.SubElement(document, "name").text = "Rota Otimizada"
-        
-        for _, row in df.iterrows():
+
+        coords_texts = [f"{lon},{lat},0" for lon, lat in zip(points.longitude.tolist(), points.latitude.tolist())]
+        for name, coords_text in zip(points.column('name'), coords_texts):
             placemark = etree.SubElement(document, "Placemark")
-            etree.SubElement(placemark, "name").text = str(row.get('Nome'))
+            etree.SubElement(placemark, "name").text = str(name)
             point = etree.SubElement(placemark, "Point")
-            etree.SubElement(point, "coordinates").text = f"{row['Longitude']},{row['Latitude']},0"
-            
+            etree.SubElement(point, "coordinates").text = coords_text
+
         placemark_route = etree.SubElement(document, "Placemark")
         etree.SubElement(placemark_route, "name").text = "Trajeto da Rota"
         line_string = etree.SubElement(placemark_route, "LineString")
-        coords_text = " ".join([f"{row['Longitude']},{row['Latitude']},0" for _, row in df.iterrows()])
-        etree.SubElement(line_string, "coordinates").text = coords_text
-        
+        etree.SubElement(line_string, "coordinates").text = " ".join(coords_texts)
+
         return etree.tostring(kml_root, pretty_print=True, xml_declaration=True, encoding='utf-8')
 
-    def to_gpx(self, points: List[Dict[str, Any]]) -> str:
+    def to_gpx(self, points: PointStore) -> str:
         """Converte a rota para uma string no formato GPX."""
-        df = self._prepare_dataframe(points)
+        from gpxpy.gpx import GPX, GPXWaypoint, GPXRoute, GPXRoutePoint # Importação tardia
         gpx = GPX()
-        
-        for _, row in df.iterrows():
-            gpx.waypoints.append(GPXWaypoint(latitude=row['Latitude'], longitude=row['Longitude'], name=str(row.get('Nome'))))
-            
+        coords = list(zip(points.latitude.tolist(), points.longitude.tolist()))
+
+        for (lat, lon), name in zip(coords, points.column('name')):
+            gpx.waypoints.append(GPXWaypoint(latitude=lat, longitude=lon, name=str(name)))
+
         gpx_route = GPXRoute(name="Rota Otimizada")
-        gpx_route.points = [GPXRoutePoint(row['Latitude'], row['Longitude']) for _, row in df.iterrows()]
+        gpx_route.points = [GPXRoutePoint(lat, lon) for lat, lon in coords]
         gpx.routes.append(gpx_route)
-        
+
         return gpx.to_xml(prettyprint=True)
 
-    def to_mymaps_csv(self, points: List[Dict[str, Any]]) -> str:
+    def to_mymaps_csv(self, points: PointStore) -> str:
         """Formata a rota para um CSV compatível com o Google My Maps."""
-        df = self._prepare_dataframe(points)
-        df_mymaps = df.copy()
-
-        df_mymaps['Coordenadas DMS'] = df_mymaps.apply(
-            lambda row: f"{decimal_to_dms(row['Latitude'], is_lat=True)}, {decimal_to_dms(row['Longitude'], is_lat=False)}",
-            axis=1
-        )
-        
-        cols_to_keep = ['Ordem', 'Nome', 'Latitude', 'Longitude', 'Coordenadas DMS', 'Endereço', 'Categoria', 'Observações']
-        df_mymaps = df_mymaps[[col for col in cols_to_keep if col in df_mymaps.columns]]
-        
+        df_mymaps = self._prepare_dataframe(points)
+
+        df_mymaps.insert(4, 'Coordenadas DMS', [
+            f"{decimal_to_dms(lat, is_lat=True)}, {decimal_to_dms(lon, is_lat=False)}"
+            for lat, lon in zip(points.latitude.tolist(), points.longitude.tolist())
+        ])
+
         return df_mymaps.to_csv(index=False, encoding='utf-8-sig')
 
-    def generate_google_maps_links(self, points: List[Dict[str, Any]]) -> List[str]:
+    def generate_google_maps_links(self, points: PointStore) -> List[str]:
         """
         Gera uma lista de links do Google Maps, dividindo a rota em pedaços
         de no máximo 10 pontos e começando da localização atual do usuário.
         """
-        if not points:
+        if not len(points):
             return []
 
         # A localização atual é o ponto de partida geral
-        locations = ["My+Location"] + [f"{p['latitude']},{p['longitude']}" for p in points]
-        
+        locations = ["My+Location"] + [f"{lat},{lon}" for lat, lon in zip(points.latitude.tolist(), points.longitude.tolist())]
+
         urls = []
         # O tamanho do chunk é 10 (1 origem, 8 waypoints, 1 destino)
         chunk_size = 10
-        
+
         # Iteramos sobre a lista de localizações, pulando de 9 em 9
         # porque cada novo link começa do último ponto do link anterior.
         for i in range(0, len(locations), chunk_size - 1):
             chunk = locations[i:i + chunk_size]
             if len(chunk) < 2:
                 continue # Não é possível criar uma rota com menos de 2 pontos
-            
+
             # Constrói a URL com as localizações do chunk
             # Formato: https://www.google.com/maps/dir/loc1/loc2/loc3...
             url = "https://www.google.com/maps/dir/" + "/".join(chunk)
             urls.append(url)
-            
-        return urls
\ No newline at end of file
+
+        return urls
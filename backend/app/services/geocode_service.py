@@ -1,15 +1,17 @@
 # geoprumo/backend/app/services/geocode_service.py
 
-import requests
+import httpx
 from typing import Optional, Tuple, List
 
 from app.core.config import settings
+from app.core.http_client import http_client
+from app.core.metrics import upstream_call
 
 class GeocodeService:
     """
     Serviços para geocodificação e autocompletar endereços usando OpenRouteService.
     """
-    def geocode_address(self, address: str) -> Optional[Tuple[float, float, str]]:
+    async def geocode_address(self, address: str) -> Optional[Tuple[float, float, str]]:
         """
         Converte um endereço de texto em coordenadas geográficas (latitude, longitude)
         e retorna também o nome completo (label) encontrado.
@@ -20,8 +22,9 @@ class GeocodeService:
         try:
             params = {"text": address, "size": 1}
             headers = {"Authorization": settings.ORS_API_KEY}
-            response = requests.get(f"{settings.ORS_BASE_URL}/geocode/search", headers=headers, params=params, timeout=10)
-            response.raise_for_status()
+            with upstream_call("ors", "geocode_search"):
+                response = await http_client.get(f"{settings.ORS_BASE_URL}/geocode/search", headers=headers, params=params, timeout=10)
+                response.raise_for_status()
             data = response.json()
             
             if data and data.get("features"):
@@ -31,13 +34,13 @@ class GeocodeService:
                 return coords[1], coords[0], label
             else:
                 return None
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             raise ConnectionError(f"Falha de conexão na geocodificação: {e}")
         except (KeyError, IndexError) as e:
             raise ValueError(f"A resposta da API de geocodificação está em um formato inesperado: {e}")
 
     # NOVA FUNÇÃO PARA AUTOCOMPLETAR
-    def autocomplete_address(self, text: str) -> List[str]:
+    async def autocomplete_address(self, text: str) -> List[str]:
         """
         Busca sugestões de endereço (incluindo CEP) usando a API de autocomplete.
         """
@@ -53,15 +56,16 @@ class GeocodeService:
             }
             headers = {"Authorization": settings.ORS_API_KEY}
             
-            response = requests.get(f"{settings.ORS_BASE_URL}/geocode/autocomplete", headers=headers, params=params, timeout=5)
-            response.raise_for_status()
+            with upstream_call("ors", "geocode_autocomplete"):
+                response = await http_client.get(f"{settings.ORS_BASE_URL}/geocode/autocomplete", headers=headers, params=params, timeout=5)
+                response.raise_for_status()
             data = response.json()
             
             if data and data.get("features"):
                 return [feature["properties"]["label"] for feature in data["features"]]
             else:
                 return []
-        except requests.exceptions.RequestException:
+        except httpx.HTTPError:
             return [] # Em caso de falha de conexão, retorna lista vazia
         except (KeyError, IndexError):
             return [] # Em caso de formato inesperado, retorna lista vazia
\ No newline at end of file
@@ -0,0 +1,87 @@
+# geoprumo/backend/app/services/link_cache.py
+
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, AsyncIterator, Dict, Optional
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+class CachedDocument:
+    """Documento baixado (ex.: KML do My Maps) com os validadores HTTP e os pontos já analisados."""
+    __slots__ = ("etag", "last_modified", "parsed", "fetched_at")
+
+    def __init__(self, etag: Optional[str], last_modified: Optional[str], parsed: "pd.DataFrame"):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.parsed = parsed
+        self.fetched_at = time.monotonic()
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """Cabeçalhos para revalidar o documento com uma requisição condicional."""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+class _KeyLock:
+    """Trava de uma chave e quantas tarefas a seguram ou esperam por ela."""
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+class LinkCache:
+    """
+    Cache em memória (LRU com TTL) de documentos baixados de links, indexado por
+    uma chave estável (ex.: o `mid` do mapa). Dentro do TTL o documento é usado
+    sem acessar a rede; depois disso, é revalidado com ETag/Last-Modified.
+    """
+    def __init__(self, ttl_s: float, max_entries: int):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CachedDocument]" = OrderedDict()
+        self._locks: Dict[str, _KeyLock] = {}
+
+    @asynccontextmanager
+    async def lock(self, key: str) -> AsyncIterator[None]:
+        """
+        Trava por chave: links iguais buscados ao mesmo tempo geram uma única requisição.
+        A trava é descartada quando a última tarefa que a segurava ou esperava sai do bloco
+        (contar só `locked()` não basta: um waiter acordado ainda não a readquiriu).
+        """
+        key_lock = self._locks.get(key)
+        if key_lock is None:
+            key_lock = self._locks[key] = _KeyLock()
+        key_lock.users += 1
+        try:
+            async with key_lock.lock:
+                yield
+        finally:
+            key_lock.users -= 1
+            if key_lock.users == 0:
+                del self._locks[key]
+
+    def get(self, key: str) -> Optional[CachedDocument]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def is_fresh(self, entry: CachedDocument) -> bool:
+        return time.monotonic() - entry.fetched_at < self.ttl_s
+
+    def touch(self, entry: CachedDocument) -> None:
+        """Marca o documento como revalidado (resposta 304), reiniciando o TTL."""
+        entry.fetched_at = time.monotonic()
+
+    def store(self, key: str, entry: CachedDocument) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
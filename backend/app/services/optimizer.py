@@ -1,16 +1,42 @@
 # geoprumo/backend/app/services/optimizer.py
 
-import pandas as pd
-import requests
-from typing import Optional, Dict, Any
+from __future__ import annotations
 
-# --- Importações de bibliotecas de otimização ---
-from ortools.constraint_solver import routing_enums_pb2
-from ortools.constraint_solver import pywrapcp
+import asyncio
+import httpx
+from typing import Optional, Dict, Any, List
 
 # --- Importações de módulos do nosso projeto ---
 from app.core.config import settings
-from app.core.utils import haversine_distance
+from app.core.http_client import http_client
+from app.core.utils import LazyModule, haversine_distance, haversine_matrix
+from app.core.metrics import stage_timer, upstream_call, observe_solver_objective, OPTIMIZATION_FALLBACKS
+from app.core.resilience import CircuitBreaker, hedged_call
+from app.core.admission import io_pool, solver_pool
+from app.models.point_store import PointStore
+
+# Importação tardia: numpy só é carregado no primeiro uso
+np = LazyModule("numpy")
+
+def _is_ors_outage(error: Exception) -> bool:
+    """
+    Erros que indicam indisponibilidade do ORS: 5xx, 429, timeouts e falhas de transporte.
+    Respostas 4xx (muitos jobs, coordenadas inválidas, chave recusada) são da requisição
+    e não devem mandar os demais usuários para o fallback offline.
+    """
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status >= 500 or status == 429
+    return isinstance(error, httpx.TransportError)
+
+# Disjuntor compartilhado pelas chamadas de otimização e rotas do ORS
+ors_breaker = CircuitBreaker(
+    "ors",
+    failure_threshold=settings.ORS_BREAKER_FAILURE_THRESHOLD,
+    recovery_timeout_s=settings.ORS_BREAKER_RECOVERY_S,
+    slow_call_s=settings.ORS_SLOW_CALL_S,
+    is_failure=_is_ors_outage
+)
 
 class RouteOptimizer:
     """
@@ -18,26 +44,62 @@ class RouteOptimizer:
     quanto online (OpenRouteService).
     """
 
-    def _ortools_optimizer(self, df: pd.DataFrame, start_node: int, end_node: int) -> pd.DataFrame:
+    def _ortools_optimizer(self, points: PointStore, start_node: int, end_node: int, time_limit_s: Optional[int] = None) -> PointStore:
         """
         Otimiza a rota offline usando Google OR-Tools (Problema do Caixeiro Viajante).
         """
-        if len(df) <= 2:
-            return df
+        if len(points) <= 2:
+            return points
+
+        route_indices = self.solve_tour(points.latitude, points.longitude, start_node, end_node, time_limit_s)
+        if route_indices is None:
+            print("Otimização offline (OR-Tools) não encontrou solução.")
+            return points
+        return points.take(route_indices)
 
-        coords = df[['Latitude', 'Longitude']].values.tolist()
-        num_locations = len(coords)
+    def solve_tour(self, latitude: np.ndarray, longitude: np.ndarray, start_node: int, end_node: int,
+                   time_limit_s: Optional[int] = None, distance_matrix: Optional[np.ndarray] = None,
+                   native_matrix: bool = False) -> Optional[List[int]]:
+        """
+        Resolve o TSP com OR-Tools e retorna a ordem de visita (posições), ou None sem solução.
+        Recebe só as coordenadas para poder rodar em outro processo (otimizador em lote).
+        Com `distance_matrix` (ou rotas de até DISTANCE_MATRIX_MAX_POINTS pontos) as distâncias
+        são pré-calculadas. Com `native_matrix` a matriz é avaliada direto pelo OR-Tools, sem
+        chamar Python a cada arco; mas aí o solver segura o GIL durante toda a busca, então
+        só é usado em processos dedicados (otimizador em lote). Nas threads do servidor a
+        matriz é lida por um callback Python, que devolve o GIL ao event loop entre as chamadas.
+        """
+        # Importação tardia: o OR-Tools só é carregado na primeira otimização offline.
+        from ortools.constraint_solver import routing_enums_pb2
+        from ortools.constraint_solver import pywrapcp
+
+        num_locations = len(latitude)
         manager = pywrapcp.RoutingIndexManager(num_locations, 1, [start_node], [end_node])
         routing = pywrapcp.RoutingModel(manager)
 
-        def distance_callback(from_index, to_index):
-            from_node = manager.IndexToNode(from_index)
-            to_node = manager.IndexToNode(to_index)
-            lat1, lon1 = coords[from_node]
-            lat2, lon2 = coords[to_node]
-            return haversine_distance(lat1, lon1, lat2, lon2)
+        if distance_matrix is None and num_locations <= settings.DISTANCE_MATRIX_MAX_POINTS:
+            distance_matrix = haversine_matrix(latitude, longitude)
+
+        if distance_matrix is not None and native_matrix:
+            transit_callback_index = routing.RegisterTransitMatrix(distance_matrix.tolist())
+        elif distance_matrix is not None:
+            rows = distance_matrix.tolist()
+
+            def matrix_callback(from_index, to_index):
+                return rows[manager.IndexToNode(from_index)][manager.IndexToNode(to_index)]
+
+            transit_callback_index = routing.RegisterTransitCallback(matrix_callback)
+        else:
+            coords = list(zip(latitude.tolist(), longitude.tolist()))
+
+            def distance_callback(from_index, to_index):
+                from_node = manager.IndexToNode(from_index)
+                to_node = manager.IndexToNode(to_index)
+                lat1, lon1 = coords[from_node]
+                lat2, lon2 = coords[to_node]
+                return haversine_distance(lat1, lon1, lat2, lon2)
 
-        transit_callback_index = routing.RegisterTransitCallback(distance_callback)
+            transit_callback_index = routing.RegisterTransitCallback(distance_callback)
         routing.SetArcCostEvaluatorOfAllVehicles(transit_callback_index)
 
         search_parameters = pywrapcp.DefaultRoutingSearchParameters()
@@ -47,36 +109,33 @@ class RouteOptimizer:
         search_parameters.local_search_metaheuristic = (
             routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH
         )
-        search_parameters.time_limit.FromSeconds(5)
+        search_parameters.time_limit.FromSeconds(time_limit_s or settings.OFFLINE_TIME_LIMIT_S)
 
-        solution = routing.SolveWithParameters(search_parameters)
+        with stage_timer("solve_ortools"):
+            solution = routing.SolveWithParameters(search_parameters)
 
-        if solution:
-            route_indices = []
-            index = routing.Start(0)
-            while not routing.IsEnd(index):
-                node_index = manager.IndexToNode(index)
-                route_indices.append(node_index)
-                index = solution.Value(routing.NextVar(index))
+        if not solution:
+            return None
+        observe_solver_objective("offline", solution.ObjectiveValue())
+        route_indices = []
+        index = routing.Start(0)
+        while not routing.IsEnd(index):
             route_indices.append(manager.IndexToNode(index))
-            
-            return df.iloc[route_indices].reset_index(drop=True)
-        else:
-            print("Otimização offline (OR-Tools) não encontrou solução.")
-            return df
+            index = solution.Value(routing.NextVar(index))
+        route_indices.append(manager.IndexToNode(index))
+        return route_indices
 
-    def _ors_optimizer(self, df: pd.DataFrame, start_node: int, end_node: int) -> Dict[str, Any]:
+    async def _ors_optimizer(self, points: PointStore, start_node: int, end_node: int) -> Dict[str, Any]:
         """
         Otimiza a rota online usando a API do OpenRouteService.
         """
         if not settings.ORS_API_KEY:
             raise ConnectionError("A chave da API do OpenRouteService (ORS_API_KEY) não está configurada.")
 
-        df_valid = df.dropna(subset=['Latitude', 'Longitude'])
-        if len(df_valid) < 2:
-            return {"data": df} # Retorna dados originais se não houver pontos suficientes
+        if len(points) < 2:
+            return {"data": points} # Retorna dados originais se não houver pontos suficientes
 
-        coords = df_valid[["Longitude", "Latitude"]].values.tolist()
+        coords = points.lonlat_list()
         
         jobs = [{"id": idx, "location": loc} for idx, loc in enumerate(coords) if idx not in [start_node, end_node]]
         vehicles = [{"id": 1, "profile": "driving-car", "start": coords[start_node], "end": coords[end_node]}]
@@ -84,53 +143,114 @@ class RouteOptimizer:
         headers = {"Authorization": settings.ORS_API_KEY, "Content-Type": "application/json"}
 
         try:
-            opt_response = requests.post(f"{settings.ORS_BASE_URL}/optimization", json=payload, headers=headers, timeout=30)
-            opt_response.raise_for_status()
-            opt_result = opt_response.json()
+            opt_result = await ors_breaker.call(self._ors_post, "/optimization", payload, headers, "optimization")
 
             steps = opt_result["routes"][0]["steps"]
             ordered_job_indices = [s["id"] for s in steps if s['type'] == 'job']
             final_route_indices = [start_node] + ordered_job_indices + [end_node]
-            ordered_df = df_valid.iloc[final_route_indices].reset_index(drop=True)
+            ordered_points = points.take(final_route_indices)
 
-            dir_payload = {"coordinates": ordered_df[["Longitude", "Latitude"]].values.tolist()}
-            dir_response = requests.post(f"{settings.ORS_BASE_URL}/v2/directions/driving-car/geojson", json=dir_payload, headers=headers, timeout=30)
-            dir_response.raise_for_status()
-            dir_result = dir_response.json()
+            dir_payload = {"coordinates": ordered_points.lonlat_list()}
+            # Directions aceita hedge: se demorar, uma segunda chamada idêntica é disparada
+            dir_result = await hedged_call(
+                lambda: ors_breaker.call(self._ors_post, "/v2/directions/driving-car/geojson", dir_payload, headers, "directions"),
+                hedge_delay_s=settings.ORS_DIRECTIONS_HEDGE_DELAY_S,
+                max_attempts=settings.ORS_DIRECTIONS_MAX_ATTEMPTS
+            )
 
             summary = dir_result["features"][0]["properties"]["summary"]
+            observe_solver_objective("online", summary["distance"])
             
             return {
-                "data": ordered_df,
+                "data": ordered_points,
                 "geojson": dir_result,
                 "distance": summary["distance"] / 1000,
                 "duration": summary["duration"] / 60
             }
 
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             # CORREÇÃO: Levanta um erro específico que podemos tratar
             raise ConnectionError(f"Falha de conexão com a API do ORS: {e}")
+        except ConnectionError:
+            raise
         except (KeyError, IndexError, Exception) as e:
             # CORREÇÃO: Levanta um erro específico que podemos tratar
             raise ValueError(f"A API do ORS retornou um erro ou formato inesperado: {e}")
 
-    def optimize_route(self, df: pd.DataFrame, mode: str, start_node_index: int = 0, end_node_index: int = -1) -> Dict[str, Any]:
+    async def _ors_post(self, path: str, payload: Dict[str, Any], headers: Dict[str, str], endpoint: str) -> Dict[str, Any]:
+        """Faz um POST na API do ORS, medindo a chamada nas métricas de serviços externos."""
+        with upstream_call("ors", endpoint):
+            response = await http_client.post(f"{settings.ORS_BASE_URL}{path}", json=payload, headers=headers, timeout=30)
+            response.raise_for_status()
+            return response.json()
+
+    async def _offline_fallback(self, points: PointStore, start_node: int, end_node: int, reason: str) -> Dict[str, Any]:
+        """
+        Substitui a otimização online pelo OR-Tools com limite de tempo curto,
+        marcando o resultado como degradado.
+        """
+        OPTIMIZATION_FALLBACKS.labels(reason).inc()
+        with stage_timer("offline_fallback"):
+            optimized_points = await solver_pool.run(
+                self._ortools_optimizer, points, start_node, end_node, settings.OFFLINE_FALLBACK_TIME_LIMIT_S
+            )
+        return {"data": optimized_points, "degraded": True, "degraded_reason": reason}
+
+    async def _online_with_fallback(self, points: PointStore, start_node: int, end_node: int) -> Dict[str, Any]:
+        """
+        Otimiza pelo ORS respeitando o disjuntor e o prazo configurado; se o circuito
+        estiver aberto, o prazo estourar ou o ORS falhar, usa o solver offline.
+        """
+        if ors_breaker.state == CircuitBreaker.OPEN:
+            return await self._offline_fallback(points, start_node, end_node, "circuit_open")
+
+        try:
+            # Vaga no pool de rede antes de chamar o ORS (fila cheia responde 429, sem fallback)
+            async with io_pool.slot():
+                return await asyncio.wait_for(self._ors_optimizer(points, start_node, end_node), timeout=settings.ORS_OPTIMIZE_DEADLINE_S)
+        except asyncio.TimeoutError:
+            print(f"Otimização online excedeu {settings.ORS_OPTIMIZE_DEADLINE_S} s; usando o solver offline.")
+            return await self._offline_fallback(points, start_node, end_node, "deadline")
+        except (ConnectionError, ValueError) as e:
+            print(f"Otimização online falhou ({e}); usando o solver offline.")
+            return await self._offline_fallback(points, start_node, end_node, "upstream_error")
+
+    def optimize_offline(self, points: PointStore, start_node_index: int = 0, end_node_index: int = -1,
+                         time_limit_s: Optional[int] = None) -> PointStore:
+        """
+        Versão síncrona da otimização offline, para quem já está fora do event loop
+        (threads de trabalho, processos do otimizador em lote).
+        """
+        if len(points) < 2:
+            return points
+        if end_node_index == -1 or end_node_index >= len(points):
+            end_node_index = len(points) - 1
+        return self._ortools_optimizer(points, start_node_index, end_node_index, time_limit_s)
+
+    async def optimize_route(self, points: PointStore, mode: str, start_node_index: int = 0, end_node_index: int = -1,
+                       offline_time_limit_s: Optional[int] = None) -> Dict[str, Any]:
         """
         Ponto de entrada principal para otimizar uma rota.
+        Recebe e devolve (em "data") um PointStore na ordem da rota.
+        O solver offline roda no pool do solver (controle de admissão) para não bloquear o event loop.
         """
-        if df.empty or len(df) < 2:
-            return {"data": df}
+        if len(points) < 2:
+            return {"data": points}
 
-        if end_node_index == -1 or end_node_index >= len(df):
-            end_node_index = len(df) - 1
+        if end_node_index == -1 or end_node_index >= len(points):
+            end_node_index = len(points) - 1
             
         if mode == 'offline':
-            optimized_df = self._ortools_optimizer(df, start_node_index, end_node_index)
-            return {"data": optimized_df}
+            optimized_points = await solver_pool.run(
+                self._ortools_optimizer, points, start_node_index, end_node_index, offline_time_limit_s
+            )
+            return {"data": optimized_points}
         
         elif mode == 'online':
-            # A função _ors_optimizer agora levanta erros em vez de retornar None
-            return self._ors_optimizer(df, start_node_index, end_node_index)
+            # Sem chave configurada é erro de configuração, não indisponibilidade: não há fallback
+            if not settings.ORS_API_KEY:
+                raise ConnectionError("A chave da API do OpenRouteService (ORS_API_KEY) não está configurada.")
+            return await self._online_with_fallback(points, start_node_index, end_node_index)
 
         else:
             raise ValueError(f"Modo de otimização desconhecido: {mode}")
\ No newline at end of file
@@ -0,0 +1,498 @@
+# geoprumo/backend/app/services/route_sessions.py
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from app.core.config import settings
+from app.core.utils import LazyModule, haversine_many, haversine_matrix
+from app.models.point_store import PointStore, StringColumn
+from app.models.schemas import Point, SessionOperation
+
+# Importação tardia: numpy só é carregado no primeiro uso
+np = LazyModule("numpy")
+
+TEXT_FIELDS = ("name", "address", "category", "observations")
+OPERATIONS = ("add", "remove", "move", "toggle", "update")
+
+class RouteSession:
+    """
+    Rota mantida no servidor entre edições: pontos já limpos (PointStore), matriz de
+    distâncias haversine e o percurso atual (`tour`, posições no PointStore dos pontos ativos).
+    As operações alteram apenas o que mudou: novos pontos entram por inserção mais barata
+    e só a vizinhança da alteração é revisada com 2-opt, mantendo fixos início e fim.
+    """
+    def __init__(self, session_id: str, points: PointStore, tour: List[int], mode: str, version: int = 1):
+        self.session_id = session_id
+        self.points = points
+        self.tour = list(tour)
+        self.mode = mode
+        self.version = version
+        self.updated_at = time.time()
+        self.lock = threading.Lock()
+        self.clusters = None # índice de agrupamento do mapa (app.services.clustering), por versão
+        # Matriz de distâncias: `matrix` é a parte em uso (n x n) de `_buffer`, que tem folga
+        # para novos pontos (capacidade dobrada quando enche, como uma lista do Python)
+        self.matrix: Optional[np.ndarray] = None
+        self._buffer: Optional[np.ndarray] = None
+        self.build_matrix()
+
+    # --- Distâncias ---
+
+    def matrix_bytes(self) -> int:
+        return self._buffer.nbytes if self._buffer is not None else 0
+
+    def build_matrix(self) -> None:
+        """Calcula a matriz de distâncias, se a rota couber em ROUTE_SESSION_MATRIX_MAX_POINTS."""
+        n = len(self.points)
+        if self.matrix is not None or n > settings.ROUTE_SESSION_MATRIX_MAX_POINTS:
+            return
+        self._buffer = haversine_matrix(self.points.latitude, self.points.longitude)
+        self.matrix = self._buffer[:n, :n]
+
+    def drop_matrix(self) -> None:
+        """Libera a matriz (limite de memória do RouteSessionStore): as distâncias passam a ser calculadas sob demanda."""
+        self.matrix = None
+        self._buffer = None
+
+    def _resize_matrix(self, n: int) -> None:
+        """Ajusta a matriz para n pontos; a linha e a coluna novas ficam para _refresh_matrix_row."""
+        capacity = len(self._buffer)
+        if n > capacity:
+            capacity = min(max(2 * capacity, 16), settings.ROUTE_SESSION_MATRIX_MAX_POINTS)
+            buffer = np.empty((capacity, capacity), dtype=self._buffer.dtype)
+            old = len(self.matrix)
+            buffer[:old, :old] = self.matrix
+            self._buffer = buffer
+        self.matrix = self._buffer[:n, :n]
+
+    def _dist(self, i, j) -> np.ndarray:
+        """Distâncias (metros) entre as posições i e j (escalares ou vetores, com broadcasting)."""
+        if self.matrix is not None:
+            return self.matrix[i, j]
+        lat, lon = self.points.latitude, self.points.longitude
+        return haversine_many(lat[i], lon[i], lat[j], lon[j])
+
+    def _refresh_matrix_row(self, pos: int) -> None:
+        """Recalcula a linha e a coluna de um ponto cujas coordenadas mudaram."""
+        if self.matrix is None:
+            return
+        lat, lon = self.points.latitude, self.points.longitude
+        row = haversine_many(lat[pos], lon[pos], lat, lon)
+        self.matrix[pos, :] = row
+        self.matrix[:, pos] = row
+
+    def distance_m(self) -> int:
+        if len(self.tour) < 2:
+            return 0
+        tour = np.asarray(self.tour)
+        return int(np.sum(self._dist(tour[:-1], tour[1:]), dtype=np.int64))
+
+    # --- Percurso ---
+
+    def _insert(self, pos: int) -> int:
+        """Insere o ponto no trecho do percurso onde ele custa menos; retorna a posição no percurso."""
+        if len(self.tour) < 2:
+            self.tour.append(pos)
+            return len(self.tour) - 1
+        tour = np.asarray(self.tour)
+        a, b = tour[:-1], tour[1:]
+        cost = self._dist(a, pos).astype(np.int64) + self._dist(pos, b) - self._dist(a, b)
+        k = int(np.argmin(cost)) + 1
+        self.tour.insert(k, pos)
+        return k
+
+    def _remove_from_tour(self, pos: int) -> Optional[int]:
+        try:
+            k = self.tour.index(pos)
+        except ValueError:
+            return None
+        del self.tour[k]
+        return k
+
+    def _two_opt(self, center: int) -> None:
+        """
+        2-opt restrito às posições do percurso próximas de `center`.
+        O primeiro e o último ponto não se movem.
+        """
+        window = settings.ROUTE_SESSION_REOPT_WINDOW
+        lo, hi = max(1, center - window), min(len(self.tour) - 2, center + window)
+        if hi - lo < 1:
+            return
+        for _ in range(10): # poucas passadas bastam para uma alteração local
+            improved = False
+            tour = np.asarray(self.tour)
+            for i in range(lo, hi):
+                j = np.arange(i + 1, hi + 1)
+                delta = (self._dist(tour[i - 1], tour[j]).astype(np.int64) + self._dist(tour[i], tour[j + 1])
+                         - self._dist(tour[i - 1], tour[i]) - self._dist(tour[j], tour[j + 1]))
+                best = int(np.argmin(delta))
+                if delta[best] < 0:
+                    jj = int(j[best])
+                    tour[i:jj + 1] = tour[i:jj + 1][::-1].copy()
+                    improved = True
+            self.tour = tour.tolist()
+            if not improved:
+                break
+
+    # --- Pontos ---
+
+    def position_of(self, original_index: int) -> Optional[int]:
+        found = np.flatnonzero(self.points.original_index == original_index)
+        return int(found[0]) if len(found) else None
+
+    def _append_point(self, op: SessionOperation, original_index: int) -> int:
+        """Acrescenta um ponto ao PointStore (e à matriz); retorna a posição dele."""
+        new = PointStore.from_points([Point(
+            order=0, latitude=op.latitude, longitude=op.longitude, original_index=original_index,
+            active=op.active is not False, **{f: getattr(op, f) for f in TEXT_FIELDS if getattr(op, f) is not None}
+        )], keep_original_index=True)
+        self.points = PointStore.concat([self.points, new])
+        pos = len(self.points) - 1
+        if self.matrix is not None:
+            if len(self.points) > settings.ROUTE_SESSION_MATRIX_MAX_POINTS:
+                self.drop_matrix()
+            else:
+                self._resize_matrix(len(self.points))
+                self._refresh_matrix_row(pos)
+        return pos
+
+    def _delete_point(self, pos: int) -> None:
+        keep = np.ones(len(self.points), dtype=bool)
+        keep[pos] = False
+        self.points = self.points.take(np.flatnonzero(keep))
+        if self.matrix is not None:
+            # Desloca as linhas e colunas seguintes no próprio buffer, sem realocar
+            n = len(self.matrix)
+            self.matrix[pos:-1, :] = self.matrix[pos + 1:, :]
+            self.matrix[:, pos:-1] = self.matrix[:, pos + 1:]
+            self._resize_matrix(n - 1)
+        self.tour = [p - 1 if p > pos else p for p in self.tour]
+
+    def route_indices(self) -> List[int]:
+        """Posições na ordem de exibição: o percurso e, em seguida, os pontos inativos."""
+        in_tour = np.zeros(len(self.points), dtype=bool)
+        in_tour[self.tour] = True
+        return self.tour + np.flatnonzero(~in_tour).tolist()
+
+    def route_records(self) -> List[Dict[str, Any]]:
+        """Pontos na ordem de exibição, no formato do schema Point."""
+        return self.points.take(self.route_indices()).to_records()
+
+    def summary(self) -> Dict[str, Any]:
+        return {"distance_km": self.distance_m() / 1000, "active_points": len(self.tour), "total_points": len(self.points)}
+
+    # --- Operações ---
+
+    def _validate(self, operations: List[SessionOperation]) -> None:
+        """Valida o lote inteiro antes de aplicar qualquer operação (o lote é atômico)."""
+        known = set(self.points.original_index.tolist())
+        for n, op in enumerate(operations, start=1):
+            if op.op not in OPERATIONS:
+                raise ValueError(f"Operação {n}: tipo desconhecido '{op.op}'.")
+            if op.op in ("add", "move"):
+                if op.latitude is None or op.longitude is None:
+                    raise ValueError(f"Operação {n}: '{op.op}' exige latitude e longitude.")
+                if not (-90 <= op.latitude <= 90 and -180 <= op.longitude <= 180):
+                    raise ValueError(f"Operação {n}: coordenadas fora do intervalo válido.")
+            if op.op == "add":
+                continue
+            if op.original_index not in known:
+                raise ValueError(f"Operação {n}: ponto {op.original_index} não existe na sessão.")
+            if op.op == "toggle" and op.active is None:
+                raise ValueError(f"Operação {n}: 'toggle' exige o campo active.")
+            if op.op == "remove":
+                known.discard(op.original_index)
+
+    def apply(self, operations: List[SessionOperation]) -> Dict[str, Any]:
+        """
+        Aplica um lote de operações e retorna o diff: pontos adicionados, alterados,
+        removidos e a nova ordem do percurso (apenas se mudou).
+        """
+        self._validate(operations)
+        old_order = self.points.original_index[self.tour].tolist()
+        added: Set[int] = set()
+        updated: Set[int] = set()
+        removed: List[int] = []
+        next_index = int(self.points.original_index.max()) + 1 if len(self.points) else 0
+
+        for op in operations:
+            if op.op == "add":
+                pos = self._append_point(op, next_index)
+                added.add(next_index)
+                next_index += 1
+                if self.points.active[pos]:
+                    self._two_opt(self._insert(pos))
+                continue
+
+            pos = self.position_of(op.original_index)
+            if op.op == "remove":
+                k = self._remove_from_tour(pos)
+                self._delete_point(pos)
+                if op.original_index in added:
+                    added.discard(op.original_index)
+                else:
+                    removed.append(op.original_index)
+                updated.discard(op.original_index)
+                if k is not None:
+                    self._two_opt(k)
+            elif op.op == "move":
+                self.points.latitude[pos], self.points.longitude[pos] = op.latitude, op.longitude
+                self._refresh_matrix_row(pos)
+                if self._remove_from_tour(pos) is not None:
+                    self._two_opt(self._insert(pos))
+                updated.add(op.original_index)
+            elif op.op == "toggle":
+                if bool(self.points.active[pos]) != op.active:
+                    self.points.active[pos] = op.active
+                    if op.active:
+                        self._two_opt(self._insert(pos))
+                    else:
+                        k = self._remove_from_tour(pos)
+                        if k is not None:
+                            self._two_opt(k)
+                    updated.add(op.original_index)
+            elif op.op == "update":
+                for field in TEXT_FIELDS:
+                    value = getattr(op, field)
+                    if value is not None:
+                        column = self.points.strings.get(field) or StringColumn.missing(len(self.points))
+                        self.points.strings[field] = column.replace(pos, value)
+                updated.add(op.original_index)
+
+        self.version += 1
+        self.updated_at = time.time()
+        new_order = self.points.original_index[self.tour].tolist()
+        return {
+            "session_id": self.session_id,
+            "version": self.version,
+            "changes": {
+                "added": self._points_by_index(added),
+                "updated": self._points_by_index(updated - added),
+                "removed": removed,
+            },
+            "order": new_order if new_order != old_order else None,
+            "summary": self.summary(),
+        }
+
+    def _points_by_index(self, original_indices: Iterable[int]) -> List[Dict[str, Any]]:
+        """Pontos alterados, com `order` igual à posição na ordem de exibição."""
+        if not original_indices:
+            return []
+        display = {pos: i + 1 for i, pos in enumerate(self.route_indices())}
+        positions = sorted((self.position_of(idx) for idx in original_indices), key=display.get)
+        # Ordem (e nome gerado) pela posição na rota inteira, não no subconjunto alterado
+        return self.points.take(positions).to_records(orders=[display[pos] for pos in positions])
+
+class RouteSessionStore:
+    """
+    Guarda as sessões de rota em memória (LRU com TTL por inatividade) e,
+    opcionalmente, em um arquivo SQLite, para que sobrevivam a reinícios e à
+    saída da memória. No SQLite fica uma foto completa da sessão e, depois dela, só os
+    lotes de operações (cada edição grava o lote, não a rota inteira); a cada
+    ROUTE_SESSION_SNAPSHOT_EVERY versões a foto é refeita e o log anterior descartado.
+    Ao restaurar, os lotes são reaplicados sobre a foto. A matriz de distâncias não é
+    persistida: é recalculada ao restaurar.
+    A soma das matrizes em memória fica abaixo de `matrix_max_bytes`: as das sessões usadas
+    há mais tempo são liberadas primeiro e voltam a ser calculadas quando houver espaço.
+    """
+    def __init__(self, ttl_s: float, max_sessions: int, sqlite_path: str = "", snapshot_every: int = 50,
+                 matrix_max_bytes: int = 0):
+        self.ttl_s = ttl_s
+        self.max_sessions = max_sessions
+        self.matrix_max_bytes = matrix_max_bytes
+        self.snapshot_every = max(1, snapshot_every)
+        self._lock = threading.Lock()     # sessões em memória
+        self._db_lock = threading.Lock()  # conexão SQLite (gravações não travam as demais sessões em memória)
+        self._sessions: "OrderedDict[str, RouteSession]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        if sqlite_path:
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS route_sessions ("
+                "session_id TEXT PRIMARY KEY, mode TEXT, version INTEGER, updated_at REAL, points TEXT, tour TEXT)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS route_session_operations ("
+                "session_id TEXT, version INTEGER, operations TEXT, PRIMARY KEY (session_id, version))"
+            )
+            self._db.commit()
+
+    def _expired(self, updated_at: float) -> bool:
+        return time.time() - updated_at > self.ttl_s
+
+    def create(self, points: PointStore, mode: str) -> RouteSession:
+        """Cria uma sessão a partir de uma rota já otimizada (PointStore na ordem da rota)."""
+        tour = np.flatnonzero(points.active).tolist()
+        session = RouteSession(uuid.uuid4().hex, points, tour, mode)
+        self.save(session)
+        return session
+
+    def get(self, session_id: str) -> Optional[RouteSession]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                if self._expired(session.updated_at):
+                    self._sessions.pop(session_id, None)
+                else:
+                    self._sessions.move_to_end(session_id)
+                    return session
+        if session is not None:
+            self._delete_rows([session_id])
+            return None
+        session = self._load(session_id)
+        if session is not None:
+            with self._lock:
+                # Outra requisição pode ter restaurado a mesma sessão ao mesmo tempo
+                session = self._sessions.setdefault(session_id, session)
+                expired = self._evict()
+            self._delete_rows(expired)
+            with session.lock:
+                self._fit_matrices(session)
+        return session
+
+    def save(self, session: RouteSession, operations: Optional[List[SessionOperation]] = None) -> None:
+        """
+        Registra a sessão após a criação (sem `operations`) ou após aplicar um lote de operações.
+        Chamado com o lock da sessão: a gravação no SQLite não segura o lock das demais sessões.
+        """
+        with self._lock:
+            self._sessions[session.session_id] = session
+            self._sessions.move_to_end(session.session_id)
+            expired = self._evict()
+        self._delete_rows(expired)
+        self._fit_matrices(session)
+        if self._db is None:
+            return
+        if operations is None or session.version % self.snapshot_every == 0:
+            self._write_snapshot(session)
+        else:
+            self._append_operations(session, operations)
+
+    def _fit_matrices(self, session: RouteSession) -> None:
+        """
+        Mantém a soma das matrizes de distâncias abaixo de matrix_max_bytes, liberando as das
+        sessões menos usadas (que seguem funcionando com distâncias sob demanda). Sessões em
+        uso por outra requisição são puladas. Chamado com o lock de `session`.
+        """
+        if self.matrix_max_bytes <= 0:
+            return
+        with self._lock:
+            others = [s for s in self._sessions.values() if s is not session and s.matrix_bytes()]
+        total = sum(s.matrix_bytes() for s in others) + session.matrix_bytes()
+        n = len(session.points)
+        needed = 0
+        if session.matrix is None and n <= settings.ROUTE_SESSION_MATRIX_MAX_POINTS:
+            needed = n * n * np.dtype(np.int32).itemsize
+
+        for other in others: # da menos usada para a mais usada
+            if total + needed <= self.matrix_max_bytes:
+                break
+            if other.lock.acquire(blocking=False):
+                try:
+                    total -= other.matrix_bytes()
+                    other.drop_matrix()
+                finally:
+                    other.lock.release()
+
+        if needed and total + needed <= self.matrix_max_bytes:
+            session.build_matrix()
+        elif total > self.matrix_max_bytes:
+            session.drop_matrix()
+
+    def _write_snapshot(self, session: RouteSession) -> None:
+        """Foto completa da sessão; descarta o log de operações já incluído nela."""
+        points_json = json.dumps(session.points.to_records())
+        tour_json = json.dumps(session.tour)
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO route_sessions VALUES (?, ?, ?, ?, ?, ?)",
+                (session.session_id, session.mode, session.version, session.updated_at, points_json, tour_json)
+            )
+            self._db.execute(
+                "DELETE FROM route_session_operations WHERE session_id = ? AND version <= ?",
+                (session.session_id, session.version)
+            )
+            self._db.commit()
+
+    def _append_operations(self, session: RouteSession, operations: List[SessionOperation]) -> None:
+        """Grava só o lote aplicado (custo proporcional ao lote, não ao tamanho da rota)."""
+        operations_json = json.dumps([op.dict() for op in operations])
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO route_session_operations VALUES (?, ?, ?)",
+                (session.session_id, session.version, operations_json)
+            )
+            self._db.execute(
+                "UPDATE route_sessions SET updated_at = ? WHERE session_id = ?", (session.updated_at, session.session_id)
+            )
+            self._db.commit()
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            existed = self._sessions.pop(session_id, None) is not None
+        return self._delete_rows([session_id]) > 0 or existed
+
+    def _delete_rows(self, session_ids: List[str]) -> int:
+        """Remove sessões do SQLite; retorna quantas existiam lá."""
+        if self._db is None or not session_ids:
+            return 0
+        deleted = 0
+        with self._db_lock:
+            for session_id in session_ids:
+                deleted += self._db.execute("DELETE FROM route_sessions WHERE session_id = ?", (session_id,)).rowcount
+                self._db.execute("DELETE FROM route_session_operations WHERE session_id = ?", (session_id,))
+            self._db.commit()
+        return deleted
+
+    def _evict(self) -> List[str]:
+        """
+        Remove da memória as sessões expiradas e as menos usadas acima do limite (estas continuam
+        no SQLite). Retorna as expiradas, para serem apagadas do SQLite fora do lock.
+        """
+        expired = [sid for sid, s in self._sessions.items() if self._expired(s.updated_at)]
+        for session_id in expired:
+            del self._sessions[session_id]
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+        return expired
+
+    def _load(self, session_id: str) -> Optional[RouteSession]:
+        if self._db is None:
+            return None
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT mode, version, updated_at, points, tour FROM route_sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            batches = self._db.execute(
+                "SELECT operations FROM route_session_operations WHERE session_id = ? AND version > ? ORDER BY version",
+                (session_id, row[1] if row else 0)
+            ).fetchall()
+        if row is None:
+            return None
+        mode, version, updated_at, points_json, tour_json = row
+        if self._expired(updated_at):
+            self.delete(session_id)
+            return None
+        points = PointStore.from_points([Point(**r) for r in json.loads(points_json)], keep_original_index=True)
+        session = RouteSession(session_id, points, json.loads(tour_json), mode, version)
+        # Reaplica os lotes gravados depois da foto (as operações são determinísticas)
+        for (operations_json,) in batches:
+            session.apply([SessionOperation(**op) for op in json.loads(operations_json)])
+        session.updated_at = updated_at
+        return session
+
+# Instância única compartilhada por toda a aplicação
+route_sessions = RouteSessionStore(
+    ttl_s=settings.ROUTE_SESSION_TTL_S,
+    max_sessions=settings.ROUTE_SESSION_MAX_SESSIONS,
+    sqlite_path=settings.ROUTE_SESSION_SQLITE_PATH,
+    snapshot_every=settings.ROUTE_SESSION_SNAPSHOT_EVERY,
+    matrix_max_bytes=settings.ROUTE_SESSION_MATRIX_MAX_BYTES
+)
@@ -0,0 +1,4 @@
+# geoprumo/backend/benchmarks/__init__.py
+#
+# Benchmarks do backend do GeoPrumo. Execute a partir da pasta `backend`,
+# por exemplo: python -m benchmarks.startup
@@ -0,0 +1,104 @@
+# geoprumo/backend/benchmarks/generators.py
+
+"""
+Geradores sintéticos e determinísticos (com semente) de rotas e de arquivos de
+entrada (CSV, XLSX, KML, GPX) para os benchmarks. Nada aqui acessa a rede.
+"""
+
+import io
+from typing import List, Tuple
+from xml.sax.saxutils import escape
+
+import numpy as np
+import pandas as pd
+
+# Centro de referência: Belo Horizonte (mesmo foco usado no autocomplete)
+CENTER_LAT, CENTER_LON = -19.9167, -43.9333
+LAYOUTS = ("uniform", "clustered", "city_grid")
+
+class SyntheticRoute:
+    """Conjunto de pontos sintéticos com nomes, pronto para virar arquivo de entrada."""
+    def __init__(self, latitude: np.ndarray, longitude: np.ndarray, names: List[str], layout: str):
+        self.latitude = latitude
+        self.longitude = longitude
+        self.names = names
+        self.layout = layout
+
+    def __len__(self) -> int:
+        return len(self.latitude)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        return pd.DataFrame({"nome": self.names, "latitude": self.latitude, "longitude": self.longitude})
+
+    def to_csv_bytes(self, sep: str = ";") -> bytes:
+        return self.to_dataframe().to_csv(index=False, sep=sep).encode("utf-8")
+
+    def to_xlsx_bytes(self) -> bytes:
+        buffer = io.BytesIO()
+        self.to_dataframe().to_excel(buffer, index=False)
+        return buffer.getvalue()
+
+    def to_kml_bytes(self) -> bytes:
+        placemarks = "".join(
+            f"<Placemark><name>{escape(name)}</name><Point><coordinates>{lon:.6f},{lat:.6f},0</coordinates></Point></Placemark>"
+            for name, lat, lon in zip(self.names, self.latitude.tolist(), self.longitude.tolist())
+        )
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            f'<kml xmlns="http://www.opengis.net/kml/2.2"><Document><name>Benchmark</name>{placemarks}</Document></kml>'
+        ).encode("utf-8")
+
+    def to_gpx_bytes(self) -> bytes:
+        waypoints = "".join(
+            f'<wpt lat="{lat:.6f}" lon="{lon:.6f}"><name>{escape(name)}</name></wpt>'
+            for name, lat, lon in zip(self.names, self.latitude.tolist(), self.longitude.tolist())
+        )
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            f'<gpx version="1.1" creator="GeoPrumo benchmarks" xmlns="http://www.topografix.com/GPX/1/1">{waypoints}</gpx>'
+        ).encode("utf-8")
+
+    def to_file_bytes(self, file_format: str) -> bytes:
+        """Serializa a rota em um dos formatos aceitos pelo `/optimize` (csv, xlsx, kml, gpx)."""
+        writers = {"csv": self.to_csv_bytes, "xlsx": self.to_xlsx_bytes, "kml": self.to_kml_bytes, "gpx": self.to_gpx_bytes}
+        return writers[file_format]()
+
+def _uniform(rng: np.random.Generator, n: int, radius_deg: float) -> Tuple[np.ndarray, np.ndarray]:
+    lat = CENTER_LAT + rng.uniform(-radius_deg, radius_deg, n)
+    lon = CENTER_LON + rng.uniform(-radius_deg, radius_deg, n)
+    return lat, lon
+
+def _clustered(rng: np.random.Generator, n: int, radius_deg: float) -> Tuple[np.ndarray, np.ndarray]:
+    n_clusters = max(1, int(np.sqrt(n) / 2))
+    centers_lat, centers_lon = _uniform(rng, n_clusters, radius_deg)
+    labels = rng.integers(0, n_clusters, n)
+    spread = radius_deg / 20
+    return centers_lat[labels] + rng.normal(0, spread, n), centers_lon[labels] + rng.normal(0, spread, n)
+
+def _city_grid(rng: np.random.Generator, n: int, radius_deg: float) -> Tuple[np.ndarray, np.ndarray]:
+    # Quarteirões de ~100 m: pontos sobre as ruas de uma malha regular
+    block = 0.001
+    blocks = max(2, int(2 * radius_deg / block))
+    streets = rng.integers(0, blocks, n) * block - radius_deg
+    along = rng.uniform(-radius_deg, radius_deg, n)
+    on_horizontal = rng.random(n) < 0.5
+    lat = CENTER_LAT + np.where(on_horizontal, streets, along)
+    lon = CENTER_LON + np.where(on_horizontal, along, streets)
+    return lat, lon
+
+def generate_route(n_points: int, layout: str = "uniform", seed: int = 42, radius_deg: float = 0.15) -> SyntheticRoute:
+    """Gera `n_points` pontos no layout pedido: 'uniform', 'clustered' ou 'city_grid'."""
+    generators = {"uniform": _uniform, "clustered": _clustered, "city_grid": _city_grid}
+    if layout not in generators:
+        raise ValueError(f"Layout desconhecido: {layout}. Use um de {LAYOUTS}.")
+    rng = np.random.default_rng(seed)
+    lat, lon = generators[layout](rng, n_points, radius_deg)
+    names = [f"Ponto {layout} {i + 1}" for i in range(n_points)]
+    return SyntheticRoute(np.round(lat, 6), np.round(lon, 6), names, layout)
+
+def generate_route_sets(n_routes: int, n_points: int, seed: int = 42) -> List[SyntheticRoute]:
+    """Gera várias rotas independentes, alternando entre os layouts disponíveis."""
+    return [
+        generate_route(n_points, LAYOUTS[i % len(LAYOUTS)], seed=seed + i)
+        for i in range(n_routes)
+    ]
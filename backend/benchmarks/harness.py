@@ -0,0 +1,65 @@
+# geoprumo/backend/benchmarks/harness.py
+
+"""
+Utilitários comuns aos benchmarks: medição de etapas, gravação dos resultados
+em JSON e comparação com um baseline salvo, com limite de regressão.
+"""
+
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+
+def time_stage(func: Callable[[], Any], repeat: int = 3) -> Dict[str, Any]:
+    """Executa `func` `repeat` vezes e retorna as estatísticas de tempo (em segundos)."""
+    samples: List[float] = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - start)
+    return {
+        "median_s": statistics.median(samples),
+        "min_s": min(samples),
+        "max_s": max(samples),
+        "repeat": repeat,
+        "result": result,
+    }
+
+def environment() -> Dict[str, str]:
+    """Informações do ambiente, gravadas junto dos resultados."""
+    return {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }
+
+def save_results(path: str, results: Dict[str, Any]) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+
+def load_results(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float, min_delta_s: float = 0.002) -> List[Dict[str, Any]]:
+    """
+    Compara as medianas de `current["stages"]` com as do baseline.
+    Retorna a lista de etapas que ficaram mais lentas que `threshold` (ex.: 0.2 = 20%)
+    e cuja diferença absoluta supera `min_delta_s` (evita ruído em etapas muito rápidas).
+    """
+    regressions = []
+    baseline_stages = baseline.get("stages", {})
+    for key, stage in current.get("stages", {}).items():
+        base = baseline_stages.get(key)
+        if not base:
+            continue
+        delta = stage["median_s"] - base["median_s"]
+        ratio = stage["median_s"] / base["median_s"] if base["median_s"] else float("inf")
+        if ratio > 1 + threshold and delta > min_delta_s:
+            regressions.append({"stage": key, "baseline_s": base["median_s"], "current_s": stage["median_s"], "ratio": ratio})
+    return regressions
@@ -0,0 +1,164 @@
+# geoprumo/backend/benchmarks/load_test.py
+
+"""
+Teste de carga concorrente contra a API do GeoPrumo em execução.
+Reporta, por endpoint, latência p50/p95/p99, vazão e erros.
+
+Exemplo completo, sem consumir cota das APIs externas:
+    python -m benchmarks.stub_server --port 8090 --latency-ms 200 --jitter-ms 50
+    ORS_BASE_URL=http://127.0.0.1:8090/ors GEMINI_API_ENDPOINT=http://127.0.0.1:8090/gemini \\
+        uvicorn app.main:app --port 8000
+    python -m benchmarks.load_test --concurrency 32 --duration 30 \\
+        --scenarios root autocomplete optimize_offline optimize_online --output carga.json
+
+Para comparar com uma execução anterior (ex.: versão com handlers síncronos):
+    python -m benchmarks.load_test ... --baseline carga_anterior.json
+"""
+
+import argparse
+import asyncio
+import base64
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+import httpx
+import numpy as np
+
+from benchmarks.generators import generate_route
+from benchmarks.harness import environment, load_results, save_results
+
+Scenario = Callable[[int], Tuple[str, str, Dict[str, Any]]]
+
+def build_scenarios(points: int, seed: int) -> Dict[str, Scenario]:
+    """Cada cenário recebe o número da requisição e devolve (método, caminho, kwargs do httpx)."""
+    route = generate_route(points, "clustered", seed)
+    csv_file = {"filename": "carga.csv", "content": base64.b64encode(route.to_csv_bytes()).decode("ascii")}
+    export_points = [
+        {"order": i + 1, "name": name, "latitude": lat, "longitude": lon, "original_index": i}
+        for i, (name, lat, lon) in enumerate(zip(route.names, route.latitude.tolist(), route.longitude.tolist()))
+    ]
+    queries = ["Avenida Afonso Pena", "Praça da Liberdade", "Rua da Bahia", "Mineirão", "Savassi"]
+
+    def optimize(mode: str) -> Scenario:
+        body = {"files": [csv_file], "options": {"optimization_mode": mode}}
+        return lambda i: ("POST", "/api/v1/process/optimize", {"json": body})
+
+    return {
+        "root": lambda i: ("GET", "/", {}),
+        "autocomplete": lambda i: ("GET", "/api/v1/geocode/autocomplete", {"params": {"q": queries[i % len(queries)]}}),
+        "search": lambda i: ("GET", "/api/v1/geocode/search", {"params": {"q": queries[i % len(queries)]}}),
+        "optimize_offline": optimize("offline"),
+        "optimize_online": optimize("online"),
+        "export_csv": lambda i: ("POST", "/api/v1/export/csv", {"json": export_points}),
+        "enrich": lambda i: ("POST", "/api/v1/process/enrich-with-ai", {"json": {"points": export_points[:40]}}),
+    }
+
+async def _worker(client: httpx.AsyncClient, scenarios: List[Tuple[str, Scenario]], samples: Dict[str, List[Tuple[float, int]]],
+                  counter: List[int], deadline: float, max_requests: int) -> None:
+    while time.perf_counter() < deadline and (not max_requests or counter[0] < max_requests):
+        i = counter[0]
+        counter[0] += 1
+        name, scenario = scenarios[i % len(scenarios)]
+        method, path, kwargs = scenario(i)
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, path, **kwargs)
+            status = response.status_code
+        except httpx.HTTPError:
+            status = 0 # falha de transporte (timeout, conexão recusada)
+        samples[name].append((time.perf_counter() - start, status))
+
+def summarize(samples: Dict[str, List[Tuple[float, int]]], elapsed_s: float) -> Dict[str, Dict[str, Any]]:
+    report = {}
+    for name, values in samples.items():
+        if not values:
+            continue
+        latencies = np.array([v[0] for v in values])
+        statuses: Dict[str, int] = {}
+        for _, status in values:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        ok = sum(1 for _, status in values if 200 <= status < 300)
+        report[name] = {
+            "requests": len(values),
+            "ok": ok,
+            "errors": len(values) - ok,
+            "throughput_rps": len(values) / elapsed_s,
+            "p50_ms": float(np.percentile(latencies, 50) * 1000),
+            "p95_ms": float(np.percentile(latencies, 95) * 1000),
+            "p99_ms": float(np.percentile(latencies, 99) * 1000),
+            "max_ms": float(latencies.max() * 1000),
+            "status_codes": statuses,
+        }
+    return report
+
+async def run(base_url: str, scenario_names: List[str], concurrency: int, duration_s: float,
+              max_requests: int, points: int, seed: int, timeout_s: float) -> Dict[str, Any]:
+    all_scenarios = build_scenarios(points, seed)
+    scenarios = [(name, all_scenarios[name]) for name in scenario_names]
+    samples: Dict[str, List[Tuple[float, int]]] = {name: [] for name in scenario_names}
+    counter = [0]
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout_s, limits=limits) as client:
+        start = time.perf_counter()
+        deadline = start + duration_s
+        await asyncio.gather(*(_worker(client, scenarios, samples, counter, deadline, max_requests) for _ in range(concurrency)))
+        elapsed_s = time.perf_counter() - start
+
+    return {
+        "benchmark": "load_test",
+        "environment": environment(),
+        "base_url": base_url,
+        "concurrency": concurrency,
+        "elapsed_s": elapsed_s,
+        "total_throughput_rps": counter[0] / elapsed_s,
+        "endpoints": summarize(samples, elapsed_s),
+    }
+
+def compare_load(current: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    """Razões atual/baseline de vazão e latência p95 para os endpoints presentes nas duas execuções."""
+    comparison = {}
+    for name, r in current["endpoints"].items():
+        base = baseline.get("endpoints", {}).get(name)
+        if not base:
+            continue
+        comparison[name] = {
+            "throughput_ratio": r["throughput_rps"] / base["throughput_rps"] if base["throughput_rps"] else float("inf"),
+            "p95_ratio": r["p95_ms"] / base["p95_ms"] if base["p95_ms"] else float("inf"),
+        }
+    return comparison
+
+def main(argv: List[str] = None) -> None:
+    arg_parser = argparse.ArgumentParser(description="Teste de carga concorrente da API do GeoPrumo.")
+    arg_parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    arg_parser.add_argument("--scenarios", nargs="+", default=["root", "autocomplete", "optimize_offline"],
+                            choices=list(build_scenarios(2, 0).keys()))
+    arg_parser.add_argument("--concurrency", type=int, default=16)
+    arg_parser.add_argument("--duration", type=float, default=20, help="Duração do teste, em segundos.")
+    arg_parser.add_argument("--requests", type=int, default=0, help="Limite total de requisições (0 = sem limite).")
+    arg_parser.add_argument("--points", type=int, default=200, help="Pontos por rota nos cenários de otimização/exportação.")
+    arg_parser.add_argument("--seed", type=int, default=42)
+    arg_parser.add_argument("--timeout", type=float, default=60, help="Timeout de cada requisição, em segundos.")
+    arg_parser.add_argument("--output", help="Arquivo JSON onde o resultado será salvo.")
+    arg_parser.add_argument("--baseline", help="Resultado JSON de uma execução anterior, para comparação.")
+    args = arg_parser.parse_args(argv)
+
+    report = asyncio.run(run(args.base_url, args.scenarios, args.concurrency, args.duration,
+                             args.requests, args.points, args.seed, args.timeout))
+
+    print(f"Concorrência {report['concurrency']}, {report['elapsed_s']:.1f} s, {report['total_throughput_rps']:.1f} req/s no total")
+    print(f"{'endpoint':<18} {'req':>6} {'erros':>6} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, r in report["endpoints"].items():
+        print(f"{name:<18} {r['requests']:>6} {r['errors']:>6} {r['throughput_rps']:>8.1f} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['p99_ms']:>9.1f}")
+
+    if args.baseline:
+        report["comparison"] = compare_load(report, load_results(args.baseline))
+        print("Comparação com o baseline (atual / anterior):")
+        for name, c in report["comparison"].items():
+            print(f"  {name:<18} vazão {c['throughput_ratio']:.2f}x   p95 {c['p95_ratio']:.2f}x")
+
+    if args.output:
+        save_results(args.output, report)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# geoprumo/backend/benchmarks/pipeline_memory.py
+
+"""
+Compara o tempo e o pico de memória, por etapa, do caminho antigo do `/optimize`
+(conversões repetidas entre Pydantic, dicionários e DataFrames) com o caminho
+atual baseado no PointStore. O solver não é executado: a rota é simulada por uma
+permutação aleatória, para isolar o custo das conversões.
+
+Uso (a partir da pasta backend):
+    python -m benchmarks.pipeline_memory --points 50000 --output pipeline.json
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.models.point_store import PointStore
+from app.models.schemas import Point
+from app.services.data_parser import DataParser
+from app.services.exporter import Exporter
+from benchmarks.generators import generate_route
+
+def _measure(func: Callable[[], Any]) -> Tuple[Any, Dict[str, float]]:
+    """Executa `func` medindo tempo de parede e pico de memória alocada (tracemalloc)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    wall_s = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, {"wall_s": wall_s, "peak_mb": peak / (1024 * 1024)}
+
+def make_inputs(n_points: int, seed: int) -> Tuple[List[Point], str]:
+    """Gera metade dos pontos como rota existente e metade como CSV novo."""
+    route = generate_route(n_points, "uniform", seed)
+    half = n_points // 2
+    existing = [
+        Point(order=i + 1, name=route.names[i], latitude=lat, longitude=lon, original_index=i)
+        for i, (lat, lon) in enumerate(zip(route.latitude[:half].tolist(), route.longitude[:half].tolist()))
+    ]
+    csv_text = route.to_dataframe().iloc[half:].to_csv(index=False, sep=";")
+    return existing, csv_text
+
+def run_legacy(existing: List[Point], csv_text: str, permutation: np.ndarray) -> Dict[str, Dict[str, float]]:
+    """Reproduz as conversões do `/optimize` anterior ao PointStore."""
+    parser, stages = DataParser(), {}
+
+    def consolidate():
+        df_existing = pd.DataFrame([p.dict() for p in existing])
+        df_existing.rename(columns={'name': 'Nome', 'latitude': 'Latitude', 'longitude': 'Longitude', 'observations': 'Observations'}, inplace=True)
+        df_new = parser._parse_csv_or_excel(csv_text.encode('utf-8'), is_excel=False)
+        raw_df = pd.concat([df_existing, df_new], ignore_index=True).drop(columns=['original_index'])
+        raw_df.reset_index(inplace=True); raw_df.rename(columns={'index': 'original_index'}, inplace=True)
+        return parser.clean_and_validate_data(parser._auto_detect_and_standardize_columns(raw_df))
+    clean_df, stages["consolidate"] = _measure(consolidate)
+
+    route_df, stages["route"] = _measure(lambda: clean_df.iloc[permutation].reset_index(drop=True))
+
+    def respond():
+        optimized_df = route_df.copy()
+        optimized_df.rename(columns={'Nome': 'name', 'Latitude': 'latitude', 'Longitude': 'longitude'}, inplace=True)
+        optimized_df['order'] = range(1, len(optimized_df) + 1)
+        records = optimized_df.to_dict(orient='records')
+        return [Point(**{k: v for k, v in p.items() if k in Point.model_fields and pd.notna(v)}) for p in records]
+    route_points, stages["response"] = _measure(respond)
+
+    def export():
+        df = pd.DataFrame([p.dict() for p in route_points])
+        return df.rename(columns={'order': 'Ordem', 'name': 'Nome', 'latitude': 'Latitude', 'longitude': 'Longitude'}).to_csv(index=False)
+    _, stages["export_csv"] = _measure(export)
+    return stages
+
+def run_point_store(existing: List[Point], csv_text: str, permutation: np.ndarray) -> Dict[str, Dict[str, float]]:
+    """Executa as mesmas etapas no caminho atual, baseado no PointStore."""
+    parser, exporter, stages = DataParser(), Exporter(), {}
+
+    def consolidate():
+        raw_df = parser._parse_csv_or_excel(csv_text.encode('utf-8'), is_excel=False)
+        raw_df['original_index'] = range(len(existing), len(existing) + len(raw_df))
+        clean_df = parser.clean_and_validate_data(parser._auto_detect_and_standardize_columns(raw_df))
+        return parser.build_point_store(existing, clean_df)
+    points, stages["consolidate"] = _measure(consolidate)
+
+    route, stages["route"] = _measure(lambda: points.take(permutation))
+    route_points, stages["response"] = _measure(route.to_points)
+    _, stages["export_csv"] = _measure(lambda: exporter.to_csv(PointStore.from_points(route_points)))
+    return stages
+
+def main(argv: List[str] = None) -> None:
+    arg_parser = argparse.ArgumentParser(description="Tempo e memória por etapa: DataFrames vs PointStore.")
+    arg_parser.add_argument("--points", type=int, default=50000)
+    arg_parser.add_argument("--seed", type=int, default=42)
+    arg_parser.add_argument("--output", help="Arquivo JSON onde o resultado será salvo.")
+    args = arg_parser.parse_args(argv)
+
+    existing, csv_text = make_inputs(args.points, args.seed)
+    permutation = np.random.default_rng(args.seed).permutation(args.points)
+    report = {
+        "benchmark": "pipeline_memory",
+        "points": args.points,
+        "before": run_legacy(existing, csv_text, permutation),
+        "after": run_point_store(existing, csv_text, permutation),
+    }
+
+    print(f"{'etapa':<12} {'antes (s)':>10} {'depois (s)':>11} {'antes (MB)':>11} {'depois (MB)':>12}")
+    for stage, before in report["before"].items():
+        after = report["after"][stage]
+        print(f"{stage:<12} {before['wall_s']:>10.3f} {after['wall_s']:>11.3f} {before['peak_mb']:>11.1f} {after['peak_mb']:>12.1f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
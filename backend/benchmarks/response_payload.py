@@ -0,0 +1,122 @@
+# geoprumo/backend/benchmarks/response_payload.py
+
+"""
+Benchmark do caminho de resposta do /optimize para rotas grandes.
+
+Compara, para 1k, 10k e 50k pontos (com um GeoJSON de rota no formato do ORS):
+    legacy: um schema Point por ponto, validação pelo response_model e o encoder JSON padrão do FastAPI;
+    fast:   registros montados direto do PointStore e serializados pelo orjson (FastJSONResponse).
+Cada variante é servida por uma aplicação ASGI local com a mesma compressão do servidor
+e medida de ponta a ponta (latência e bytes transferidos) para cada Accept-Encoding.
+
+Uso (a partir da pasta backend):
+    python -m benchmarks.response_payload --points 1000 10000 50000 --output resposta.json
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Any, Dict, List
+
+import httpx
+import numpy as np
+from fastapi import FastAPI
+
+from app.core.responses import BROTLI_AVAILABLE, ORJSON_AVAILABLE, FastJSONResponse, install_compression
+from app.models.point_store import PointStore
+from app.models.schemas import ProcessResponse
+from benchmarks.generators import generate_route
+from benchmarks.harness import environment, save_results
+
+ENCODINGS = ("identity", "gzip", "br")
+
+def make_store(n_points: int, seed: int) -> PointStore:
+    route = generate_route(n_points, "uniform", seed)
+    df = route.to_dataframe().rename(columns={"nome": "Nome", "latitude": "Latitude", "longitude": "Longitude"})
+    df["observations"] = [f"Observação do ponto {i + 1}" for i in range(n_points)]
+    return PointStore.from_dataframe(df)
+
+def make_geojson(points: PointStore, vertices_per_leg: int = 10) -> Dict[str, Any]:
+    """GeoJSON no formato do /directions do ORS, com vértices intermediários entre as paradas."""
+    t = np.linspace(0, 1, vertices_per_leg, endpoint=False)
+    lon = (points.longitude[:-1, None] + np.outer(np.diff(points.longitude), t)).ravel()
+    lat = (points.latitude[:-1, None] + np.outer(np.diff(points.latitude), t)).ravel()
+    coordinates = np.round(np.column_stack((lon, lat)), 6).tolist()
+    return {
+        "type": "FeatureCollection",
+        "features": [{
+            "type": "Feature",
+            "geometry": {"type": "LineString", "coordinates": coordinates},
+            "properties": {"summary": {"distance": 123456.7, "duration": 7890.1}},
+        }],
+    }
+
+def build_app(points: PointStore, geojson: Dict[str, Any]) -> FastAPI:
+    app = FastAPI()
+    install_compression(app)
+
+    @app.get("/legacy", response_model=ProcessResponse)
+    def legacy():
+        return ProcessResponse(
+            status="success", message="ok", optimized_route=points.to_points(),
+            summary={"distance_km": 123.4, "duration_min": 131.5}, map_geojson=geojson
+        )
+
+    @app.get("/fast", response_model=ProcessResponse)
+    def fast():
+        return FastJSONResponse(content={
+            "status": "success", "message": "ok", "optimized_route": points.to_records(),
+            "summary": {"distance_km": 123.4, "duration_min": 131.5}, "map_geojson": geojson,
+            "degraded": False, "timings": None
+        })
+
+    return app
+
+async def measure(app: FastAPI, path: str, encoding: str, repeat: int) -> Dict[str, Any]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        samples, wire_bytes, body_bytes = [], 0, 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = await client.get(path, headers={"Accept-Encoding": encoding})
+            body = response.content
+            samples.append(time.perf_counter() - start)
+            wire_bytes, body_bytes = response.num_bytes_downloaded, len(body)
+        return {
+            "median_s": statistics.median(samples), "min_s": min(samples), "max_s": max(samples), "repeat": repeat,
+            "wire_bytes": wire_bytes, "json_bytes": body_bytes,
+            "content_encoding": response.headers.get("content-encoding", "identity"),
+        }
+
+async def run(points_list: List[int], seed: int, repeat: int) -> Dict[str, Dict[str, Any]]:
+    stages: Dict[str, Dict[str, Any]] = {}
+    for n_points in points_list:
+        points = make_store(n_points, seed)
+        app = build_app(points, make_geojson(points))
+        for path in ("/legacy", "/fast"):
+            for encoding in ENCODINGS:
+                stages[f"{path[1:]}@{n_points}@{encoding}"] = await measure(app, path, encoding, repeat)
+    return stages
+
+def main(argv: List[str] = None) -> None:
+    arg_parser = argparse.ArgumentParser(description="Latência e tamanho das respostas do /optimize.")
+    arg_parser.add_argument("--points", type=int, nargs="+", default=[1000, 10000, 50000])
+    arg_parser.add_argument("--seed", type=int, default=42)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    arg_parser.add_argument("--output", help="Arquivo JSON onde os resultados serão salvos.")
+    args = arg_parser.parse_args(argv)
+
+    results = {
+        "benchmark": "response_payload", "environment": environment(), "seed": args.seed,
+        "orjson": ORJSON_AVAILABLE, "brotli": BROTLI_AVAILABLE,
+        "stages": asyncio.run(run(args.points, args.seed, args.repeat)),
+    }
+    for key, stage in results["stages"].items():
+        print(f"  {stage['median_s'] * 1000:10.2f} ms  {stage['wire_bytes']:>12,} bytes ({stage['content_encoding']})  {key}")
+
+    if args.output:
+        save_results(args.output, results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# geoprumo/backend/benchmarks/startup.py
+
+"""
+Mede o tempo de inicialização da API (importação de `app.main`) e o tempo de
+importação de cada módulo, usando `python -X importtime` em um processo novo.
+
+Uso (a partir da pasta backend):
+    python -m benchmarks.startup --repeat 5 --top 25 --output startup.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Any
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Módulos pesados que não devem ser carregados na subida do servidor
+HEAVY_MODULES = ["pandas", "numpy", "ortools", "lxml", "gpxpy", "google.generativeai", "openpyxl"]
+
+def _parse_importtime(stderr: str) -> Dict[str, Dict[str, int]]:
+    """Converte a saída de `-X importtime` em {modulo: {"self_us", "cumulative_us"}}."""
+    modules: Dict[str, Dict[str, int]] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            _, self_us, cumulative_us, name = [part.strip() for part in line.replace("import time:", "|", 1).split("|")]
+            modules[name] = {"self_us": int(self_us), "cumulative_us": int(cumulative_us)}
+        except ValueError:
+            continue
+    return modules
+
+def run_once() -> Dict[str, Any]:
+    """Importa `app.main` em um interpretador novo e coleta os tempos."""
+    code = (
+        "import json, sys\n"
+        "import app.main\n"
+        f"heavy = {HEAVY_MODULES!r}\n"
+        "print(json.dumps([m for m in heavy if m in sys.modules]))\n"
+    )
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    )
+    wall_s = time.perf_counter() - start
+    return {
+        "wall_s": wall_s,
+        "modules": _parse_importtime(result.stderr),
+        "heavy_loaded": json.loads(result.stdout.strip().splitlines()[-1]),
+    }
+
+def run(repeat: int, top: int) -> Dict[str, Any]:
+    """Executa a medição `repeat` vezes e agrega a mediana por módulo."""
+    runs = [run_once() for _ in range(repeat)]
+
+    per_module: Dict[str, List[int]] = {}
+    for r in runs:
+        for name, times in r["modules"].items():
+            per_module.setdefault(name, []).append(times["cumulative_us"])
+
+    modules = sorted(
+        ({"module": name, "cumulative_ms": statistics.median(values) / 1000} for name, values in per_module.items()),
+        key=lambda m: m["cumulative_ms"], reverse=True
+    )
+    app_main = next((m for m in modules if m["module"] == "app.main"), None)
+    return {
+        "benchmark": "startup",
+        "repeat": repeat,
+        "process_wall_s_median": statistics.median(r["wall_s"] for r in runs),
+        "app_main_import_ms": app_main["cumulative_ms"] if app_main else None,
+        "heavy_modules_loaded_at_startup": runs[-1]["heavy_loaded"],
+        "modules": modules[:top],
+    }
+
+def main(argv: List[str] = None) -> None:
+    arg_parser = argparse.ArgumentParser(description="Mede o tempo de inicialização da API do GeoPrumo.")
+    arg_parser.add_argument("--repeat", type=int, default=5, help="Número de processos medidos.")
+    arg_parser.add_argument("--top", type=int, default=25, help="Quantidade de módulos listados.")
+    arg_parser.add_argument("--output", help="Arquivo JSON onde o resultado será salvo.")
+    args = arg_parser.parse_args(argv)
+
+    report = run(args.repeat, args.top)
+    print(f"Subida do processo (mediana): {report['process_wall_s_median'] * 1000:.1f} ms")
+    print(f"Importação de app.main: {report['app_main_import_ms']} ms")
+    print(f"Módulos pesados carregados na subida: {report['heavy_modules_loaded_at_startup'] or 'nenhum'}")
+    for m in report["modules"]:
+        print(f"  {m['cumulative_ms']:10.2f} ms  {m['module']}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+if __name__ == "__main__":
+    main()
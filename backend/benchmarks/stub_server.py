@@ -0,0 +1,187 @@
+# geoprumo/backend/benchmarks/stub_server.py
+
+"""
+Servidor local que imita as APIs externas usadas pelo GeoPrumo, para testes de
+carga sem consumir cota do OpenRouteService e do Gemini.
+
+Endpoints imitados:
+    POST /ors/optimization
+    POST /ors/v2/directions/{profile}/geojson
+    POST /ors/v2/matrix/{profile}
+    GET  /ors/geocode/search
+    GET  /ors/geocode/autocomplete
+    POST /gemini/v1beta/models/{modelo}:generateContent
+
+Latência e erros são configuráveis na linha de comando ou em tempo de execução
+via POST /_stub/config (ex.: {"latency_ms": 2000, "error_rate": 0.5}).
+
+Uso (a partir da pasta backend):
+    python -m benchmarks.stub_server --port 8090 --latency-ms 150 --jitter-ms 50 --error-rate 0.02
+
+E, para apontar a API para o stub:
+    ORS_BASE_URL=http://127.0.0.1:8090/ors GEMINI_API_ENDPOINT=http://127.0.0.1:8090/gemini uvicorn app.main:app
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+from typing import Any, Dict, List
+
+import uvicorn
+from fastapi import Body, FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from app.core.utils import haversine_distance
+
+# Velocidade média usada para estimar durações (m/s, ~40 km/h)
+AVERAGE_SPEED_MS = 11.0
+CENTER_LAT, CENTER_LON = -19.9167, -43.9333
+
+class StubConfig:
+    """Configuração de latência e injeção de erros, alterável em tempo de execução."""
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0, error_rate: float = 0,
+                 error_status: int = 503, hang_rate: float = 0, hang_s: float = 60, seed: int = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.hang_rate = hang_rate
+        self.hang_s = hang_s
+        self.random = random.Random(seed)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {k: v for k, v in vars(self).items() if k != "random"}
+
+config = StubConfig()
+app = FastAPI(title="GeoPrumo - stub de APIs externas")
+
+@app.middleware("http")
+async def inject_latency_and_errors(request: Request, call_next):
+    if request.url.path.startswith("/_stub"):
+        return await call_next(request)
+    rng = config.random
+    if config.hang_rate and rng.random() < config.hang_rate:
+        await asyncio.sleep(config.hang_s) # simula upstream travado (timeout no cliente)
+    delay_ms = config.latency_ms + (rng.uniform(-config.jitter_ms, config.jitter_ms) if config.jitter_ms else 0)
+    if delay_ms > 0:
+        await asyncio.sleep(delay_ms / 1000)
+    if config.error_rate and rng.random() < config.error_rate:
+        return JSONResponse(status_code=config.error_status, content={"error": "erro injetado pelo stub"})
+    return await call_next(request)
+
+@app.get("/_stub/config")
+def get_config():
+    return config.as_dict()
+
+@app.post("/_stub/config")
+def update_config(changes: Dict[str, Any] = Body(...)):
+    for key, value in changes.items():
+        if key in config.as_dict():
+            setattr(config, key, value)
+    return config.as_dict()
+
+# --- OpenRouteService ---
+
+def _path_length(coords: List[List[float]]) -> float:
+    return float(sum(
+        haversine_distance(a[1], a[0], b[1], b[0]) for a, b in zip(coords, coords[1:])
+    ))
+
+@app.post("/ors/optimization")
+def ors_optimization(payload: Dict[str, Any] = Body(...)):
+    """Ordena os jobs pelo vizinho mais próximo a partir do início do veículo."""
+    vehicle = payload["vehicles"][0]
+    remaining = list(payload.get("jobs", []))
+    current = vehicle["start"]
+    steps = [{"type": "start", "location": vehicle["start"]}]
+    while remaining:
+        nearest = min(remaining, key=lambda j: haversine_distance(current[1], current[0], j["location"][1], j["location"][0]))
+        remaining.remove(nearest)
+        steps.append({"type": "job", "id": nearest["id"], "location": nearest["location"]})
+        current = nearest["location"]
+    steps.append({"type": "end", "location": vehicle["end"]})
+    cost = _path_length([s["location"] for s in steps])
+    return {"code": 0, "summary": {"cost": cost, "routes": 1}, "routes": [{"vehicle": vehicle["id"], "cost": cost, "steps": steps}]}
+
+@app.post("/ors/v2/directions/{profile}/geojson")
+def ors_directions(profile: str, payload: Dict[str, Any] = Body(...)):
+    coords = payload["coordinates"]
+    distance = _path_length(coords)
+    return {
+        "type": "FeatureCollection",
+        "features": [{
+            "type": "Feature",
+            "geometry": {"type": "LineString", "coordinates": coords},
+            "properties": {"summary": {"distance": distance, "duration": distance / AVERAGE_SPEED_MS}},
+        }],
+    }
+
+@app.post("/ors/v2/matrix/{profile}")
+def ors_matrix(profile: str, payload: Dict[str, Any] = Body(...)):
+    locations = payload["locations"]
+    distances = [[float(haversine_distance(a[1], a[0], b[1], b[0])) for b in locations] for a in locations]
+    return {
+        "distances": distances,
+        "durations": [[d / AVERAGE_SPEED_MS for d in row] for row in distances],
+    }
+
+def _fake_features(text: str, count: int) -> List[Dict[str, Any]]:
+    rng = random.Random(text) # determinístico por texto buscado
+    return [{
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [CENTER_LON + rng.uniform(-0.1, 0.1), CENTER_LAT + rng.uniform(-0.1, 0.1)]},
+        "properties": {"label": f"{text} {i + 1}, Belo Horizonte - MG, Brasil"},
+    } for i in range(count)]
+
+@app.get("/ors/geocode/search")
+def ors_geocode_search(text: str, size: int = 10):
+    return {"type": "FeatureCollection", "features": _fake_features(text, size)}
+
+@app.get("/ors/geocode/autocomplete")
+def ors_geocode_autocomplete(text: str):
+    return {"type": "FeatureCollection", "features": _fake_features(text, 5)}
+
+# --- Google Gemini (API REST) ---
+
+@app.post("/gemini/v1beta/models/{model_action}")
+async def gemini_generate(model_action: str, request: Request):
+    """Responde ao generateContent com um array JSON no formato pedido pelos prompts do AIServices."""
+    if not model_action.endswith(":generateContent"):
+        return JSONResponse(status_code=404, content={"error": "método não suportado pelo stub"})
+    body = await request.json()
+    prompt = " ".join(part.get("text", "") for c in body.get("contents", []) for part in c.get("parts", []))
+    ids = [int(i) for i in re.findall(r'"id":\s*(\d+)', prompt)]
+    if "nome_padronizado" in prompt:
+        answer = [{"id": i, "nome_padronizado": f"Local Padronizado {i}"} for i in ids]
+    else:
+        answer = [{"id": i, "endereco": f"Rua Exemplo, {i} - Centro, Belo Horizonte - MG", "categoria": "Outro"} for i in ids]
+    return {
+        "candidates": [{
+            "content": {"role": "model", "parts": [{"text": json.dumps(answer, ensure_ascii=False)}]},
+            "finishReason": "STOP",
+            "index": 0,
+        }],
+    }
+
+def main(argv: List[str] = None) -> None:
+    arg_parser = argparse.ArgumentParser(description="Stub local das APIs do ORS e do Gemini.")
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8090)
+    arg_parser.add_argument("--latency-ms", type=float, default=0, help="Latência base de cada resposta.")
+    arg_parser.add_argument("--jitter-ms", type=float, default=0, help="Variação aleatória (+/-) da latência.")
+    arg_parser.add_argument("--error-rate", type=float, default=0, help="Fração de respostas com erro (0 a 1).")
+    arg_parser.add_argument("--error-status", type=int, default=503, help="Status HTTP dos erros injetados.")
+    arg_parser.add_argument("--hang-rate", type=float, default=0, help="Fração de requisições que ficam travadas.")
+    arg_parser.add_argument("--hang-s", type=float, default=60, help="Tempo de travamento, em segundos.")
+    arg_parser.add_argument("--seed", type=int, default=None)
+    args = arg_parser.parse_args(argv)
+
+    global config
+    config = StubConfig(args.latency_ms, args.jitter_ms, args.error_rate, args.error_status,
+                        args.hang_rate, args.hang_s, args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+# geoprumo/backend/benchmarks/suite.py
+
+"""
+Suíte de micro-benchmarks do pipeline do GeoPrumo, totalmente offline.
+
+Para cada tamanho de rota e layout sintético mede as etapas:
+    parse_csv, parse_xlsx, parse_kml, parse_gpx, standardize, clean,
+    optimize_offline e todas as exportações (csv, kml, gpx, geojson, mymaps, google_links).
+Mede também o lote de rotas independentes do /process/bulk (--bulk-routes):
+    bulk_sequential (uma rota após a outra no processo atual) e bulk_process_pool
+    (BulkOptimizer, com as vagas do solver_pool, como no endpoint).
+
+Uso (a partir da pasta backend):
+    python -m benchmarks.suite --points 500 5000 --output atual.json
+    python -m benchmarks.suite --points 500 5000 --baseline baseline.json --threshold 0.2
+    python -m benchmarks.suite --points 200 --bulk-routes 16 --bulk-points 300
+
+Com --baseline, o processo termina com código 1 se alguma etapa regredir além do limite.
+"""
+
+import argparse
+import asyncio
+import sys
+from typing import Any, Dict, List
+
+from app.core.config import settings
+from app.core.utils import haversine_distance
+from app.services.bulk_optimizer import bulk_optimizer
+from app.services.data_parser import DataParser
+from app.services.exporter import Exporter
+from app.services.optimizer import RouteOptimizer
+from benchmarks.generators import LAYOUTS, generate_route, generate_route_sets
+from benchmarks.harness import compare, environment, load_results, save_results, time_stage
+
+FILE_FORMATS = ("csv", "xlsx", "kml", "gpx")
+EXPORT_FORMATS = ("csv", "kml", "gpx", "geojson", "mymaps", "google_links")
+
+def _route_length_km(points) -> float:
+    lat, lon = points.latitude.tolist(), points.longitude.tolist()
+    return sum(haversine_distance(lat[i], lon[i], lat[i + 1], lon[i + 1]) for i in range(len(lat) - 1)) / 1000
+
+def run_case(n_points: int, layout: str, seed: int, repeat: int, solver_time_limit_s: int) -> Dict[str, Dict[str, Any]]:
+    """Mede todas as etapas para uma rota sintética; as chaves são 'etapa@pontos@layout'."""
+    parser, optimizer, exporter = DataParser(), RouteOptimizer(), Exporter()
+    route = generate_route(n_points, layout, seed)
+    stages: Dict[str, Dict[str, Any]] = {}
+
+    def record(stage: str, measured: Dict[str, Any], **extra: Any) -> Any:
+        result = measured.pop("result")
+        stages[f"{stage}@{n_points}@{layout}"] = {**measured, **extra}
+        return result
+
+    parsers = {
+        "csv": lambda content: parser._parse_csv_or_excel(content, is_excel=False),
+        "xlsx": lambda content: parser._parse_csv_or_excel(content, is_excel=True),
+        "kml": parser._parse_kml,
+        "gpx": parser._parse_gpx,
+    }
+    raw_df = None
+    for file_format in FILE_FORMATS:
+        content = route.to_file_bytes(file_format)
+        df = record(f"parse_{file_format}", time_stage(lambda: parsers[file_format](content), repeat), bytes=len(content))
+        if file_format == "csv":
+            raw_df = df
+
+    standardized_df = record("standardize", time_stage(lambda: parser._auto_detect_and_standardize_columns(raw_df), repeat))
+    clean_df = record("clean", time_stage(lambda: parser.clean_and_validate_data(standardized_df.copy()), repeat))
+    points = parser.build_point_store([], clean_df)
+
+    # O solver roda até o limite de tempo; uma repetição basta e a distância indica a qualidade.
+    result = time_stage(lambda: optimizer.optimize_offline(points, time_limit_s=solver_time_limit_s), 1)
+    route_points = record("optimize_offline", result, route_km=_route_length_km(result["result"]),
+                          time_limit_s=solver_time_limit_s)
+
+    exporters = {
+        "csv": exporter.to_csv, "kml": exporter.to_kml, "gpx": exporter.to_gpx,
+        "geojson": exporter.to_geojson, "mymaps": exporter.to_mymaps_csv,
+        "google_links": exporter.generate_google_maps_links,
+    }
+    for export_format in EXPORT_FORMATS:
+        record(f"export_{export_format}", time_stage(lambda: exporters[export_format](route_points), repeat))
+    return stages
+
+def run_bulk_case(n_routes: int, n_points: int, seed: int, solver_time_limit_s: int) -> Dict[str, Dict[str, Any]]:
+    """
+    Otimiza `n_routes` rotas independentes (layouts alternados) em sequência e pelo
+    BulkOptimizer; as chaves são 'etapa@rotasxpontos'. O solver roda até o limite de tempo,
+    então cada caminho é medido uma vez e a soma das distâncias indica a qualidade.
+    """
+    parser, optimizer = DataParser(), RouteOptimizer()
+    stores = []
+    for route in generate_route_sets(n_routes, n_points, seed):
+        clean_df = parser.clean_and_validate_data(parser._auto_detect_and_standardize_columns(route.to_dataframe()))
+        stores.append(parser.build_point_store([], clean_df))
+    stages: Dict[str, Dict[str, Any]] = {}
+
+    def record(stage: str, measured: Dict[str, Any]) -> None:
+        routes = measured.pop("result")
+        stages[f"{stage}@{n_routes}x{n_points}"] = {
+            **measured, "route_km": sum(_route_length_km(points) for points in routes),
+            "routes_per_s": n_routes / measured["median_s"], "time_limit_s": solver_time_limit_s,
+        }
+
+    record("bulk_sequential", time_stage(
+        lambda: [optimizer.optimize_offline(points, time_limit_s=solver_time_limit_s) for points in stores], 1
+    ))
+
+    async def optimize_all():
+        results = await asyncio.gather(*(bulk_optimizer.optimize(points, "offline") for points in stores))
+        return [result["data"] for result in results]
+
+    # O BulkOptimizer usa o limite configurado (OFFLINE_TIME_LIMIT_S), igualado aqui ao da medição
+    time_limit_s = settings.OFFLINE_TIME_LIMIT_S
+    settings.OFFLINE_TIME_LIMIT_S = solver_time_limit_s
+    try:
+        bulk_optimizer.pool() # criação dos processos fora da medição
+        record("bulk_process_pool", time_stage(lambda: asyncio.run(optimize_all()), 1))
+    finally:
+        settings.OFFLINE_TIME_LIMIT_S = time_limit_s
+        bulk_optimizer.shutdown()
+    return stages
+
+def main(argv: List[str] = None) -> None:
+    arg_parser = argparse.ArgumentParser(description="Micro-benchmarks offline do pipeline do GeoPrumo.")
+    arg_parser.add_argument("--points", type=int, nargs="+", default=[200, 2000], help="Tamanhos de rota medidos.")
+    arg_parser.add_argument("--layouts", nargs="+", default=list(LAYOUTS), choices=LAYOUTS)
+    arg_parser.add_argument("--seed", type=int, default=42)
+    arg_parser.add_argument("--repeat", type=int, default=3, help="Repetições por etapa (exceto o solver).")
+    arg_parser.add_argument("--solver-time-limit", type=int, default=1, help="Limite do OR-Tools, em segundos.")
+    arg_parser.add_argument("--bulk-routes", type=int, default=8, help="Rotas do lote medido (0 = não mede o lote).")
+    arg_parser.add_argument("--bulk-points", type=int, default=200, help="Pontos por rota do lote.")
+    arg_parser.add_argument("--output", help="Arquivo JSON onde os resultados serão salvos.")
+    arg_parser.add_argument("--baseline", help="Arquivo JSON de baseline para comparação.")
+    arg_parser.add_argument("--threshold", type=float, default=0.2, help="Regressão tolerada (0.2 = 20%%).")
+    args = arg_parser.parse_args(argv)
+
+    results = {"benchmark": "suite", "environment": environment(), "seed": args.seed, "stages": {}}
+    for n_points in args.points:
+        for layout in args.layouts:
+            print(f"Medindo {n_points} pontos ({layout})...")
+            results["stages"].update(run_case(n_points, layout, args.seed, args.repeat, args.solver_time_limit))
+    if args.bulk_routes > 0:
+        print(f"Medindo lote de {args.bulk_routes} rotas de {args.bulk_points} pontos...")
+        results["stages"].update(run_bulk_case(args.bulk_routes, args.bulk_points, args.seed, args.solver_time_limit))
+
+    for key, stage in results["stages"].items():
+        print(f"  {stage['median_s'] * 1000:10.2f} ms  {key}")
+
+    if args.output:
+        save_results(args.output, results)
+
+    if args.baseline:
+        regressions = compare(results, load_results(args.baseline), args.threshold)
+        for r in regressions:
+            print(f"REGRESSÃO {r['stage']}: {r['baseline_s'] * 1000:.2f} ms -> {r['current_s'] * 1000:.2f} ms ({r['ratio']:.2f}x)")
+        if regressions:
+            sys.exit(1)
+        print(f"Nenhuma regressão acima de {args.threshold:.0%} em relação ao baseline.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# geoprumo/backend/benchmarks/utm_ingest.py
+
+"""
+Benchmark da ingestão de planilhas em UTM e em graus/minutos/segundos (DMS).
+
+Gera uma planilha sintética (padrão: 500 mil linhas) com pontos espalhados pelas
+zonas UTM 22 a 24 e mede leitura do CSV, padronização das colunas e limpeza
+(conversão vetorizada para latitude/longitude), além da conversão linha a linha
+com utm.to_latlon como referência. Também confere o erro máximo da conversão.
+
+Uso (a partir da pasta backend):
+    python -m benchmarks.utm_ingest --rows 500000 --output utm.json
+"""
+
+import argparse
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from app.core.utils import haversine_many
+from app.services.data_parser import DataParser
+from benchmarks.harness import environment, save_results, time_stage
+
+# Bandas de latitude UTM (8° cada, a partir de 80° S)
+LATITUDE_BANDS = "CDEFGHJKLMNPQRSTUVWXX"
+
+def generate_utm_sheet(n_rows: int, seed: int) -> pd.DataFrame:
+    """Planilha no formato entregue pelas equipes de topografia: Nome, Este, Norte, Zona."""
+    import utm
+
+    rng = np.random.default_rng(seed)
+    lat = rng.uniform(-25, -5, n_rows)
+    lon = rng.uniform(-54, -36, n_rows)
+    zone = ((lon + 180) // 6 + 1).astype(int)
+    easting, northing = np.empty(n_rows), np.empty(n_rows)
+    for z in np.unique(zone):
+        m = zone == z
+        easting[m], northing[m], _, _ = utm.from_latlon(lat[m], lon[m], force_zone_number=int(z), force_zone_letter="K")
+    bands = np.array(list(LATITUDE_BANDS))[((lat + 80) // 8).astype(int)]
+    return pd.DataFrame({
+        "Nome": [f"Marco {i + 1}" for i in range(n_rows)],
+        "Este": np.round(easting, 2),
+        "Norte": np.round(northing, 2),
+        "Zona": np.char.add(zone.astype(str), bands),
+        "_lat": lat,
+        "_lon": lon,
+    })
+
+def to_dms(values: np.ndarray, positive: str, negative: str) -> List[str]:
+    """Graus/minutos/segundos com 2 casas; o arredondamento (ex.: 59,999") sobe para o minuto e o grau."""
+    hemisphere = np.where(values < 0, negative, positive)
+    hundredths = np.rint(np.abs(values) * 360_000).astype(np.int64) # centésimos de segundo
+    degrees, rest = np.divmod(hundredths, 360_000)
+    minutes, seconds = np.divmod(rest, 6_000)
+    return [f"{d}°{m}'{s / 100:.2f}\"{h}" for d, m, s, h in zip(degrees, minutes, seconds, hemisphere)]
+
+def max_error_m(clean: pd.DataFrame, sheet: pd.DataFrame) -> int:
+    """Maior distância entre o ponto convertido e o original, casando as linhas pelo Nome."""
+    reference = sheet.set_index("Nome").loc[clean["Nome"]]
+    error_m = haversine_many(clean["Latitude"].to_numpy(), clean["Longitude"].to_numpy(),
+                             reference["_lat"].to_numpy(), reference["_lon"].to_numpy())
+    return int(error_m.max()) if len(error_m) else 0
+
+def run(n_rows: int, seed: int, repeat: int, row_sample: int) -> Dict[str, Dict[str, Any]]:
+    import utm
+
+    parser = DataParser()
+    sheet = generate_utm_sheet(n_rows, seed)
+    content = sheet.drop(columns=["_lat", "_lon"]).to_csv(index=False, sep=";").encode("utf-8")
+    stages: Dict[str, Dict[str, Any]] = {}
+
+    def record(stage: str, measured: Dict[str, Any], rows: int, **extra: Any) -> Any:
+        result = measured.pop("result")
+        stages[f"{stage}@{rows}"] = {**measured, "rows_per_s": rows / measured["median_s"], **extra}
+        return result
+
+    raw_df = record("parse_csv", time_stage(lambda: parser._parse_csv_or_excel(content, is_excel=False), 1), n_rows,
+                    bytes=len(content))
+    standardized = record("standardize", time_stage(lambda: parser._auto_detect_and_standardize_columns(raw_df), repeat), n_rows)
+    clean = record("clean_utm_vectorized", time_stage(lambda: parser.clean_and_validate_data(standardized.copy()), repeat), n_rows)
+
+    stages[f"clean_utm_vectorized@{n_rows}"].update(rows_out=len(clean), max_error_m=max_error_m(clean, sheet))
+
+    # Referência: uma chamada de utm.to_latlon por linha, numa amostra
+    sample = sheet.head(row_sample)
+    zones = sample["Zona"].str[:-1].astype(int).tolist()
+
+    def per_row():
+        return [utm.to_latlon(e, n, z, northern=False) for e, n, z in zip(sample["Este"].tolist(), sample["Norte"].tolist(), zones)]
+
+    record("utm_per_row_reference", time_stage(per_row, repeat), len(sample))
+
+    dms = pd.DataFrame({
+        "Nome": sheet["Nome"],
+        "Latitude": to_dms(sheet["_lat"].to_numpy(), "N", "S"),
+        "Longitude": to_dms(sheet["_lon"].to_numpy(), "L", "O"),
+    })
+    clean_dms = record("clean_dms_vectorized", time_stage(lambda: parser.clean_and_validate_data(dms.copy()), repeat), n_rows)
+    stages[f"clean_dms_vectorized@{n_rows}"].update(rows_out=len(clean_dms), max_error_m=max_error_m(clean_dms, sheet))
+    return stages
+
+def main(argv: List[str] = None) -> None:
+    arg_parser = argparse.ArgumentParser(description="Benchmark da ingestão de planilhas UTM e DMS.")
+    arg_parser.add_argument("--rows", type=int, default=500_000)
+    arg_parser.add_argument("--seed", type=int, default=42)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument("--row-sample", type=int, default=20_000, help="Linhas da referência linha a linha.")
+    arg_parser.add_argument("--output", help="Arquivo JSON onde os resultados serão salvos.")
+    args = arg_parser.parse_args(argv)
+
+    results = {"benchmark": "utm_ingest", "environment": environment(), "seed": args.seed,
+               "stages": run(args.rows, args.seed, args.repeat, args.row_sample)}
+    for key, stage in results["stages"].items():
+        extra = f"  {stage['rows_out']:,} linhas válidas, erro máx. {stage['max_error_m']} m" if "max_error_m" in stage else ""
+        print(f"  {stage['median_s'] * 1000:10.2f} ms  {stage['rows_per_s']:>12,.0f} linhas/s  {key}{extra}")
+
+    if args.output:
+        save_results(args.output, results)
+
+if __name__ == "__main__":
+    main()